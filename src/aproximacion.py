@@ -0,0 +1,183 @@
+import os
+import time
+import argparse
+import numpy as np
+from image_enhancer import metodos
+from image_enhancer import medidas
+from image_enhancer import cache_imagenes
+from image_enhancer.analisis import (
+    analyze_histogram,
+    calculate_histogram,
+    calculate_sampled_histogram,
+    modos_muestreo,
+)
+from image_enhancer.agregados import MetricsAggregator
+
+# ```
+# Error del modo aproximado
+#
+# Compara, para cada imagen del dataset, la LUT construida con el histograma
+# completo y la construida con el histograma de una muestra de pixeles
+# (metodos.apply_approximate). Como ambas LUT se aplican a la imagen completa,
+# todo se mide en el dominio del histograma exacto:
+#
+# - desvio_lut: maxima diferencia entre las dos LUT en los niveles presentes.
+# - desvio_medio: diferencia absoluta media por pixel entre ambas salidas.
+# - dif_ambe: diferencia absoluta entre el AMBE del modo aproximado y el exacto.
+# - dif_psnr: PSNR del modo aproximado menos el del exacto.
+# - psnr_exacto: PSNR de la salida aproximada respecto de la exacta.
+# - aceleracion: tiempo del histograma completo / tiempo del muestreado.
+#
+# Ejemplo:
+#   python aproximacion.py --fracciones 0.25 0.0625 --muestreos filas rejilla
+
+directorio_dataset = "dataset/"
+nombres_medidas = ["desvio_lut", "desvio_medio", "dif_ambe", "dif_psnr", "psnr_exacto", "aceleracion"]
+
+
+def _cronometrar(funcion, repeticiones):
+    """Mejor tiempo de 'repeticiones' llamadas y el resultado de la última."""
+    mejor = np.inf
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor, resultado
+
+
+def compare_lut(analisis, exacta, aproximada):
+    """Diferencias entre la salida con la LUT aproximada y con la exacta, dado el análisis exacto."""
+    histograma = analisis.histograma
+    presentes = histograma > 0
+    diferencia = np.abs(aproximada.astype(np.float64) - exacta)
+    mse = np.dot(histograma, diferencia**2) / analisis.total_pixeles
+
+    metricas_exactas = medidas.calculate_lut_metrics(analisis, exacta)
+    metricas_aproximadas = medidas.calculate_lut_metrics(analisis, aproximada)
+    return {
+        "desvio_lut": diferencia[presentes].max(),
+        "desvio_medio": np.dot(histograma, diferencia) / analisis.total_pixeles,
+        "dif_ambe": abs(metricas_aproximadas["ambe"] - metricas_exactas["ambe"]),
+        "dif_psnr": metricas_aproximadas["psnr"] - metricas_exactas["psnr"],
+        "psnr_exacto": medidas.psnr_from_mse(mse, len(histograma) - 1),
+    }
+
+
+def compare_approximation(archivos, fracciones, muestreos, nombres_metodos, repeticiones=3):
+    """
+    Mide el error del modo aproximado para cada combinación de método, fracción
+    y muestreo. Devuelve un MetricsAggregator con una fila por combinación
+    (etiquetas "método fracción muestreo") y las columnas de nombres_medidas.
+    """
+    combinaciones = [
+        (metodo, fraccion, muestreo)
+        for metodo in nombres_metodos
+        for fraccion in fracciones
+        for muestreo in muestreos
+    ]
+    etiquetas = [f"{m} {f:g} {s}" for m, f, s in combinaciones]
+    agregado = MetricsAggregator(etiquetas, nombres_medidas)
+
+    for ruta in archivos:
+        imagen = cache_imagenes.read_image_cached(ruta)
+        if imagen is None:
+            print(f"Error procesando {ruta}: no se pudo leer la imagen")
+            continue
+        imagen = np.ascontiguousarray(imagen)
+
+        tiempo_exacto, histograma = _cronometrar(lambda: calculate_histogram(imagen), repeticiones)
+        analisis = analyze_histogram(histograma)
+        exactas = {m: metodos.constructores_lut[m](analisis) for m in nombres_metodos}
+        muestras = {}
+
+        for etiqueta, (metodo, fraccion, muestreo) in zip(etiquetas, combinaciones):
+            if (fraccion, muestreo) not in muestras:
+                muestras[fraccion, muestreo] = _cronometrar(
+                    lambda: calculate_sampled_histogram(imagen, fraccion, muestreo), repeticiones
+                )
+            tiempo, muestra = muestras[fraccion, muestreo]
+            aproximada = metodos.build_approximate_lut(analyze_histogram(muestra), metodo)
+
+            valores = compare_lut(analisis, exactas[metodo], aproximada)
+            valores["aceleracion"] = tiempo_exacto / tiempo
+            for medida, valor in valores.items():
+                agregado.update_value(etiqueta, medida, valor)
+
+    return agregado
+
+
+def format_report(agregado):
+    """Tabla con la media y el peor caso (o el percentil 95) de cada medida por combinación."""
+    lineas = [
+        "Método  Fracción Muestreo  | Desvío LUT    | Desvío medio | |ΔAMBE|        | ΔPSNR          | PSNR vs exacto | Aceleración",
+        "                           | Media   Máx   | Media  Máx   | Media   P95    | Media   Mín    | Media   Mín    | Mediana",
+        "-" * 124,
+    ]
+    for etiqueta in agregado.nombres_metodos:
+        if not agregado.count(etiqueta, "desvio_lut"):
+            continue
+        metodo, fraccion, muestreo = etiqueta.split(" ")
+
+        def m(medida):
+            return agregado.mean(etiqueta, medida)
+
+        lineas.append(
+            f"{metodo:<8}{fraccion:>8} {muestreo:<9} | "
+            f"{m('desvio_lut'):5.2f}  {agregado.max(etiqueta, 'desvio_lut'):5.0f}  | "
+            f"{m('desvio_medio'):5.2f}  {agregado.max(etiqueta, 'desvio_medio'):5.2f} | "
+            f"{m('dif_ambe'):6.3f}  {agregado.quantile(etiqueta, 'dif_ambe', 0.95):6.3f} | "
+            f"{m('dif_psnr'):+6.3f}  {agregado.min(etiqueta, 'dif_psnr'):+6.3f} | "
+            f"{m('psnr_exacto'):6.2f}  {agregado.min(etiqueta, 'psnr_exacto'):6.2f} | "
+            f"{agregado.median(etiqueta, 'aceleracion'):6.1f}x"
+        )
+    return "\n".join(lineas)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Error del modo aproximado (histograma muestreado) frente al exacto"
+    )
+    parser.add_argument("--directorio", default=directorio_dataset, help="Carpeta de imágenes")
+    parser.add_argument(
+        "--imagenes", type=int, default=None, help="Usar solo las primeras N imágenes"
+    )
+    parser.add_argument(
+        "--metodos",
+        nargs="+",
+        choices=list(metodos.constructores_lut),
+        default=list(metodos.constructores_lut),
+    )
+    parser.add_argument(
+        "--fracciones", type=float, nargs="+", default=[0.25, metodos.fraccion_muestreo, 1 / 64]
+    )
+    parser.add_argument(
+        "--muestreos", nargs="+", choices=modos_muestreo, default=modos_muestreo
+    )
+    parser.add_argument(
+        "--repeticiones",
+        type=int,
+        default=3,
+        help="Llamadas por histograma para medir tiempos (se toma la mejor)",
+    )
+    parser.add_argument("--guardar-agregado", help="Guardar las medidas en este JSON")
+    args = parser.parse_args()
+
+    archivos = sorted(
+        os.path.join(args.directorio, f)
+        for f in os.listdir(args.directorio)
+        if os.path.isfile(os.path.join(args.directorio, f))
+    )[: args.imagenes]
+
+    agregado = compare_approximation(
+        archivos, args.fracciones, args.muestreos, args.metodos, args.repeticiones
+    )
+    # Mantener la cache de imágenes dentro de su límite de tamaño
+    cache_imagenes.evict_images()
+    print(f"Modo aproximado frente al exacto sobre {len(archivos)} imágenes")
+    print(format_report(agregado))
+    if args.guardar_agregado:
+        agregado.save(args.guardar_agregado)
+
+
+if __name__ == "__main__":
+    main()
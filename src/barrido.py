@@ -0,0 +1,317 @@
+import os
+import csv
+import itertools
+import argparse
+import numpy as np
+from image_enhancer import metodos
+from image_enhancer import medidas
+from image_enhancer import cache_imagenes
+from image_enhancer import instrumentacion
+from image_enhancer.analisis import ImageAnalysis, analyze_image, calculate_histogram
+from image_enhancer.agregados import MetricsAggregator
+from image_enhancer.instrumentacion import instrumented
+
+# ```
+# Barrido de parametros
+#
+# Evalua una grilla de parametros de cada metodo sobre un conjunto de imagenes
+# (por ejemplo las de una camara) para elegir los valores que mejor
+# funcionan. Cada imagen se decodifica y analiza (histograma y CDF) una sola
+# vez para todos los candidatos:
+#
+# - Los metodos de LUT global (HE, DQHEPL, BHEPL-D) no recorren los pixeles:
+#   los candidatos de un mismo metodo se construyen como un lote de LUT sobre
+#   el mismo analisis (los factores de meseta van uno por fila) y se puntuan
+#   con las metricas en el dominio del histograma.
+# - CLAHE no es una LUT global, asi que cada candidato se aplica a la imagen;
+#   sus metricas salen del histograma de la salida (una pasada) y el PSNR de
+#   los pixeles.
+#
+# Las metricas de cada candidato se resumen con MetricsAggregator y se listan
+# en una tabla ordenada por AMBE (o PSNR).
+#
+# Ejemplos:
+#   python barrido.py --imagenes 50
+#   python barrido.py --directorio camara_1/ --clahe-clip 1 1.5 2 --salida camara_1.csv
+
+directorio_dataset = "dataset/"
+nombres_metricas = ["ambe", "psnr", "entropy", "contrast", "uniformity"]
+
+# Parámetros de los constructores de LUT que aceptan un valor por fila del lote
+parametros_por_fila = {"factor_meseta"}
+
+# Grilla por defecto de cada método (HE no tiene parámetros: sirve de referencia)
+grilla_por_defecto = {
+    "CLAHE": {"clip_limit": [1.0, 2.0, 3.0, 4.0], "tile_grid_size": [(4, 4), (8, 8), (16, 16)]},
+    "HE": {},
+    "DQHEPL": {"factor_meseta": [0.5, 0.75, 1.0, 1.5, 2.0]},
+    "BHEPL-D": {"factor_meseta": [0.5, 1.0, 2.0], "regla_meseta": ["mediana", "media"]},
+}
+
+
+def parameter_grid(grillas):
+    """
+    Expande {método: {parámetro: [valores]}} en la lista de candidatos
+    (método, parámetros), uno por cada combinación de valores.
+    """
+    candidatos = []
+    for metodo, grilla in grillas.items():
+        nombres = list(grilla)
+        for valores in itertools.product(*(grilla[nombre] for nombre in nombres)):
+            candidatos.append((metodo, dict(zip(nombres, valores))))
+    return candidatos
+
+
+def candidate_label(metodo, parametros):
+    """Nombre de un candidato, por ejemplo 'DQHEPL factor_meseta=0.5'."""
+    texto = " ".join(f"{nombre}={valor}" for nombre, valor in parametros.items())
+    return f"{metodo} {texto}".strip()
+
+
+def _repetir_analisis(analisis, veces):
+    """Análisis de un lote con 'veces' copias de la misma imagen."""
+    return ImageAnalysis(
+        histograma=np.broadcast_to(analisis.histograma, (veces, len(analisis.histograma))),
+        cdf=np.broadcast_to(analisis.cdf, (veces, len(analisis.cdf))),
+        total_pixeles=np.full(veces, analisis.total_pixeles),
+        intensidad_min=np.full(veces, analisis.intensidad_min),
+        intensidad_max=np.full(veces, analisis.intensidad_max),
+        q1=np.full(veces, analisis.q1),
+        q2=np.full(veces, analisis.q2),
+        q3=np.full(veces, analisis.q3),
+        media=np.full(veces, analisis.media),
+    )
+
+
+def _agrupar_lut(candidatos):
+    """
+    Agrupa los índices de los candidatos de LUT que se pueden construir en un
+    solo lote: mismo método y mismos parámetros, salvo los que van por fila.
+    """
+    grupos = {}
+    for i, (metodo, parametros) in enumerate(candidatos):
+        if metodo not in metodos.constructores_lut:
+            continue
+        fijos = tuple(
+            sorted((n, v) for n, v in parametros.items() if n not in parametros_por_fila)
+        )
+        por_fila = tuple(sorted(n for n in parametros if n in parametros_por_fila))
+        grupos.setdefault((metodo, fijos, por_fila), []).append(i)
+    return grupos
+
+
+def _medir_procesada(imagen, procesada, analisis):
+    """
+    Métricas de un candidato que no es una LUT global: una pasada de histograma
+    sobre la salida para AMBE, entropía, contraste y uniformidad, y el PSNR
+    sobre los píxeles.
+    """
+    niveles = len(analisis.histograma)
+    valores = medidas.calculate_histogram_metrics(calculate_histogram(procesada, niveles))
+    valores["ambe"] = abs(analisis.media - valores["mean"])
+    valores["psnr"] = medidas.calculate_psnr(imagen, procesada, niveles - 1)
+    return [valores[metrica] for metrica in nombres_metricas]
+
+
+@instrumented("barrido.sweep_image")
+def sweep_image(imagen, candidatos, analisis=None):
+    """
+    Evalúa los candidatos (método, parámetros) sobre una imagen. Devuelve una
+    matriz candidatos x nombres_metricas.
+    """
+    if analisis is None:
+        analisis = analyze_image(imagen)
+    registro = np.zeros((len(candidatos), len(nombres_metricas)))
+
+    for (metodo, fijos, por_fila), indices in _agrupar_lut(candidatos).items():
+        parametros = dict(fijos)
+        for nombre in por_fila:
+            parametros[nombre] = np.array([candidatos[i][1][nombre] for i in indices])
+        tablas = metodos.constructores_lut[metodo](
+            _repetir_analisis(analisis, len(indices)), **parametros
+        )
+        for i, tabla in zip(indices, tablas):
+            valores = medidas.calculate_lut_metrics(analisis, tabla)
+            registro[i] = [valores[metrica] for metrica in nombres_metricas]
+
+    for i, (metodo, parametros) in enumerate(candidatos):
+        if metodo in metodos.constructores_lut:
+            continue
+        procesada = metodos.apply_batch([imagen], metodo, **parametros)[0]
+        registro[i] = _medir_procesada(imagen, procesada, analisis)
+
+    return registro
+
+
+def sweep_images(archivos, candidatos, profundidad_nativa=False):
+    """
+    Evalúa los candidatos sobre cada archivo y devuelve el MetricsAggregator
+    (un "método" por candidato) y la lista de (archivo, mensaje) que fallaron.
+    """
+    etiquetas = [candidate_label(metodo, parametros) for metodo, parametros in candidatos]
+    agregado = MetricsAggregator(etiquetas, nombres_metricas)
+    errores = []
+    for ruta in archivos:
+        try:
+            imagen = cache_imagenes.read_image_cached(ruta, profundidad_nativa=profundidad_nativa)
+            if imagen is None:
+                raise ValueError(f"No se pudo leer la imagen: {ruta}")
+            agregado.update(sweep_image(imagen, candidatos))
+        except Exception as e:
+            errores.append((ruta, str(e)))
+    return agregado, errores
+
+
+def rank_candidates(agregado, candidatos, orden="ambe"):
+    """
+    Filas de la tabla de resultados (una por candidato con datos), ordenadas
+    por AMBE medio ascendente o PSNR medio descendente; la otra métrica desempata.
+    """
+    filas = []
+    for etiqueta, (metodo, parametros) in zip(agregado.nombres_metodos, candidatos):
+        if not agregado.count(etiqueta):
+            continue
+        fila = {
+            "metodo": metodo,
+            "parametros": candidate_label("", parametros),
+            "defecto": all(
+                metodos.parametros_metodos[metodo].get(nombre) == valor
+                for nombre, valor in parametros.items()
+            ),
+            "imagenes": agregado.count(etiqueta),
+        }
+        for metrica in nombres_metricas:
+            fila[metrica] = agregado.mean(etiqueta, metrica)
+            fila[f"{metrica}_mediana"] = agregado.median(etiqueta, metrica)
+        filas.append(fila)
+
+    if orden == "ambe":
+        filas.sort(key=lambda fila: (fila["ambe"], -fila["psnr"]))
+    else:
+        filas.sort(key=lambda fila: (-fila["psnr"], fila["ambe"]))
+    return filas
+
+
+def format_ranking(filas):
+    """Tabla de texto del ranking; '*' marca los parámetros por defecto."""
+    lineas = [
+        f"{'#':>3}  {'Método':<8} {'Parámetros':<44} | {'AMBE':>6} {'PSNR':>6} "
+        f"{'Entropía':>8} {'Contraste':>9} {'Uniform.':>8}",
+        "-" * 104,
+    ]
+    for posicion, fila in enumerate(filas, 1):
+        parametros = fila["parametros"] + (" *" if fila["defecto"] else "")
+        lineas.append(
+            f"{posicion:>3}  {fila['metodo']:<8} {parametros:<44} | "
+            f"{fila['ambe']:6.2f} {fila['psnr']:6.2f} {fila['entropy']:8.2f} "
+            f"{fila['contrast']:9.2f} {fila['uniformity']:8.4f}"
+        )
+    return "\n".join(lineas)
+
+
+def save_ranking(filas, ruta):
+    """Guarda el ranking como CSV."""
+    with open(ruta, "w", newline="") as archivo:
+        escritor = csv.DictWriter(archivo, fieldnames=list(filas[0]) if filas else [])
+        escritor.writeheader()
+        escritor.writerows(filas)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Barrido de parámetros de los métodos de mejora")
+    parser.add_argument("--directorio", default=directorio_dataset, help="Carpeta de imágenes")
+    parser.add_argument(
+        "--imagenes", type=int, default=None, help="Usar solo las primeras N imágenes"
+    )
+    parser.add_argument(
+        "--metodos",
+        nargs="+",
+        choices=list(grilla_por_defecto),
+        default=list(grilla_por_defecto),
+        help="Métodos a barrer",
+    )
+    parser.add_argument(
+        "--clahe-clip", type=float, nargs="+", default=grilla_por_defecto["CLAHE"]["clip_limit"]
+    )
+    parser.add_argument(
+        "--clahe-mosaico",
+        type=int,
+        nargs="+",
+        default=[lado for lado, _ in grilla_por_defecto["CLAHE"]["tile_grid_size"]],
+        help="Lados de la cuadrícula de mosaicos de CLAHE (NxN)",
+    )
+    parser.add_argument(
+        "--dqhepl-meseta",
+        type=float,
+        nargs="+",
+        default=grilla_por_defecto["DQHEPL"]["factor_meseta"],
+        help="Factores del límite de meseta de DQHEPL",
+    )
+    parser.add_argument(
+        "--bhepl-meseta",
+        type=float,
+        nargs="+",
+        default=grilla_por_defecto["BHEPL-D"]["factor_meseta"],
+        help="Factores del límite de meseta de BHEPL-D",
+    )
+    parser.add_argument(
+        "--bhepl-regla",
+        nargs="+",
+        choices=metodos.reglas_meseta,
+        default=grilla_por_defecto["BHEPL-D"]["regla_meseta"],
+        help="Reglas de meseta de BHEPL-D",
+    )
+    parser.add_argument("--orden", choices=["ambe", "psnr"], default="ambe")
+    parser.add_argument("--salida", help="Guardar el ranking en este CSV")
+    parser.add_argument("--guardar-agregado", help="Guardar el resumen de métricas en este JSON")
+    parser.add_argument(
+        "--profundidad-nativa",
+        action="store_true",
+        help="Leer las imágenes de 16 bits sin convertirlas a 8 bits",
+    )
+    parser.add_argument(
+        "--perfil", action="store_true", help="Mostrar el tiempo de cada etapa al terminar"
+    )
+    args = parser.parse_args()
+
+    grillas = {
+        "CLAHE": {
+            "clip_limit": args.clahe_clip,
+            "tile_grid_size": [(lado, lado) for lado in args.clahe_mosaico],
+        },
+        "HE": {},
+        "DQHEPL": {"factor_meseta": args.dqhepl_meseta},
+        "BHEPL-D": {"factor_meseta": args.bhepl_meseta, "regla_meseta": args.bhepl_regla},
+    }
+    candidatos = parameter_grid({metodo: grillas[metodo] for metodo in args.metodos})
+
+    archivos = sorted(
+        os.path.join(args.directorio, f)
+        for f in os.listdir(args.directorio)
+        if os.path.isfile(os.path.join(args.directorio, f))
+    )[: args.imagenes]
+
+    if args.perfil:
+        instrumentacion.enable()
+
+    print(f"Evaluando {len(candidatos)} candidatos sobre {len(archivos)} imágenes...")
+    agregado, errores = sweep_images(archivos, candidatos, args.profundidad_nativa)
+    for ruta, error in errores:
+        print(f"Error procesando {ruta}: {error}")
+    # Mantener la cache de imágenes dentro de su límite de tamaño
+    cache_imagenes.evict_images()
+
+    filas = rank_candidates(agregado, candidatos, args.orden)
+    print(format_ranking(filas))
+
+    if args.salida:
+        save_ranking(filas, args.salida)
+    if args.guardar_agregado:
+        agregado.save(args.guardar_agregado)
+    if args.perfil:
+        print()
+        print(instrumentacion.report())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,364 @@
+import os
+import gc
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import subprocess
+import cv2
+import numpy as np
+from image_enhancer import metodos
+from image_enhancer import medidas
+
+# ```
+# Benchmark de métodos y métricas
+#
+# Mide cada método de metodos.py y cada métrica de medidas.py sobre una matriz
+# de tamaños: imágenes del dataset y sintéticas desde 256x256 hasta 8K. Cada
+# caso tiene llamadas de calentamiento, luego hasta 'repeticiones' llamadas
+# cronometradas por separado (con el recolector de basura desactivado) y se
+# reportan percentiles. Los resultados se guardan en JSON, y con --comparar se
+# marcan las regresiones respecto de un JSON de referencia.
+#
+# El tamaño "arranque" mide el arranque en frio: cada muestra es un proceso
+# nuevo de Python (solo el interprete, importar main.py, y una llamada
+# completa de 'image-enhancer enhance' sobre una imagen del dataset).
+#
+# Ejemplos:
+#   python benchmark.py --salida base.json
+#   python benchmark.py --comparar base.json --tolerancia 0.1
+
+directorio_dataset = "dataset/"
+
+tamaños_sinteticos = {
+    "256x256": (256, 256),
+    "640x480": (480, 640),
+    "1920x1080": (1080, 1920),
+    "3840x2160": (2160, 3840),
+    "7680x4320": (4320, 7680),
+}
+
+
+def synthetic_image(alto, ancho, semilla=0):
+    """
+    Imagen sintética de bajo contraste (gradiente suave con ruido) en el rango
+    [60, 180], similar a las entradas típicas de los métodos de mejora.
+    """
+    rng = np.random.default_rng(semilla)
+    filas = np.linspace(0, 1, alto, dtype=np.float32)[:, None]
+    columnas = np.linspace(0, 1, ancho, dtype=np.float32)[None, :]
+    gradiente = 60 + 80 * (0.6 * filas + 0.4 * columnas)
+    ruido = rng.normal(0, 12, (alto, ancho)).astype(np.float32)
+    return np.clip(gradiente + ruido, 60, 180).astype(np.uint8)
+
+
+def dataset_images(cantidad):
+    """Primeras 'cantidad' imágenes del dataset (en orden de nombre), en escala de grises."""
+    archivos = sorted(
+        f
+        for f in os.listdir(directorio_dataset)
+        if os.path.isfile(os.path.join(directorio_dataset, f))
+    )
+    imagenes = []
+    for filename in archivos[:cantidad]:
+        img = medidas.read_image_as_grayscale(os.path.join(directorio_dataset, filename))
+        if img is not None:
+            imagenes.append(img)
+    return imagenes
+
+
+class _Entrada:
+    """Imagen de prueba con los datos derivados que necesitan las métricas."""
+
+    def __init__(self, imagen):
+        self.imagen = imagen
+        self.analisis = metodos.analyze_image(imagen)
+        self.lut = metodos.build_bhepl_d_lut(self.analisis)
+        self.procesada = metodos.apply_lut(imagen, self.lut)
+        self.tablas = np.stack(
+            [construir(self.analisis) for construir in metodos.constructores_lut.values()]
+        )
+        self.salidas = np.empty((len(self.tablas), *imagen.shape), dtype=self.tablas.dtype)
+
+
+# Casos medidos: nombre -> (tipo, función que recibe una _Entrada)
+casos = {
+    "CLAHE": ("metodo", lambda e: metodos.apply_clahe(e.imagen)),
+    "HE": ("metodo", lambda e: metodos.apply_histogram_equalization(e.imagen)),
+    "DQHEPL": ("metodo", lambda e: metodos.apply_dqhepl(e.imagen)),
+    "BHEPL-D": ("metodo", lambda e: metodos.apply_bhepl_d(e.imagen)),
+    "apply_lut_stack": ("metodo", lambda e: metodos.apply_lut_stack(e.imagen, e.tablas, e.salidas)),
+    "analyze_image": ("analisis", lambda e: metodos.analyze_image(e.imagen)),
+    "calculate_ambe": (
+        "metrica",
+        lambda e: medidas.calculate_ambe(e.imagen, e.procesada),
+    ),
+    "calculate_psnr": (
+        "metrica",
+        lambda e: medidas.calculate_psnr(e.imagen, e.procesada),
+    ),
+    "calculate_entropy": ("metrica", lambda e: medidas.calculate_entropy(e.procesada)),
+    "calculate_contrast": (
+        "metrica",
+        lambda e: medidas.calculate_contrast(e.procesada),
+    ),
+    "calculate_uniformity": (
+        "metrica",
+        lambda e: medidas.calculate_uniformity(e.procesada),
+    ),
+    "calculate_image_metrics": (
+        "metrica",
+        lambda e: medidas.calculate_image_metrics(e.imagen, e.procesada),
+    ),
+    "calculate_lut_metrics": (
+        "metrica",
+        lambda e: medidas.calculate_lut_metrics(e.analisis, e.lut),
+    ),
+}
+
+
+# Casos de arranque: nombre -> argumentos del proceso ({imagen} y {salida} se
+# reemplazan por una imagen del dataset y una carpeta temporal)
+casos_arranque = {
+    "arranque_python": ["-c", "pass"],
+    "arranque_importar_main": ["-c", "import main"],
+    "arranque_enhance": ["-m", "image_enhancer", "enhance", "{imagen}", "--salida", "{salida}"],
+}
+
+
+def cold_start_case(argumentos, imagen, salida):
+    """Función que lanza el proceso del caso de arranque y espera a que termine."""
+    comando = [sys.executable] + [a.format(imagen=imagen, salida=salida) for a in argumentos]
+    return lambda _: subprocess.run(comando, check=True, stdout=subprocess.DEVNULL)
+
+
+def measure(funcion, entradas, repeticiones=30, calentamiento=3, minimo=5, presupuesto=1.0):
+    """
+    Cronometra 'funcion' sobre las entradas (en ciclo). Hace 'calentamiento'
+    llamadas sin medir y luego hasta 'repeticiones' llamadas medidas; se detiene
+    antes si ya tiene 'minimo' muestras y pasaron 'presupuesto' segundos.
+    Devuelve las duraciones en segundos.
+    """
+    for k in range(calentamiento):
+        funcion(entradas[k % len(entradas)])
+
+    muestras = []
+    recolector_activo = gc.isenabled()
+    gc.disable()
+    try:
+        inicio = time.perf_counter()
+        for k in range(repeticiones):
+            entrada = entradas[k % len(entradas)]
+            t0 = time.perf_counter_ns()
+            funcion(entrada)
+            muestras.append((time.perf_counter_ns() - t0) * 1e-9)
+            if len(muestras) >= minimo and time.perf_counter() - inicio > presupuesto:
+                break
+    finally:
+        if recolector_activo:
+            gc.enable()
+    return np.array(muestras)
+
+
+def summarize(muestras, pixeles):
+    """Percentiles y estadísticas de las duraciones (en ms) y throughput en Mpx/s."""
+    ms = muestras * 1000
+    p50 = float(np.percentile(ms, 50))
+    return {
+        "muestras": int(len(ms)),
+        "min_ms": float(ms.min()),
+        "media_ms": float(ms.mean()),
+        "desvio_ms": float(ms.std()),
+        "p50_ms": p50,
+        "p90_ms": float(np.percentile(ms, 90)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "max_ms": float(ms.max()),
+        "mpx_s": pixeles / 1e6 / (p50 / 1000) if p50 > 0 else float("inf"),
+    }
+
+
+def metadata(args):
+    """Entorno de la ejecución, para que los resultados sean reproducibles."""
+    return {
+        "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+        "plataforma": platform.platform(),
+        "procesador": platform.processor() or platform.machine(),
+        "cpus": os.cpu_count(),
+        "hilos_opencv": cv2.getNumThreads(),
+        "repeticiones": args.repeticiones,
+        "calentamiento": args.calentamiento,
+        "presupuesto_s": args.presupuesto,
+    }
+
+
+def run_benchmark(args):
+    """Ejecuta la matriz de casos x tamaños y devuelve el resultado como diccionario."""
+    tamaños = args.tamaños or ["dataset", *tamaños_sinteticos, "arranque"]
+    nombres_casos = [nombre for nombre in args.casos or casos if nombre in casos]
+
+    resultados = []
+    for tamaño in tamaños:
+        if tamaño == "arranque":
+            resultados.extend(run_cold_start(args))
+            continue
+        if tamaño == "dataset":
+            imagenes = dataset_images(args.imagenes_dataset)
+            if not imagenes:
+                print("¡No se encontraron imágenes en el dataset!")
+                continue
+        else:
+            alto, ancho = tamaños_sinteticos[tamaño]
+            imagenes = [synthetic_image(alto, ancho)]
+
+        entradas = [_Entrada(imagen) for imagen in imagenes]
+        pixeles = np.mean([imagen.size for imagen in imagenes])
+
+        for nombre in nombres_casos:
+            tipo, funcion = casos[nombre]
+            muestras = measure(
+                funcion,
+                entradas,
+                args.repeticiones,
+                args.calentamiento,
+                presupuesto=args.presupuesto,
+            )
+            resultado = {"caso": nombre, "tipo": tipo, "tamaño": tamaño}
+            resultado.update(summarize(muestras, pixeles))
+            resultados.append(resultado)
+            print(
+                f"{nombre:<24} {tamaño:<10} p50 {resultado['p50_ms']:9.3f} ms  "
+                f"p90 {resultado['p90_ms']:9.3f} ms  n={resultado['muestras']}"
+            )
+
+    return {"metadata": metadata(args), "resultados": resultados}
+
+
+def run_cold_start(args):
+    """Mide los casos de arranque (en ms por proceso, sin throughput)."""
+    archivos = sorted(os.listdir(directorio_dataset))
+    if not archivos:
+        print("¡No se encontraron imágenes en el dataset!")
+        return []
+    imagen = os.path.join(directorio_dataset, archivos[0])
+
+    resultados = []
+    with tempfile.TemporaryDirectory() as salida:
+        for nombre, argumentos in casos_arranque.items():
+            if args.casos and nombre not in args.casos:
+                continue
+            muestras = measure(
+                cold_start_case(argumentos, imagen, salida),
+                [None],
+                args.repeticiones,
+                args.calentamiento,
+                presupuesto=args.presupuesto,
+            )
+            resultado = {"caso": nombre, "tipo": "arranque", "tamaño": "arranque"}
+            resultado.update(summarize(muestras, 0))
+            resultados.append(resultado)
+            print(
+                f"{nombre:<24} {'arranque':<10} p50 {resultado['p50_ms']:9.3f} ms  "
+                f"p90 {resultado['p90_ms']:9.3f} ms  n={resultado['muestras']}"
+            )
+    return resultados
+
+
+def compare(actual, referencia, tolerancia):
+    """
+    Compara la mediana (p50) de cada caso con la de la referencia. Devuelve la
+    lista de regresiones: casos cuyo p50 supera al de referencia en más de
+    'tolerancia' (fracción, por ejemplo 0.1 = 10%).
+    """
+    base = {(r["caso"], r["tamaño"]): r for r in referencia["resultados"]}
+    regresiones = []
+
+    print(f"\n{'Caso':<24} {'Tamaño':<10} {'Ref. p50':>10} {'Actual p50':>11} {'Razón':>7}")
+    print("-" * 66)
+    for r in actual["resultados"]:
+        clave = (r["caso"], r["tamaño"])
+        if clave not in base:
+            continue
+        razon = r["p50_ms"] / base[clave]["p50_ms"] if base[clave]["p50_ms"] > 0 else 1.0
+        marca = ""
+        if razon > 1 + tolerancia:
+            marca = "  REGRESIÓN"
+            regresiones.append(clave)
+        elif razon < 1 - tolerancia:
+            marca = "  mejora"
+        print(
+            f"{r['caso']:<24} {r['tamaño']:<10} {base[clave]['p50_ms']:10.3f} "
+            f"{r['p50_ms']:11.3f} {razon:7.2f}{marca}"
+        )
+
+    return regresiones
+
+
+def main():
+    """Ejecuta el benchmark, guarda el JSON y opcionalmente compara con una referencia."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--tamaños",
+        nargs="+",
+        choices=["dataset", *tamaños_sinteticos, "arranque"],
+        help="Tamaños a medir (por defecto todos)",
+    )
+    parser.add_argument(
+        "--casos",
+        nargs="+",
+        choices=[*casos, *casos_arranque],
+        help="Casos a medir (por defecto todos)",
+    )
+    parser.add_argument("--repeticiones", type=int, default=30)
+    parser.add_argument("--calentamiento", type=int, default=3)
+    parser.add_argument(
+        "--presupuesto",
+        type=float,
+        default=1.0,
+        help="Segundos máximos de medición por caso (con al menos 5 muestras)",
+    )
+    parser.add_argument(
+        "--imagenes-dataset",
+        type=int,
+        default=20,
+        help="Cantidad de imágenes del dataset a usar",
+    )
+    parser.add_argument("--salida", default="benchmark.json", help="Archivo JSON de salida")
+    parser.add_argument(
+        "--entrada",
+        help="Usar un JSON ya generado en lugar de ejecutar el benchmark",
+    )
+    parser.add_argument("--comparar", help="JSON de referencia para detectar regresiones")
+    parser.add_argument(
+        "--tolerancia",
+        type=float,
+        default=0.10,
+        help="Aumento relativo del p50 tolerado antes de marcar una regresión",
+    )
+    args = parser.parse_args()
+
+    if args.entrada:
+        with open(args.entrada) as archivo:
+            actual = json.load(archivo)
+    else:
+        actual = run_benchmark(args)
+        with open(args.salida, "w") as archivo:
+            json.dump(actual, archivo, indent=2, ensure_ascii=False)
+        print(f"\nResultados guardados en {args.salida}")
+
+    if args.comparar:
+        with open(args.comparar) as archivo:
+            referencia = json.load(archivo)
+        regresiones = compare(actual, referencia, args.tolerancia)
+        if regresiones:
+            print(f"\n{len(regresiones)} regresiones (tolerancia {args.tolerancia:.0%})")
+            sys.exit(1)
+        print("\nSin regresiones")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,360 @@
+import os
+import argparse
+import numpy as np
+from image_enhancer import metodos
+from image_enhancer import medidas
+from image_enhancer import cache_imagenes
+from image_enhancer import instrumentacion
+from image_enhancer.analisis import analyze_histogram, calculate_histogram, image_levels
+from image_enhancer.instrumentacion import instrumented
+
+# ```
+# Procesamiento por franjas de imagenes que no entran en memoria
+#
+# Para panoramas y mosaicos muy grandes la imagen se lee como un arreglo
+# mapeado en memoria (.npy) y se recorre por franjas de filas, de modo que la
+# memoria usada depende del alto de franja y no del tamaño de la imagen. Otros
+# formatos se decodifican enteros una vez (ver open_image), así que para
+# imágenes que realmente no entran en memoria la entrada debe ser un .npy:
+#
+# 1. Una pasada acumula el histograma global (métodos de LUT) y los
+#    histogramas de cada mosaico de CLAHE.
+# 2. Se construyen las LUT: una global por método y una por mosaico de CLAHE.
+# 3. Otra pasada aplica las LUT franja por franja y escribe cada salida en su
+#    propio .npy mapeado en memoria.
+#
+# CLAHE se reproduce fuera de OpenCV con la misma geometría de mosaicos
+# (incluido el relleno por reflexión cuando el tamaño no es múltiplo de la
+# cuadrícula), el mismo recorte con redistribución y la misma interpolación
+# bilineal entre los centros de mosaicos vecinos en float32. Como las LUT de
+# todos los mosaicos ya están calculadas, una franja puede empezar y terminar
+# en cualquier fila: la interpolación con el mosaico vecino (el solapamiento)
+# no necesita leer filas de otras franjas.
+#
+# Las métricas salen del histograma (métodos de LUT) o del histograma de la
+# salida y el error cuadrático acumulados por franja (CLAHE).
+#
+# Ejemplo:
+#   python franjas.py panorama.npy --salida panorama/ --alto-franja 1024
+
+alto_franja_por_defecto = 512
+
+# Píxeles por bloque en los cálculos intermedios de CLAHE (índices, valores
+# interpolados, error cuadrático): acota sus temporales sin importar la franja
+pixeles_bloque = 1 << 20
+
+
+def open_image(ruta, profundidad_nativa=False):
+    """
+    Abre una imagen grande como arreglo de solo lectura mapeado en memoria. Solo
+    los .npy se abren sin cargar la imagen entera: se mapean directamente. Otros
+    formatos (PNG, TIFF, ...) se decodifican completos en memoria la primera
+    vez, porque cv2.imread no lee por franjas, y se guardan en la cache de
+    imágenes, desde donde se mapean en adelante.
+    """
+    if ruta.endswith(".npy"):
+        return np.load(ruta, mmap_mode="r")
+    imagen = cache_imagenes.read_image_cached(ruta, profundidad_nativa=profundidad_nativa)
+    if imagen is None:
+        raise ValueError(f"No se pudo leer la imagen: {ruta}")
+    return imagen
+
+
+def iter_strips(alto, alto_franja=alto_franja_por_defecto):
+    """Rangos (inicio, fin) de filas de cada franja."""
+    for inicio in range(0, alto, alto_franja):
+        yield inicio, min(inicio + alto_franja, alto)
+
+
+def _bloques(alto, ancho):
+    """Rangos de filas de 'alto' x 'ancho' con a lo sumo pixeles_bloque píxeles cada uno."""
+    return iter_strips(alto, max(1, pixeles_bloque // max(ancho, 1)))
+
+
+@instrumented("franjas.strip_histogram")
+def strip_histogram(imagen, niveles=None, alto_franja=alto_franja_por_defecto):
+    """Histograma de la imagen acumulado franja por franja."""
+    if niveles is None:
+        niveles = image_levels(imagen)
+    histograma = np.zeros(niveles)
+    for inicio, fin in iter_strips(len(imagen), alto_franja):
+        histograma += calculate_histogram(np.ascontiguousarray(imagen[inicio:fin]), niveles)
+    return histograma
+
+
+# ```
+# CLAHE por mosaicos
+
+
+class ClaheGeometry:
+    """
+    Geometría de mosaicos de CLAHE para una imagen de alto x ancho, con las
+    mismas reglas que cv2.CLAHE: si el tamaño no es múltiplo de la cuadrícula,
+    la imagen se extiende abajo y a la derecha por reflexión (BORDER_REFLECT_101)
+    para calcular los histogramas de los mosaicos.
+    """
+
+    def __init__(self, alto, ancho, tile_grid_size, niveles):
+        self.alto = alto
+        self.ancho = ancho
+        self.mosaicos_x, self.mosaicos_y = tile_grid_size
+        self.niveles = niveles
+
+        if alto % self.mosaicos_y == 0 and ancho % self.mosaicos_x == 0:
+            relleno_y = relleno_x = 0
+        else:
+            relleno_y = self.mosaicos_y - alto % self.mosaicos_y
+            relleno_x = self.mosaicos_x - ancho % self.mosaicos_x
+        self.alto_mosaico = (alto + relleno_y) // self.mosaicos_y
+        self.ancho_mosaico = (ancho + relleno_x) // self.mosaicos_x
+
+        # Filas y columnas agregadas por el relleno, como índices de la original
+        self.filas_relleno = 2 * (alto - 1) - np.arange(alto, alto + relleno_y)
+        self.columnas_relleno = 2 * (ancho - 1) - np.arange(ancho, ancho + relleno_x)
+
+        # Mosaico de cada columna (original y relleno) para los histogramas
+        self.mosaico_columna = (np.arange(ancho) // self.ancho_mosaico).astype(np.int32)
+        self.mosaico_relleno = (
+            np.arange(ancho, ancho + relleno_x) // self.ancho_mosaico
+        ).astype(np.int32)
+
+        # Interpolación horizontal, igual para todas las filas
+        inv_ancho = np.float32(1.0) / np.float32(self.ancho_mosaico)
+        txf = np.arange(ancho, dtype=np.float32) * inv_ancho - np.float32(0.5)
+        tx1 = np.floor(txf).astype(np.int32)
+        self.xa = txf - tx1.astype(np.float32)
+        self.xa1 = np.float32(1.0) - self.xa
+        # Desplazamiento de la LUT de los mosaicos izquierdo y derecho de cada columna
+        self.desplazamiento1 = np.maximum(tx1, 0) * np.int32(niveles)
+        self.desplazamiento2 = np.minimum(tx1 + 1, self.mosaicos_x - 1) * np.int32(niveles)
+
+    def row_weights(self, inicio, fin):
+        """Mosaicos vecinos (ty1, ty2) y peso ya de cada fila del rango."""
+        inv_alto = np.float32(1.0) / np.float32(self.alto_mosaico)
+        tyf = np.arange(inicio, fin).astype(np.float32) * inv_alto - np.float32(0.5)
+        ty1 = np.floor(tyf).astype(np.intp)
+        ya = tyf - ty1.astype(np.float32)
+        return np.maximum(ty1, 0), np.minimum(ty1 + 1, self.mosaicos_y - 1), ya
+
+
+def _acumular_mosaicos(histogramas, geometria, filas, y0):
+    """Suma al histograma de cada mosaico los píxeles de 'filas' (que empiezan en la fila y0)."""
+    niveles = geometria.niveles
+    bins = geometria.mosaicos_x * niveles
+    for inicio, fin in _bloques(len(filas), geometria.ancho):
+        ty = (y0 + np.arange(inicio, fin)) // geometria.alto_mosaico
+        for mosaico_y in np.unique(ty):
+            bloque = filas[inicio:fin][ty == mosaico_y]
+            indices = geometria.mosaico_columna * np.int32(niveles) + bloque
+            conteo = np.bincount(indices.ravel(), minlength=bins)
+            if len(geometria.columnas_relleno):
+                relleno = bloque[:, geometria.columnas_relleno]
+                indices = geometria.mosaico_relleno * np.int32(niveles) + relleno
+                conteo += np.bincount(indices.ravel(), minlength=bins)
+            histogramas[mosaico_y] += conteo.reshape(geometria.mosaicos_x, niveles)
+
+
+@instrumented("franjas.clahe_tile_histograms")
+def clahe_tile_histograms(imagen, geometria, alto_franja=alto_franja_por_defecto):
+    """Histogramas (mosaicos_y, mosaicos_x, niveles) de los mosaicos de CLAHE, por franjas."""
+    histogramas = np.zeros(
+        (geometria.mosaicos_y, geometria.mosaicos_x, geometria.niveles), dtype=np.int64
+    )
+    for inicio, fin in iter_strips(len(imagen), alto_franja):
+        _acumular_mosaicos(histogramas, geometria, np.asarray(imagen[inicio:fin]), inicio)
+    if len(geometria.filas_relleno):
+        filas = np.asarray(imagen[geometria.filas_relleno])
+        _acumular_mosaicos(histogramas, geometria, filas, geometria.alto)
+    return histogramas
+
+
+@instrumented("franjas.build_clahe_luts")
+def build_clahe_luts(histogramas, geometria, clip_limit):
+    """
+    LUT de cada mosaico a partir de su histograma, con el recorte y la
+    redistribución de cv2.CLAHE. Devuelve un arreglo (mosaicos_y, mosaicos_x, niveles).
+    """
+    niveles = geometria.niveles
+    pixeles_mosaico = geometria.alto_mosaico * geometria.ancho_mosaico
+    histogramas = histogramas.reshape(-1, niveles).copy()
+
+    if clip_limit > 0:
+        limite = max(int(clip_limit * pixeles_mosaico / niveles), 1)
+        recortados = np.maximum(histogramas - limite, 0).sum(axis=1)
+        np.minimum(histogramas, limite, out=histogramas)
+
+        # Reparto uniforme del exceso, y el resto en niveles equiespaciados desde 0
+        histogramas += (recortados // niveles)[:, None]
+        resto = recortados % niveles
+        paso = np.maximum(niveles // np.maximum(resto, 1), 1)[:, None]
+        indices = np.arange(niveles)
+        histogramas += (indices % paso == 0) & (indices // paso < resto[:, None])
+
+    escala = np.float32(niveles - 1) / np.float32(pixeles_mosaico)
+    luts = np.rint(np.cumsum(histogramas, axis=1).astype(np.float32) * escala)
+    luts = np.clip(luts, 0, niveles - 1).astype(metodos.lut_dtype(niveles))
+    return luts.reshape(geometria.mosaicos_y, geometria.mosaicos_x, niveles)
+
+
+@instrumented("franjas.apply_clahe_strip")
+def apply_clahe_strip(franja, inicio, luts, geometria):
+    """
+    Aplica CLAHE a las filas [inicio, inicio + len(franja)) de la imagen,
+    interpolando entre las LUT de los mosaicos vecinos.
+    """
+    ty1, ty2, ya = geometria.row_weights(inicio, inicio + len(franja))
+    luts = luts.reshape(geometria.mosaicos_y, -1).astype(np.float32)
+    salida = np.empty(franja.shape, dtype=franja.dtype)
+
+    # Las filas con los mismos mosaicos vecinos se interpolan juntas
+    cortes = np.flatnonzero((np.diff(ty1) != 0) | (np.diff(ty2) != 0)) + 1
+    grupos = np.split(np.arange(len(franja)), cortes)
+    for grupo in grupos:
+        arriba = luts[ty1[grupo[0]]]
+        abajo = luts[ty2[grupo[0]]]
+        for a, b in _bloques(len(grupo), franja.shape[1]):
+            filas = slice(grupo[a], grupo[a] + (b - a))
+            indices1 = geometria.desplazamiento1 + franja[filas]
+            indices2 = geometria.desplazamiento2 + franja[filas]
+            peso = ya[filas][:, None]
+            resultado = (
+                arriba[indices1] * geometria.xa1 + arriba[indices2] * geometria.xa
+            ) * (np.float32(1.0) - peso) + (
+                abajo[indices1] * geometria.xa1 + abajo[indices2] * geometria.xa
+            ) * peso
+            salida[filas] = np.clip(np.rint(resultado), 0, geometria.niveles - 1)
+    return salida
+
+
+# ```
+# Procesamiento completo
+
+
+def process_large_image(
+    imagen, salidas, alto_franja=alto_franja_por_defecto, parametros=None
+):
+    """
+    Aplica los métodos de 'salidas' ({método: ruta .npy}) a una imagen (arreglo
+    o memmap) recorriéndola por franjas, y escribe cada resultado en su ruta.
+    'parametros' permite indicar los de cada método ({método: {...}}).
+    Devuelve {método: métricas}.
+    """
+    parametros = parametros or {}
+    alto, ancho = imagen.shape
+    niveles = image_levels(imagen)
+
+    # Primera pasada: histograma global e histogramas de los mosaicos
+    with instrumentacion.span("franjas.histogramas"):
+        analisis = analyze_histogram(strip_histogram(imagen, niveles, alto_franja))
+        if "CLAHE" in salidas:
+            clahe = metodos.method_parameters("CLAHE", **parametros.get("CLAHE", {}))
+            geometria = ClaheGeometry(alto, ancho, clahe["tile_grid_size"], niveles)
+            luts_clahe = build_clahe_luts(
+                clahe_tile_histograms(imagen, geometria, alto_franja),
+                geometria,
+                clahe["clip_limit"],
+            )
+
+    tablas = {
+        metodo: metodos.constructores_lut[metodo](analisis, **parametros.get(metodo, {}))
+        for metodo in salidas
+        if metodo != "CLAHE"
+    }
+    metricas = {
+        metodo: medidas.calculate_lut_metrics(analisis, tabla)
+        for metodo, tabla in tablas.items()
+    }
+
+    archivos = {
+        metodo: np.lib.format.open_memmap(ruta, mode="w+", dtype=imagen.dtype, shape=imagen.shape)
+        for metodo, ruta in salidas.items()
+    }
+    histograma_clahe = np.zeros(niveles)
+    error_clahe = 0.0
+
+    # Segunda pasada: aplicar las LUT y escribir cada franja
+    buffer = np.empty((min(alto_franja, alto), ancho), dtype=imagen.dtype)
+    for inicio, fin in iter_strips(alto, alto_franja):
+        with instrumentacion.span("franjas.leer"):
+            franja = np.ascontiguousarray(imagen[inicio:fin])
+        for metodo, tabla in tablas.items():
+            archivos[metodo][inicio:fin] = metodos.apply_lut(
+                franja, tabla, salida=buffer[: fin - inicio]
+            )
+        if "CLAHE" in salidas:
+            resultado = apply_clahe_strip(franja, inicio, luts_clahe, geometria)
+            archivos["CLAHE"][inicio:fin] = resultado
+            histograma_clahe += calculate_histogram(resultado, niveles)
+            for a, b in _bloques(fin - inicio, ancho):
+                diferencia = resultado[a:b].astype(np.int64) - franja[a:b]
+                error_clahe += float(np.einsum("ij,ij->", diferencia, diferencia))
+
+    for archivo in archivos.values():
+        archivo.flush()
+    if "CLAHE" in salidas:
+        metricas["CLAHE"] = medidas.calculate_output_metrics(
+            analisis, histograma_clahe, error_clahe
+        )
+    return metricas
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Mejora de imágenes que no entran en memoria, procesadas por franjas"
+    )
+    parser.add_argument("imagen", help="Imagen .npy (u otro formato, que se decodifica una vez)")
+    parser.add_argument("--salida", default="franjas", help="Carpeta para los .npy resultantes")
+    parser.add_argument(
+        "--metodos",
+        nargs="+",
+        choices=list(metodos.parametros_metodos),
+        default=list(metodos.parametros_metodos),
+    )
+    parser.add_argument(
+        "--alto-franja",
+        type=int,
+        default=alto_franja_por_defecto,
+        help="Filas por franja; acota la memoria usada",
+    )
+    parser.add_argument(
+        "--profundidad-nativa",
+        action="store_true",
+        help="Leer las imágenes de 16 bits sin convertirlas a 8 bits",
+    )
+    parser.add_argument(
+        "--perfil", action="store_true", help="Mostrar el tiempo de cada etapa al terminar"
+    )
+    args = parser.parse_args()
+
+    if args.perfil:
+        instrumentacion.enable()
+
+    imagen = open_image(args.imagen, args.profundidad_nativa)
+    os.makedirs(args.salida, exist_ok=True)
+    nombre = os.path.splitext(os.path.basename(args.imagen))[0]
+    salidas = {
+        metodo: os.path.join(args.salida, f"{nombre}_{metodo.lower()}.npy")
+        for metodo in args.metodos
+    }
+
+    metricas = process_large_image(imagen, salidas, args.alto_franja)
+    # Mantener la cache de imágenes dentro de su límite de tamaño
+    cache_imagenes.evict_images()
+
+    print(f"Imagen {imagen.shape[1]}x{imagen.shape[0]}, franjas de {args.alto_franja} filas")
+    print("Método   | AMBE (↓) | PSNR (↑) | Entropía | Contraste | Uniformidad")
+    print("-" * 70)
+    for metodo in args.metodos:
+        m = metricas[metodo]
+        print(
+            f"{metodo:<9}| {m['ambe']:8.2f} | {m['psnr']:8.2f} | {m['entropy']:8.2f} | "
+            f"{m['contrast']:9.2f} | {m['uniformity']:.4f}"
+        )
+
+    if args.perfil:
+        print()
+        print(instrumentacion.report())
+
+
+if __name__ == "__main__":
+    main()
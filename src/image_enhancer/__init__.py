@@ -0,0 +1,51 @@
+import importlib
+
+# ```
+# Biblioteca de mejora de contraste
+#
+# Punto de entrada importable de los metodos (metodos.py), la mejora en color
+# (color.py), el analisis de histograma (analisis.py) y las metricas
+# (medidas.py). Los nombres se resuelven al primer uso: importar el paquete no
+# carga numpy ni OpenCV, y cada funcion trae solo el modulo que la define.
+#
+# Ejemplo:
+#   import image_enhancer
+#   salida = image_enhancer.apply_clahe(imagen)
+#   salidas, metricas = image_enhancer.enhance_color(lote, ["HE", "BHEPL-D"], con_metricas=True)
+
+__version__ = "0.1.0"
+
+# Nombre público -> módulo que lo define
+_exportados = {
+    "apply_clahe": "metodos",
+    "apply_histogram_equalization": "metodos",
+    "apply_dqhepl": "metodos",
+    "apply_bhepl_d": "metodos",
+    "apply_batch": "metodos",
+    "apply_lut": "metodos",
+    "apply_approximate": "metodos",
+    "constructores_lut": "metodos",
+    "parametros_metodos": "metodos",
+    "enhance_color": "color",
+    "espacios_color": "color",
+    "analyze_image": "analisis",
+    "analyze_images": "analisis",
+    "read_image_as_grayscale": "medidas",
+    "read_image_color": "medidas",
+    "calculate_image_metrics": "medidas",
+    "calculate_lut_metrics": "medidas",
+}
+
+__all__ = list(_exportados)
+
+
+def __getattr__(nombre):
+    if nombre not in _exportados:
+        raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
+    valor = getattr(importlib.import_module(f".{_exportados[nombre]}", __name__), nombre)
+    globals()[nombre] = valor
+    return valor
+
+
+def __dir__():
+    return sorted([*globals(), *__all__])
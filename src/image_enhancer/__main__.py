@@ -0,0 +1,3 @@
+from image_enhancer.cli import main
+
+main()
@@ -0,0 +1,376 @@
+import sys
+import json
+import math
+import numpy as np
+
+# ```
+# Estadisticas agregadas con memoria acotada
+#
+# El resumen de una ejecucion (media, desvio, minimo, maximo, mediana y
+# percentiles de cada metrica por metodo) se acumula registro a registro sin
+# guardar los valores individuales:
+#
+# - Momentos: cantidad, media y suma de cuadrados de las desviaciones
+#   (Welford), combinables entre procesos o ejecuciones con la formula de Chan.
+# - Cuantiles: un sketch que guarda los valores exactos hasta 'capacidad_exacta'
+#   (los resumenes chicos coinciden con np.median) y despues pasa a buckets
+#   logaritmicos con error relativo 'precision' (como DDSketch), con una
+#   cantidad maxima de buckets. Los valores nuevos se acumulan en un buffer y
+#   se asignan a sus buckets de a bloques con operaciones de NumPy.
+#
+# Todo el estado es combinable (merge) y serializable a JSON.
+
+
+class QuantileSketch:
+    """Sketch combinable de cuantiles con error relativo acotado y memoria acotada."""
+
+    # Valores que se acumulan antes de asignarlos a los buckets
+    tamaño_buffer = 4096
+
+    def __init__(self, precision=0.002, capacidad_exacta=4096, max_buckets=8192):
+        self.precision = precision
+        self.capacidad_exacta = capacidad_exacta
+        self.max_buckets = max_buckets
+        self.gamma = (1 + precision) / (1 - precision)
+        self.log_gamma = math.log(self.gamma)
+
+        self.exactos = []
+        self.buffer = []
+        self.positivos = {}
+        self.negativos = {}
+        self.ceros = 0
+        self.cantidad = 0
+
+    def _valor(self, indice):
+        """Valor representativo de un bucket (error relativo <= precision)."""
+        return 2 * self.gamma**indice / (self.gamma + 1)
+
+    def _agregar_a_buckets(self, valores):
+        """Asigna un arreglo de valores a sus buckets: gamma**(i-1) < |valor| <= gamma**i."""
+        valores = np.asarray(valores, dtype=np.float64)
+        for buckets, magnitudes in (
+            (self.positivos, valores[valores > 0]),
+            (self.negativos, -valores[valores < 0]),
+        ):
+            if len(magnitudes) == 0:
+                continue
+            indices = np.ceil(np.log(magnitudes) / self.log_gamma).astype(np.int64)
+            unicos, veces = np.unique(indices, return_counts=True)
+            for indice, n in zip(unicos.tolist(), veces.tolist()):
+                buckets[indice] = buckets.get(indice, 0) + n
+        self.ceros += int(np.count_nonzero(valores == 0))
+        self._limitar_buckets()
+
+    def _vaciar_buffer(self):
+        """Asigna a los buckets los valores acumulados en el buffer."""
+        if self.buffer:
+            self._agregar_a_buckets(self.buffer)
+            self.buffer = []
+
+    def _pasar_a_buckets(self):
+        """Mueve los valores exactos a los buckets logarítmicos."""
+        self._agregar_a_buckets(self.exactos)
+        self.exactos = None
+
+    def _limitar_buckets(self):
+        """Une los buckets de menor magnitud cuando se supera max_buckets."""
+        for buckets in (self.positivos, self.negativos):
+            if len(buckets) <= self.max_buckets:
+                continue
+            indices = sorted(buckets)
+            sobrantes = indices[: len(indices) - self.max_buckets + 1]
+            destino = sobrantes[-1]
+            buckets[destino] = sum(buckets.pop(i) for i in sobrantes[:-1]) + buckets[destino]
+
+    @property
+    def es_exacto(self):
+        """Indica si el sketch todavía guarda los valores exactos."""
+        return self.exactos is not None
+
+    def add(self, valor):
+        """Agrega un valor (los NaN se ignoran)."""
+        valor = float(valor)
+        if math.isnan(valor):
+            return
+        self.cantidad += 1
+        if self.exactos is not None:
+            self.exactos.append(valor)
+            if len(self.exactos) > self.capacidad_exacta:
+                self._pasar_a_buckets()
+            return
+        self.buffer.append(valor)
+        if len(self.buffer) >= self.tamaño_buffer:
+            self._vaciar_buffer()
+
+    def merge(self, otro):
+        """Agrega a este sketch los valores de otro."""
+        self.cantidad += otro.cantidad
+        if self.exactos is not None and otro.exactos is not None:
+            self.exactos.extend(otro.exactos)
+            if len(self.exactos) > self.capacidad_exacta:
+                self._pasar_a_buckets()
+            return
+
+        if self.exactos is not None:
+            self._pasar_a_buckets()
+        self._vaciar_buffer()
+        if otro.exactos is not None:
+            self._agregar_a_buckets(otro.exactos)
+        else:
+            self._agregar_a_buckets(otro.buffer)
+            for indice, veces in otro.positivos.items():
+                self.positivos[indice] = self.positivos.get(indice, 0) + veces
+            for indice, veces in otro.negativos.items():
+                self.negativos[indice] = self.negativos.get(indice, 0) + veces
+            self.ceros += otro.ceros
+            self._limitar_buckets()
+
+    def quantile(self, q):
+        """
+        Cuantil q (entre 0 y 1). Con los valores exactos coincide con np.quantile;
+        con buckets tiene error relativo de a lo sumo 'precision'.
+        """
+        if self.cantidad == 0:
+            return float("nan")
+        if self.exactos is not None:
+            return float(np.quantile(self.exactos, q))
+        self._vaciar_buffer()
+
+        # Rango del cuantil con la misma interpolación lineal que np.quantile
+        rango = q * (self.cantidad - 1)
+        inferior = self._valor_en_rango(math.floor(rango))
+        superior = self._valor_en_rango(math.ceil(rango))
+        fraccion = rango - math.floor(rango)
+        return inferior + (superior - inferior) * fraccion
+
+    def _valor_en_rango(self, rango):
+        """Valor aproximado del elemento número 'rango' (desde 0) en orden ascendente."""
+        acumulado = 0
+        for indice in sorted(self.negativos, reverse=True):
+            acumulado += self.negativos[indice]
+            if acumulado > rango:
+                return -self._valor(indice)
+        acumulado += self.ceros
+        if acumulado > rango:
+            return 0.0
+        for indice in sorted(self.positivos):
+            acumulado += self.positivos[indice]
+            if acumulado > rango:
+                return self._valor(indice)
+        return self._valor(max(self.positivos)) if self.positivos else 0.0
+
+    def to_dict(self):
+        """Estado serializable a JSON."""
+        if self.exactos is None:
+            self._vaciar_buffer()
+        return {
+            "precision": self.precision,
+            "capacidad_exacta": self.capacidad_exacta,
+            "max_buckets": self.max_buckets,
+            "cantidad": self.cantidad,
+            "exactos": self.exactos,
+            "positivos": {str(i): n for i, n in self.positivos.items()},
+            "negativos": {str(i): n for i, n in self.negativos.items()},
+            "ceros": self.ceros,
+        }
+
+    @classmethod
+    def from_dict(cls, datos):
+        """Reconstruye un sketch desde to_dict()."""
+        sketch = cls(datos["precision"], datos["capacidad_exacta"], datos["max_buckets"])
+        sketch.cantidad = datos["cantidad"]
+        sketch.exactos = datos["exactos"]
+        sketch.positivos = {int(i): n for i, n in datos["positivos"].items()}
+        sketch.negativos = {int(i): n for i, n in datos["negativos"].items()}
+        sketch.ceros = datos["ceros"]
+        return sketch
+
+
+class MetricsAggregator:
+    """
+    Resumen de métricas por método con memoria constante. Los momentos se
+    guardan como arreglos (métodos x métricas) y cada celda tiene su sketch de
+    cuantiles.
+    """
+
+    def __init__(self, nombres_metodos, nombres_metricas, precision=0.002, capacidad_exacta=4096):
+        self.nombres_metodos = list(nombres_metodos)
+        self.nombres_metricas = list(nombres_metricas)
+        forma = (len(self.nombres_metodos), len(self.nombres_metricas))
+
+        self.cantidad = np.zeros(forma, dtype=np.int64)
+        self.media = np.zeros(forma)
+        self.m2 = np.zeros(forma)
+        self.minimo = np.full(forma, np.inf)
+        self.maximo = np.full(forma, -np.inf)
+        self.sketches = [
+            [QuantileSketch(precision, capacidad_exacta) for _ in self.nombres_metricas]
+            for _ in self.nombres_metodos
+        ]
+
+    def _celda(self, metodo, metrica):
+        return self.nombres_metodos.index(metodo), self.nombres_metricas.index(metrica)
+
+    def update(self, registro):
+        """
+        Agrega el registro de una imagen: matriz métodos x métricas. Las celdas
+        NaN (por ejemplo el tiempo de un resultado tomado de la cache) se ignoran.
+        """
+        registro = np.asarray(registro, dtype=np.float64)
+        presentes = ~np.isnan(registro)
+        self.cantidad += presentes
+        delta = np.where(presentes, registro - self.media, 0)
+        self.media += delta / np.maximum(self.cantidad, 1)
+        self.m2 += delta * np.where(presentes, registro - self.media, 0)
+        np.fmin(self.minimo, registro, out=self.minimo)
+        np.fmax(self.maximo, registro, out=self.maximo)
+
+        for fila, sketches in zip(registro, self.sketches):
+            for valor, sketch in zip(fila, sketches):
+                sketch.add(valor)
+
+    def update_value(self, metodo, metrica, valor):
+        """Agrega un solo valor de una métrica de un método (los NaN se ignoran)."""
+        if valor is None or math.isnan(valor):
+            return
+        i, j = self._celda(metodo, metrica)
+        self.cantidad[i, j] += 1
+        delta = valor - self.media[i, j]
+        self.media[i, j] += delta / self.cantidad[i, j]
+        self.m2[i, j] += delta * (valor - self.media[i, j])
+        self.minimo[i, j] = min(self.minimo[i, j], valor)
+        self.maximo[i, j] = max(self.maximo[i, j], valor)
+        self.sketches[i][j].add(valor)
+
+    def merge(self, otro):
+        """Agrega los datos de otro agregador (otro proceso, shard o ejecución)."""
+        if otro.nombres_metodos != self.nombres_metodos or otro.nombres_metricas != self.nombres_metricas:
+            raise ValueError("Los agregadores tienen métodos o métricas distintos")
+
+        total = self.cantidad + otro.cantidad
+        divisor = np.maximum(total, 1)
+        delta = otro.media - self.media
+        self.media = self.media + delta * otro.cantidad / divisor
+        self.m2 = self.m2 + otro.m2 + delta**2 * self.cantidad * otro.cantidad / divisor
+        self.cantidad = total
+        np.minimum(self.minimo, otro.minimo, out=self.minimo)
+        np.maximum(self.maximo, otro.maximo, out=self.maximo)
+
+        for propios, ajenos in zip(self.sketches, otro.sketches):
+            for sketch, ajeno in zip(propios, ajenos):
+                sketch.merge(ajeno)
+
+    def count(self, metodo, metrica="ambe"):
+        """Cantidad de valores de una métrica de un método."""
+        return int(self.cantidad[self._celda(metodo, metrica)])
+
+    def mean(self, metodo, metrica):
+        """Media de una métrica de un método."""
+        i, j = self._celda(metodo, metrica)
+        return float(self.media[i, j]) if self.cantidad[i, j] else float("nan")
+
+    def std(self, metodo, metrica):
+        """Desvío estándar poblacional (como np.std) de una métrica de un método."""
+        i, j = self._celda(metodo, metrica)
+        return float(np.sqrt(self.m2[i, j] / self.cantidad[i, j])) if self.cantidad[i, j] else float("nan")
+
+    def min(self, metodo, metrica):
+        """Mínimo de una métrica de un método."""
+        return float(self.minimo[self._celda(metodo, metrica)])
+
+    def max(self, metodo, metrica):
+        """Máximo de una métrica de un método."""
+        return float(self.maximo[self._celda(metodo, metrica)])
+
+    def quantile(self, metodo, metrica, q):
+        """Cuantil q (entre 0 y 1) de una métrica de un método."""
+        i, j = self._celda(metodo, metrica)
+        return self.sketches[i][j].quantile(q)
+
+    def median(self, metodo, metrica):
+        """Mediana de una métrica de un método."""
+        return self.quantile(metodo, metrica, 0.5)
+
+    def to_dict(self):
+        """Estado serializable a JSON."""
+        return {
+            "nombres_metodos": self.nombres_metodos,
+            "nombres_metricas": self.nombres_metricas,
+            "cantidad": self.cantidad.tolist(),
+            "media": self.media.tolist(),
+            "m2": self.m2.tolist(),
+            "minimo": self.minimo.tolist(),
+            "maximo": self.maximo.tolist(),
+            "sketches": [[s.to_dict() for s in fila] for fila in self.sketches],
+        }
+
+    @classmethod
+    def from_dict(cls, datos):
+        """Reconstruye un agregador desde to_dict()."""
+        agregado = cls(datos["nombres_metodos"], datos["nombres_metricas"])
+        agregado.cantidad = np.array(datos["cantidad"], dtype=np.int64)
+        agregado.media = np.array(datos["media"], dtype=np.float64)
+        agregado.m2 = np.array(datos["m2"], dtype=np.float64)
+        agregado.minimo = np.array(datos["minimo"], dtype=np.float64)
+        agregado.maximo = np.array(datos["maximo"], dtype=np.float64)
+        agregado.sketches = [
+            [QuantileSketch.from_dict(s) for s in fila] for fila in datos["sketches"]
+        ]
+        return agregado
+
+    def save(self, ruta):
+        """Guarda el agregador en un archivo JSON."""
+        with open(ruta, "w") as archivo:
+            json.dump(self.to_dict(), archivo)
+
+    @classmethod
+    def load(cls, ruta):
+        """Lee un agregador guardado con save()."""
+        with open(ruta) as archivo:
+            return cls.from_dict(json.load(archivo))
+
+
+def format_summary(agregado):
+    """Tabla de resumen (media y mediana de cada métrica, tiempo medio en ms) por método."""
+    lineas = [
+        "Método       | AMBE (↓)        | PSNR (↑)       | Entropía       | Contraste     | Uniformidad   | Tiempo (ms)",
+        "             | Media   Mediana | Media  Mediana | Media Mediana  | Media Mediana | Media Mediana | Media",
+        "-" * 120,
+    ]
+    for metodo in agregado.nombres_metodos:
+        # Solo si hay datos procesados
+        if not agregado.count(metodo):
+            continue
+
+        def m(metrica):
+            return agregado.mean(metodo, metrica)
+
+        def md(metrica):
+            return agregado.median(metodo, metrica)
+
+        lineas.append(
+            f"{metodo:<12}| "
+            f"{m('ambe'):6.2f}  {md('ambe'):6.2f} | "
+            f"{m('psnr'):6.2f}  {md('psnr'):6.2f} | "
+            f"{m('entropy'):5.2f}  {md('entropy'):5.2f} | "
+            f"{m('contrast'):6.2f}  {md('contrast'):6.2f} | "
+            f"{m('uniformity'):5.4f}  {md('uniformity'):5.4f} | "
+            # Sin tiempos medidos si todos los resultados salieron de la cache
+            + (f"{m('time')*1000:7.2f}" if agregado.count(metodo, "time") else f"{'-':>7}")
+        )
+    return "\n".join(lineas)
+
+
+def main():
+    """Combina agregadores guardados (por ejemplo de distintos shards) y muestra su resumen."""
+    if len(sys.argv) < 2:
+        raise SystemExit("Uso: python -m image_enhancer.agregados agregado.json [agregado.json ...]")
+
+    agregado = MetricsAggregator.load(sys.argv[1])
+    for ruta in sys.argv[2:]:
+        agregado.merge(MetricsAggregator.load(ruta))
+    print(format_summary(agregado))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+import cv2
+import numpy as np
+from dataclasses import dataclass
+from .instrumentacion import instrumented
+
+# ```
+# Analisis compartido de una imagen
+#
+# Todos los metodos de LUT global y las metricas en el dominio del histograma
+# parten de los mismos datos: histograma, CDF, extremos, cuartiles y media.
+# Se calculan una sola vez por imagen (una pasada sobre los pixeles para el
+# histograma, el resto en O(256)) y se reutilizan.
+#
+# El analisis tambien puede representar un lote de N imagenes: en ese caso el
+# histograma tiene forma (N, 256) y cada campo escalar es un vector de N.
+#
+# Las imagenes de 16 bits (radiometricas) se analizan en su profundidad nativa:
+# el histograma tiene un bin por nivel (65536, o 2**bits si se indica otra
+# cantidad de niveles, por ejemplo 16384 para un sensor de 14 bits).
+
+
+@dataclass(frozen=True)
+class ImageAnalysis:
+    """
+    Estadísticas de una imagen en escala de grises derivadas de su histograma,
+    o de un lote de imágenes si el histograma tiene forma (N, 256).
+    """
+
+    histograma: np.ndarray
+    cdf: np.ndarray
+    total_pixeles: float
+    intensidad_min: int
+    intensidad_max: int
+    q1: int
+    q2: int
+    q3: int
+    media: float
+
+
+def image_levels(imagen):
+    """Cantidad de niveles de gris según el tipo de la imagen (256 u 65536)."""
+    return np.iinfo(imagen.dtype).max + 1
+
+
+@instrumented("analisis.calculate_histogram")
+def calculate_histogram(imagen, niveles=None):
+    """
+    Calcula el histograma de la imagen como vector float64, con un bin por nivel.
+    Por defecto usa 256 niveles para imágenes de 8 bits y 65536 para las de 16 bits;
+    los píxeles con valor mayor o igual a 'niveles' no se cuentan.
+
+    En 16 bits el histograma cubre siempre los 65536 niveles, no solo el rango
+    [min, max] observado: restringirlo necesita una pasada más (cv2.minMaxLoc)
+    y las LUT igual se construyen con un bin por nivel. Medido con cuadros
+    térmicos sintéticos, el análisis completo pasaba de 1.35 a 1.05 ms en
+    640x512 pero de 2.58 a 2.73 ms en 1920x1080, sin ganancia clara.
+    """
+    if niveles is None:
+        niveles = image_levels(imagen)
+    histograma = cv2.calcHist([imagen], [0], None, [niveles], [0, niveles])
+    return histograma.ravel().astype(np.float64)
+
+
+def calculate_histograms(imagenes, niveles=None):
+    """
+    Calcula los histogramas de un lote de imágenes, ya sea un arreglo (N, H, W)
+    o una lista de imágenes de distinto tamaño. Devuelve un arreglo (N, niveles).
+    """
+    if niveles is None:
+        niveles = image_levels(imagenes[0]) if len(imagenes) else 256
+    histogramas = np.empty((len(imagenes), niveles), dtype=np.float64)
+    for i, imagen in enumerate(imagenes):
+        histogramas[i] = calculate_histogram(imagen, niveles)
+    return histogramas
+
+
+@instrumented("analisis.analyze_histogram")
+def analyze_histogram(histograma):
+    """
+    Construye el análisis de una imagen a partir de su histograma (un bin por
+    nivel), o de un lote de imágenes a partir de un arreglo de histogramas (N, niveles).
+    """
+    histograma = np.asarray(histograma, dtype=np.float64)
+    niveles = histograma.shape[-1]
+    total_pixeles = histograma.sum(axis=-1)
+    cdf = histograma.cumsum(axis=-1)
+    total = total_pixeles[..., None]
+
+    # Valores de intensidad minimos y maximos presentes en la imagen
+    usados = histograma > 0
+    intensidad_min = np.argmax(usados, axis=-1)
+    intensidad_max = niveles - 1 - np.argmax(usados[..., ::-1], axis=-1)
+
+    # Cuartiles: primer nivel cuya CDF alcanza el 25%, 50% y 75% de los pixeles
+    q1 = np.argmax(cdf >= 0.25 * total, axis=-1)
+    q2 = np.argmax(cdf >= 0.5 * total, axis=-1)
+    q3 = np.argmax(cdf >= 0.75 * total, axis=-1)
+
+    media = np.sum(np.arange(niveles) * (histograma / total), axis=-1)
+
+    return ImageAnalysis(
+        histograma=histograma,
+        cdf=cdf,
+        total_pixeles=total_pixeles,
+        intensidad_min=intensidad_min,
+        intensidad_max=intensidad_max,
+        q1=q1,
+        q2=q2,
+        q3=q3,
+        media=media,
+    )
+
+
+def analyze_image(imagen, niveles=None):
+    """Calcula el análisis compartido de una imagen con una sola pasada de histograma."""
+    return analyze_histogram(calculate_histogram(imagen, niveles))
+
+
+# ```
+# Histograma muestreado
+#
+# Para el modo aproximado el histograma se calcula sobre una muestra de los
+# pixeles. Con "filas" se toma una de cada k filas completas: es una vista sin
+# copia y cv2.calcHist la recorre directamente, por lo que es la opcion mas
+# rapida. "rejilla" toma una de cada k' filas y columnas (k' = raiz de k) y
+# reparte la muestra de forma mas pareja; "aleatorio" elige pixeles al azar.
+# El histograma es el de la muestra, sin escalar al total de la imagen.
+
+modos_muestreo = ["filas", "rejilla", "aleatorio"]
+
+
+def sample_pixels(imagen, fraccion, muestreo="filas", semilla=0):
+    """Muestra de aproximadamente 'fraccion' de los píxeles de la imagen."""
+    if muestreo not in modos_muestreo:
+        raise ValueError(f"Modo de muestreo no soportado: {muestreo}")
+    if fraccion >= 1:
+        return imagen
+
+    if muestreo == "filas":
+        paso = max(1, round(1 / fraccion))
+        return imagen[paso // 2 :: paso]
+    if muestreo == "rejilla":
+        paso = max(1, round(1 / np.sqrt(fraccion)))
+        return imagen[paso // 2 :: paso, paso // 2 :: paso]
+
+    cantidad = max(1, round(imagen.size * fraccion))
+    indices = np.random.default_rng(semilla).integers(0, imagen.size, cantidad)
+    return np.ascontiguousarray(imagen).reshape(-1)[indices][None, :]
+
+
+@instrumented("analisis.calculate_sampled_histogram")
+def calculate_sampled_histogram(imagen, fraccion, muestreo="filas", niveles=None):
+    """Histograma de una muestra de aproximadamente 'fraccion' de los píxeles."""
+    if niveles is None:
+        niveles = image_levels(imagen)
+    return calculate_histogram(sample_pixels(imagen, fraccion, muestreo), niveles)
+
+
+def analyze_image_sampled(imagen, fraccion, muestreo="filas", niveles=None):
+    """Análisis aproximado de una imagen a partir del histograma de una muestra de píxeles."""
+    return analyze_histogram(calculate_sampled_histogram(imagen, fraccion, muestreo, niveles))
+
+
+def analyze_images(imagenes, niveles=None):
+    """Calcula el análisis de un lote de imágenes (arreglo (N, H, W) o lista)."""
+    return analyze_histogram(calculate_histograms(imagenes, niveles))
+
+
+def as_analysis(datos):
+    """Devuelve un ImageAnalysis a partir de un análisis ya hecho o de un histograma."""
+    if isinstance(datos, ImageAnalysis):
+        return datos
+    return analyze_histogram(datos)
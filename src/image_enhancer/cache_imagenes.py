@@ -0,0 +1,139 @@
+import os
+import hashlib
+import numpy as np
+from . import medidas
+from . import instrumentacion
+from .instrumentacion import instrumented
+
+# ```
+# Cache en disco de imagenes decodificadas
+#
+# Cada imagen en escala de grises se guarda como un .npy sin comprimir en una
+# carpeta propia del archivo de origen (un hash de su ruta), con un nombre que
+# incluye su mtime y su tamaño. Si el archivo cambia, su clave cambia y la
+# entrada vieja se borra en la siguiente lectura mirando solo esa carpeta. Las
+# entradas se abren con np.load(mmap_mode="r"), es decir, sin copiar ni
+# decodificar los pixeles. Las lecturas en profundidad nativa (16 bits) tienen
+# sus propias entradas.
+#
+# Cada acierto actualiza el mtime de la entrada, y evict_images borra las menos
+# usadas recientemente cuando la cache supera su límite de tamaño.
+
+directorio_cache = ".cache/imagenes"
+limite_cache = 512 * 1024 * 1024
+
+
+def _prefijo(path, profundidad_nativa=False):
+    """Prefijo de las entradas de cache que pertenecen a un archivo de origen."""
+    ruta_absoluta = os.path.abspath(path)
+    if profundidad_nativa:
+        ruta_absoluta += "|nativa"
+    return hashlib.sha1(ruta_absoluta.encode("utf-8")).hexdigest()
+
+
+def cache_entry_path(path, directorio=directorio_cache, profundidad_nativa=False):
+    """Devuelve la ruta de la entrada de cache vigente para el archivo indicado."""
+    info = os.stat(path)
+    carpeta = os.path.join(directorio, _prefijo(path, profundidad_nativa))
+    return os.path.join(carpeta, f"{info.st_mtime_ns}_{info.st_size}.npy")
+
+
+def _borrar_entradas_viejas(vigente):
+    """Elimina las demás entradas del mismo archivo de origen (las de su carpeta)."""
+    carpeta = os.path.dirname(vigente)
+    for nombre in os.listdir(carpeta):
+        ruta = os.path.join(carpeta, nombre)
+        if nombre.endswith(".npy") and ruta != vigente:
+            try:
+                os.remove(ruta)
+            except FileNotFoundError:
+                pass
+
+
+@instrumented("cache_imagenes.read_image_cached")
+def read_image_cached(path, directorio=directorio_cache, profundidad_nativa=False):
+    """
+    Lee una imagen en escala de grises usando la cache en disco. En un acierto
+    devuelve un arreglo de solo lectura mapeado en memoria; en un fallo decodifica
+    la imagen, la guarda en la cache y la devuelve.
+    """
+    entrada = cache_entry_path(path, directorio, profundidad_nativa)
+
+    if os.path.exists(entrada):
+        try:
+            imagen = np.load(entrada, mmap_mode="r")
+            instrumentacion.count("cache_imagenes.aciertos")
+        except (OSError, ValueError):
+            # Entrada corrupta o incompleta: se vuelve a generar
+            pass
+        else:
+            # Marca la entrada como usada recientemente para el desalojo LRU
+            try:
+                os.utime(entrada)
+            except OSError:
+                pass
+            return imagen
+
+    instrumentacion.count("cache_imagenes.fallos")
+    imagen = medidas.read_image_as_grayscale(path, profundidad_nativa)
+    if imagen is None:
+        return None
+
+    os.makedirs(os.path.dirname(entrada), exist_ok=True)
+    _borrar_entradas_viejas(entrada)
+
+    # Escritura atómica para que otros procesos nunca lean una entrada a medias
+    temporal = f"{entrada}.{os.getpid()}.tmp"
+    with open(temporal, "wb") as archivo:
+        np.save(archivo, imagen)
+    os.replace(temporal, entrada)
+
+    return imagen
+
+
+@instrumented("cache_imagenes.evict_images")
+def evict_images(directorio=directorio_cache, limite_bytes=limite_cache):
+    """
+    Borra las entradas usadas menos recientemente hasta que la cache ocupe como
+    máximo 'limite_bytes'. Devuelve la cantidad de entradas borradas.
+    """
+    if not os.path.isdir(directorio):
+        return 0
+
+    # Entradas de cada carpeta de origen, y las sueltas de la disposición anterior
+    candidatas = []
+    for elemento in os.scandir(directorio):
+        if elemento.is_dir():
+            candidatas.extend(os.scandir(elemento.path))
+        else:
+            candidatas.append(elemento)
+
+    entradas = []
+    for entrada in candidatas:
+        if not entrada.name.endswith(".npy"):
+            continue
+        try:
+            info = entrada.stat()
+        except FileNotFoundError:
+            continue
+        entradas.append((info.st_mtime_ns, info.st_size, entrada.path))
+
+    # Las más recientes primero; se conservan mientras entren en el límite
+    entradas.sort(reverse=True)
+    ocupado = 0
+    borradas = 0
+    for _, tamaño, ruta in entradas:
+        ocupado += tamaño
+        if ocupado > limite_bytes:
+            try:
+                os.remove(ruta)
+                borradas += 1
+            except FileNotFoundError:
+                continue
+            # La carpeta del archivo de origen se quita si quedó vacía
+            if os.path.dirname(ruta) != directorio:
+                try:
+                    os.rmdir(os.path.dirname(ruta))
+                except OSError:
+                    pass
+    return borradas
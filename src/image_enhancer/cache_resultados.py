@@ -0,0 +1,145 @@
+import os
+import json
+import inspect
+import hashlib
+import functools
+import numpy as np
+from . import analisis
+from . import medidas
+from . import metodos
+from . import instrumentacion
+from .instrumentacion import instrumented
+
+# ```
+# Cache persistente de resultados por método
+#
+# Cada entrada guarda lo que produjo un método sobre una imagen: sus métricas
+# (sin el tiempo, que depende de la ejecución en que se midió), las métricas de
+# la original y, en los métodos globales, su LUT. Las imágenes de salida no se
+# guardan: reaplicar la LUT es más barato que leerlas del disco. La clave
+# combina el hash del contenido de la imagen, el nombre del método, sus
+# parámetros y la versión del código (el código fuente de las funciones del
+# método y de las métricas). Así, al modificar un solo método solo se
+# recalculan sus resultados.
+#
+# Las entradas son .npz escritos de forma atómica. Cada lectura actualiza el
+# mtime de la entrada, y evict_results borra las menos usadas recientemente
+# cuando la cache supera su límite de tamaño.
+
+directorio_resultados = ".cache/resultados"
+limite_resultados = 256 * 1024 * 1024
+
+
+def image_hash(imagen):
+    """Hash del contenido de la imagen (tipo, forma y píxeles)."""
+    imagen = np.ascontiguousarray(imagen)
+    resumen = hashlib.sha1(f"{imagen.dtype.str}{imagen.shape}".encode("utf-8"))
+    resumen.update(memoryview(imagen).cast("B"))
+    return resumen.hexdigest()
+
+
+def _fuente(objeto):
+    """Código fuente de una función o módulo."""
+    return inspect.getsource(objeto)
+
+
+@functools.lru_cache(maxsize=None)
+def _version_metricas():
+    """Versión del código de análisis y métricas, compartida por todos los métodos."""
+    codigo = _fuente(analisis) + _fuente(medidas)
+    return hashlib.sha1(codigo.encode("utf-8")).hexdigest()
+
+
+@functools.lru_cache(maxsize=None)
+def method_version(metodo):
+    """Versión de un método: hash del código de sus funciones y de las métricas."""
+    codigo = "".join(_fuente(funcion) for funcion in metodos.funciones_metodos[metodo])
+    codigo += _version_metricas()
+    return hashlib.sha1(codigo.encode("utf-8")).hexdigest()
+
+
+def result_key(hash_imagen, metodo):
+    """Clave de la entrada de un método aplicado a una imagen con los parámetros actuales."""
+    parametros = json.dumps(metodos.parametros_metodos[metodo], sort_keys=True)
+    texto = f"{hash_imagen}|{metodo}|{parametros}|{method_version(metodo)}"
+    return hashlib.sha1(texto.encode("utf-8")).hexdigest()
+
+
+def _ruta_entrada(clave, directorio):
+    """Ruta del archivo de una entrada."""
+    return os.path.join(directorio, f"{clave}.npz")
+
+
+@instrumented("cache_resultados.read_result")
+def read_result(clave, directorio=directorio_resultados):
+    """
+    Devuelve un diccionario con los campos guardados en la entrada ("metricas",
+    "originales" y/o "lut"), o None si la entrada no existe o no se puede leer.
+    """
+    ruta = _ruta_entrada(clave, directorio)
+    try:
+        with np.load(ruta) as archivo:
+            campos = {nombre: archivo[nombre] for nombre in archivo.files}
+    except (OSError, ValueError):
+        instrumentacion.count("cache_resultados.fallos")
+        return None
+    instrumentacion.count("cache_resultados.aciertos")
+
+    # Marca la entrada como usada recientemente para el desalojo LRU
+    try:
+        os.utime(ruta)
+    except OSError:
+        pass
+    return campos
+
+
+@instrumented("cache_resultados.write_result")
+def write_result(clave, directorio=directorio_resultados, **campos):
+    """
+    Guarda la entrada indicada con los campos dados (por ejemplo metricas=...,
+    lut=...), reemplazando la entrada anterior si existía.
+    """
+    ruta = _ruta_entrada(clave, directorio)
+    os.makedirs(directorio, exist_ok=True)
+
+    # Escritura atómica para que otros procesos nunca lean una entrada a medias
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    with open(temporal, "wb") as archivo:
+        np.savez(archivo, **campos)
+    os.replace(temporal, ruta)
+    instrumentacion.count("cache_resultados.escrituras")
+
+
+@instrumented("cache_resultados.evict_results")
+def evict_results(directorio=directorio_resultados, limite_bytes=limite_resultados):
+    """
+    Borra las entradas usadas menos recientemente hasta que la cache ocupe como
+    máximo 'limite_bytes'. Devuelve la cantidad de entradas borradas.
+    """
+    if not os.path.isdir(directorio):
+        return 0
+
+    entradas = []
+    for nombre in os.listdir(directorio):
+        if not nombre.endswith(".npz"):
+            continue
+        ruta = os.path.join(directorio, nombre)
+        try:
+            info = os.stat(ruta)
+        except FileNotFoundError:
+            continue
+        entradas.append((info.st_mtime_ns, info.st_size, ruta))
+
+    # Las más recientes primero; se conservan mientras entren en el límite
+    entradas.sort(reverse=True)
+    ocupado = 0
+    borradas = 0
+    for _, tamaño, ruta in entradas:
+        ocupado += tamaño
+        if ocupado > limite_bytes:
+            try:
+                os.remove(ruta)
+                borradas += 1
+            except FileNotFoundError:
+                pass
+    return borradas
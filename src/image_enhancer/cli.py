@@ -0,0 +1,137 @@
+import os
+import sys
+import json
+import argparse
+
+# ```
+# Comando image-enhancer
+#
+# Subcomandos:
+#   metrics     metricas de todo el dataset (main.py sin flags)
+#   images      imagenes procesadas en 'procesadas/' (main.py --imagenes)
+#   histograms  histogramas en 'histogramas/' (main.py --histogramas)
+#   enhance     aplica los metodos a las imagenes indicadas
+#
+# Los tres primeros aceptan las mismas opciones que main.py. Para que una
+# llamada corta (por ejemplo 'enhance' sobre una sola imagen) no pague
+# importaciones que no usa, el modulo dataset (el programa de main.py) y sus
+# dependencias (cache, SQLite, graficos) se importan solo si el subcomando
+# elegido es uno de esos modos.
+#
+# Ejemplos:
+#   image-enhancer metrics --workers 4 --perfil
+#   image-enhancer images --todas --color
+#   image-enhancer enhance foto.png --metodos CLAHE HE --metricas
+
+# Subcomando -> flags de main.py que elige el modo
+modos_dataset = {
+    "metrics": {},
+    "images": {"imagenes": True},
+    "histograms": {"histogramas": True},
+}
+
+
+def enhance(args):
+    """Aplica los métodos a cada imagen y guarda las salidas en args.salida."""
+    import cv2
+    from . import color, medidas
+
+    os.makedirs(args.salida, exist_ok=True)
+    for ruta in args.entradas:
+        if args.color:
+            imagen = medidas.read_image_color(ruta, args.profundidad_nativa)
+        else:
+            imagen = medidas.read_image_as_grayscale(ruta, args.profundidad_nativa)
+        if imagen is None:
+            print(f"Error procesando {ruta}: no se pudo leer la imagen", file=sys.stderr)
+            continue
+
+        salidas, metricas = color.enhance_color(
+            imagen, args.metodos, args.espacio_color, args.metricas
+        )
+        nombre = os.path.splitext(os.path.basename(ruta))[0]
+        for metodo, salida in salidas.items():
+            sufijo = metodo.lower().replace("-", "_")
+            cv2.imwrite(os.path.join(args.salida, f"{nombre}_{sufijo}.png"), salida)
+
+        if args.metricas:
+            valores = {
+                metodo: {medida: float(valor) for medida, valor in por_metodo.items()}
+                for metodo, por_metodo in metricas.items()
+            }
+            print(json.dumps({"imagen": ruta, "metricas": valores}, ensure_ascii=False))
+
+
+def build_parser(subcomando=None):
+    """
+    Parser del comando. Las opciones de main.py se agregan solo al subcomando
+    de dataset que se va a ejecutar, para no importar el módulo dataset en los
+    demás casos.
+    """
+    from . import color, metodos
+
+    parser = argparse.ArgumentParser(
+        prog="image-enhancer", description="Mejora de contraste de imágenes"
+    )
+    subparsers = parser.add_subparsers(dest="subcomando", required=True)
+
+    descripciones = {
+        "metrics": "Calcular las métricas de todo el dataset",
+        "images": "Guardar las imágenes procesadas por los cuatro métodos",
+        "histograms": "Guardar los histogramas de las imágenes y sus versiones mejoradas",
+    }
+    for nombre, descripcion in descripciones.items():
+        subparser = subparsers.add_parser(nombre, help=descripcion, description=descripcion)
+        if nombre == subcomando:
+            from . import dataset
+
+            dataset.add_arguments(subparser)
+
+    mejorar = subparsers.add_parser(
+        "enhance", help="Aplicar los métodos a imágenes sueltas",
+        description="Aplicar los métodos a imágenes sueltas",
+    )
+    mejorar.add_argument("entradas", nargs="+", help="Imágenes a procesar")
+    mejorar.add_argument(
+        "--metodos",
+        nargs="+",
+        choices=list(metodos.parametros_metodos),
+        default=list(metodos.parametros_metodos),
+    )
+    mejorar.add_argument("--salida", default=".", help="Carpeta donde se guardan las salidas")
+    mejorar.add_argument(
+        "--metricas", action="store_true", help="Imprimir las métricas de cada imagen (JSON)"
+    )
+    mejorar.add_argument(
+        "--color",
+        action="store_true",
+        help="Conservar el color y mejorar solo la luminancia",
+    )
+    mejorar.add_argument(
+        "--espacio-color",
+        default=color.espacio_color,
+        choices=list(color.espacios_color),
+    )
+    mejorar.add_argument(
+        "--profundidad-nativa",
+        action="store_true",
+        help="Procesar las imágenes de 16 bits en su profundidad original",
+    )
+    return parser
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    subcomando = argv[0] if argv and argv[0] in modos_dataset else None
+    args = build_parser(subcomando).parse_args(argv)
+
+    if args.subcomando == "enhance":
+        enhance(args)
+        return
+
+    from . import dataset
+
+    args.histogramas = args.imagenes = False
+    for flag, valor in modos_dataset[args.subcomando].items():
+        setattr(args, flag, valor)
+    dataset.execute(args)
@@ -0,0 +1,163 @@
+import time
+import cv2
+import numpy as np
+from . import metodos
+from . import medidas
+from .analisis import analyze_histogram, analyze_images
+from .instrumentacion import instrumented
+
+# ```
+# Mejora de imagenes en color
+#
+# Los cuatro metodos se aplican solo a la luminancia (canal Y de YCrCb o L de
+# LAB) y la crominancia queda igual. Para un lote de cuadros (N, H, W, C) la
+# conversion de ida es un solo cvtColor sobre el lote visto como una imagen
+# (N*H, W, 3); de ese mismo buffer salen la luminancia, su analisis y las
+# metricas. Cada metodo escribe su luminancia en el canal 0 del buffer (la
+# crominancia no cambia entre metodos) y vuelve a BGR con un solo cvtColor.
+#
+# Los canales despues del tercero (alfa, o IR en cuadros RGB+IR) se copian a
+# la salida sin cambios. Las imagenes 2D o de un canal se tratan como gris.
+#
+# Esta es la unica ida y vuelta de color del paquete: los apply_* de
+# metodos.py con una imagen BGR usan enhance_luminance.
+
+# Espacios de color del modo color: conversión desde BGR y de vuelta. En
+# ambos la luminancia es el canal 0 y la crominancia queda en los otros dos.
+espacios_color = {
+    "YCrCb": (cv2.COLOR_BGR2YCrCb, cv2.COLOR_YCrCb2BGR),
+    "LAB": (cv2.COLOR_BGR2LAB, cv2.COLOR_LAB2BGR),
+}
+espacio_color = "YCrCb"
+
+
+def color_conversions(imagen, espacio=espacio_color):
+    """
+    Códigos de cvtColor (ida, vuelta) del espacio de color para la imagen dada.
+    LAB solo está disponible en 8 bits.
+    """
+    if espacio not in espacios_color:
+        raise ValueError(f"Espacio de color no soportado: {espacio}")
+    if imagen.shape[-1] < 3:
+        raise ValueError(f"Cantidad de canales no soportada: {imagen.shape[-1]}")
+    if espacio == "LAB" and imagen.dtype != np.uint8:
+        raise ValueError("El espacio LAB solo admite imágenes de 8 bits")
+    return espacios_color[espacio]
+
+
+def _como_lote(imagenes):
+    """Lote (N, H, W, C) e indicación de si la entrada era una sola imagen."""
+    imagenes = np.asarray(imagenes)
+    if imagenes.ndim == 2:
+        return imagenes[None, :, :, None], True
+    if imagenes.ndim == 3:
+        return imagenes[None], True
+    if imagenes.ndim == 4:
+        return imagenes, False
+    raise ValueError(f"Forma de imagen no soportada: {imagenes.shape}")
+
+
+@instrumented("color.to_luminance")
+def to_luminance(lote, espacio=espacio_color):
+    """
+    Convierte un lote (N, H, W, C) al espacio de color con un solo cvtColor.
+    Devuelve el buffer convertido (N, H, W, 3), o None si el lote es gris, y la
+    luminancia contigua (N, H, W).
+    """
+    if lote.shape[-1] == 1:
+        return None, np.ascontiguousarray(lote[..., 0])
+
+    n, alto, ancho = lote.shape[:3]
+    ida, _ = color_conversions(lote, espacio)
+    color = np.ascontiguousarray(lote[..., :3]).reshape(n * alto, ancho, 3)
+    convertido = cv2.cvtColor(color, ida).reshape(n, alto, ancho, 3)
+    return convertido, np.ascontiguousarray(convertido[..., 0])
+
+
+@instrumented("color.from_luminance")
+def from_luminance(lote, convertido, luminancia, espacio=espacio_color):
+    """
+    Reemplaza la luminancia del buffer convertido por la dada y vuelve a BGR con
+    un solo cvtColor. Los canales extra del lote original se copian a la salida.
+    """
+    if convertido is None:
+        return luminancia[..., None].copy()
+
+    n, alto, ancho = lote.shape[:3]
+    _, vuelta = color_conversions(lote, espacio)
+    convertido[..., 0] = luminancia
+    bgr = cv2.cvtColor(convertido.reshape(n * alto, ancho, 3), vuelta)
+    if lote.shape[-1] == 3:
+        return bgr.reshape(lote.shape)
+
+    salida = np.empty_like(lote)
+    salida[..., :3] = bgr.reshape(n, alto, ancho, 3)
+    salida[..., 3:] = lote[..., 3:]
+    return salida
+
+
+def enhance_luminance(imagen, mejorar, espacio=espacio_color):
+    """
+    Aplica 'mejorar' (una función sobre imágenes en gris) a la luminancia de una
+    imagen (H, W, C) y devuelve la imagen con sus canales. La crominancia y los
+    canales después del tercero quedan como estaban.
+    """
+    lote, _ = _como_lote(imagen)
+    convertido, luminancia = to_luminance(lote, espacio)
+    return from_luminance(lote, convertido, mejorar(luminancia[0])[None], espacio)[0]
+
+
+@instrumented("color.enhance_color")
+def enhance_color(imagenes, nombres_metodos, espacio=espacio_color, con_metricas=False,
+                  parametros=None):
+    """
+    Aplica los métodos indicados a la luminancia de una imagen (H, W, C), de un
+    lote (N, H, W, C) o de una lista de imágenes de distinto tamaño.
+
+    Devuelve ({método: salida}, métricas): las salidas tienen la forma de la
+    entrada (una lista para listas). Con 'con_metricas' las métricas son
+    {método: {métrica: valor}} por imagen (una lista para lotes y listas),
+    calculadas sobre la luminancia, con el tiempo del método por imagen ("time").
+    """
+    parametros = parametros or {}
+    if isinstance(imagenes, (list, tuple)):
+        resultados = [
+            enhance_color(imagen, nombres_metodos, espacio, con_metricas, parametros)
+            for imagen in imagenes
+        ]
+        salidas = {m: [salida[m] for salida, _ in resultados] for m in nombres_metodos}
+        return salidas, [metricas for _, metricas in resultados] if con_metricas else None
+
+    lote, unica = _como_lote(imagenes)
+    convertido, luminancia = to_luminance(lote, espacio)
+    analisis = analyze_images(luminancia)
+    mejorada = np.empty_like(luminancia)
+
+    salidas = {}
+    metricas = [{} for _ in range(len(lote))] if con_metricas else None
+    for metodo in nombres_metodos:
+        inicio = time.perf_counter()
+        if metodo in metodos.constructores_lut:
+            tablas = metodos.constructores_lut[metodo](analisis, **parametros.get(metodo, {}))
+            metodos.apply_luts(luminancia, tablas, mejorada)
+        else:
+            for imagen, destino in zip(luminancia, mejorada):
+                destino[...] = metodos.apply_clahe(imagen, **parametros.get(metodo, {}))
+        salida = from_luminance(lote, convertido, mejorada, espacio)
+        tiempo = (time.perf_counter() - inicio) / len(lote)
+        salidas[metodo] = salida.reshape(np.shape(imagenes)) if unica else salida
+
+        if con_metricas:
+            for i, por_metodo in enumerate(metricas):
+                # Los métodos de LUT global se evalúan en el dominio del histograma
+                if metodo in metodos.constructores_lut:
+                    valores = medidas.calculate_lut_metrics(analisis.histograma[i], tablas[i])
+                else:
+                    valores = medidas.calculate_image_metrics(
+                        luminancia[i], mejorada[i], analyze_histogram(analisis.histograma[i])
+                    )
+                por_metodo[metodo] = {**valores, "time": tiempo}
+
+    if con_metricas and unica:
+        metricas = metricas[0]
+    return salidas, metricas
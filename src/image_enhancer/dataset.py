@@ -0,0 +1,690 @@
+"""
+Created on 2025-04-05 12:30:36
+
+@authors:
+    - Elias Sebastian Gill Quintana
+    - Maria Jose Mendoza Recalde
+    - Abigail Mercedes Nuñes Mendez
+"""
+
+import os
+import cv2
+import time
+import numpy as np
+from . import metodos
+from . import medidas
+from . import cache_imagenes
+from . import cache_resultados
+from . import resultados
+from . import instrumentacion
+from . import graficos
+from . import pipeline
+from . import agregados
+from . import color
+import argparse
+from functools import partial
+# concurrent.futures carga el módulo de procesos recién al usar ProcessPoolExecutor
+import concurrent.futures
+
+
+# directorio del dataset
+directory = "dataset/"
+
+# Directorios de salida: se crean recién al escribir en ellos
+# directorio output de imagenes procesadas
+output_dir = "procesadas/"
+
+# directorio output de histogramas
+histogram_dir = "histogramas"
+
+estadisticas = "estadisticas"
+
+
+@instrumentacion.instrumented("main.plot_histograms_and_save")
+def plot_histograms_and_save(
+    histogramas, titles, base_filename, formato="pgf", conteos=None
+):
+    """
+    Función para graficar los histogramas (conteos por nivel) y guardarlos en
+    carpetas por imagen. Con 'conteos' ("csv" o "npz") se guardan además los
+    conteos de todos los histogramas en un solo archivo.
+    """
+    # Crear una carpeta para cada imagen donde se guardarán los histogramas
+    image_folder = os.path.join(histogram_dir, base_filename)
+    graficos.export_histograms(histogramas, titles, image_folder, formato, conteos)
+
+
+@instrumentacion.instrumented("main.save_images")
+def save_images(path, filename, images, titles):
+    """Guarda versiones procesadas de una imagen."""
+    for img, title in zip(images, titles):
+        save_path = os.path.join(path, f"{os.path.splitext(filename)[0]}_{title}.png")
+        cv2.imwrite(save_path, img)
+
+
+# Orden de métodos y métricas en los registros por imagen
+nombres_metodos = ["CLAHE", "HE", "DQHEPL", "BHEPL-D"]
+nombres_metricas = ["ambe", "psnr", "entropy", "contrast", "uniformity", "time"]
+
+# Cómo aplicar cada método a una imagen con su análisis compartido
+aplicar_metodo = {
+    "CLAHE": lambda img, analisis: metodos.apply_clahe(img),
+    "HE": metodos.apply_histogram_equalization,
+    "DQHEPL": metodos.apply_dqhepl,
+    "BHEPL-D": metodos.apply_bhepl_d,
+}
+
+
+def write_processed_images(filename, img, salidas):
+    """Guarda la imagen original y sus 4 versiones mejoradas en su carpeta de 'procesadas/'."""
+    clahe, he, dqhepl, bhepl_d = salidas
+
+    # Crear una carpeta para cada imagen procesada
+    image_dir = os.path.join(
+        output_dir, filename.split(".")[0]
+    )  # Usar el nombre de la imagen sin la extensión
+    os.makedirs(image_dir, exist_ok=True)  # Crear la carpeta si no existe
+
+    # Guardar la imagen original
+    original_image_path = os.path.join(
+        image_dir, f"{filename.split('.')[0]}_original.png"
+    )
+    with instrumentacion.span("main.imwrite"):
+        cv2.imwrite(original_image_path, img)
+
+    # Guardar las imágenes procesadas en la carpeta correspondiente
+    save_images(
+        image_dir,  # Ruta de la carpeta de la imagen
+        filename,
+        [clahe, he, dqhepl, bhepl_d],
+        ["clahe", "he", "dqhepl", "bhepl_d"],
+    )
+
+
+def apply_all_methods(img, analisis=None, usar_resultados=True, espacio=color.espacio_color):
+    """
+    Aplica los 4 métodos requeridos a una imagen. El análisis (histograma,
+    cuartiles, etc.) se calcula una sola vez y lo comparten los métodos de LUT.
+    Una imagen en color se convierte una sola vez al 'espacio' indicado y los 4
+    métodos se aplican a esa luminancia (color.enhance_color), sin la cache de
+    resultados.
+
+    Con 'usar_resultados' primero se consulta la cache de resultados: si un método
+    de LUT ya tiene su tabla guardada, se aplica esa tabla. Las tablas nuevas se
+    guardan en la cache; las imágenes de salida no (reaplicar la LUT cuesta menos
+    que leerlas del disco, y CLAHE se recalcula).
+
+    Las LUT de los métodos globales se aplican juntas con metodos.apply_lut_stack
+    (una sola pasada sobre la imagen en 16 bits), que escribe las salidas en un
+    arreglo (K, H, W). No se reutiliza un buffer entre imágenes porque las
+    salidas se guardan en otros hilos.
+    """
+    if img.ndim == 3:
+        salidas, _ = color.enhance_color(img, nombres_metodos, espacio)
+        return tuple(salidas[name] for name in nombres_metodos)
+
+    if analisis is None:
+        analisis = metodos.analyze_image(img)
+    hash_imagen = cache_resultados.image_hash(img) if usar_resultados else None
+
+    salidas = {}
+    tablas = {}
+    for name in nombres_metodos:
+        if name not in metodos.constructores_lut:
+            salidas[name] = aplicar_metodo[name](img, analisis)
+            continue
+
+        guardado = {}
+        if usar_resultados:
+            clave = cache_resultados.result_key(hash_imagen, name)
+            guardado = cache_resultados.read_result(clave) or {}
+            if "lut" in guardado:
+                tablas[name] = guardado["lut"]
+                continue
+
+        tablas[name] = metodos.constructores_lut[name](analisis)
+        # Una entrada con métricas la escribe evaluate_image junto con su LUT
+        if usar_resultados and "metricas" not in guardado:
+            cache_resultados.write_result(clave, lut=tablas[name])
+
+    if tablas:
+        salidas.update(zip(tablas, metodos.apply_lut_stack(img, list(tablas.values()))))
+
+    return tuple(salidas[name] for name in nombres_metodos)
+
+
+def compute_histograms(img, analisis=None):
+    """
+    Calcula los histogramas de la imagen original y de sus versiones mejoradas
+    (en el orden de nombres_metodos). Los de los métodos de LUT se obtienen del
+    histograma de la original y la LUT, sin recorrer los píxeles; solo CLAHE
+    necesita su imagen de salida.
+    """
+    if analisis is None:
+        analisis = metodos.analyze_image(img)
+
+    histogramas = [analisis.histograma]
+    for name in nombres_metodos:
+        if name in metodos.constructores_lut:
+            lut = metodos.constructores_lut[name](analisis)
+            histogramas.append(medidas.calculate_lut_histogram(analisis.histograma, lut))
+        else:
+            processed = aplicar_metodo[name](img, analisis)
+            histogramas.append(metodos.calculate_histogram(processed))
+    return histogramas
+
+
+@instrumentacion.instrumented("main.read_image")
+def read_image(file_path, usar_cache=True, profundidad_nativa=False):
+    """Lee una imagen del dataset en escala de grises, por defecto desde la cache en disco."""
+    if usar_cache:
+        return cache_imagenes.read_image_cached(
+            file_path, profundidad_nativa=profundidad_nativa
+        )
+    return medidas.read_image_as_grayscale(file_path, profundidad_nativa)
+
+
+def init_worker(perfil=False, traza=False):
+    """
+    Inicializa un proceso del modo --workers. OpenCV usa un hilo por proceso
+    para no sobresuscribir los núcleos, lo que distorsionaría los tiempos.
+    Con 'perfil' se activa la instrumentación también en el proceso.
+    """
+    cv2.setNumThreads(1)
+    if perfil:
+        instrumentacion.enable(traza)
+
+
+def evaluate_image_instrumented(filename, **opciones):
+    """
+    Como evaluate_image, pero devuelve además los datos de instrumentación del
+    proceso de trabajo para agregarlos en el proceso principal.
+    """
+    return evaluate_image(filename, **opciones), instrumentacion.collect()
+
+
+def export_image_histograms_instrumented(filename, **opciones):
+    """Como export_image_histograms, pero devuelve además la instrumentación del proceso."""
+    return export_image_histograms(filename, **opciones), instrumentacion.collect()
+
+
+def export_image_histograms(
+    filename, usar_cache=True, profundidad_nativa=False, formato="pgf", conteos=None
+):
+    """
+    Calcula y guarda los histogramas de una imagen del dataset y de sus versiones
+    mejoradas. Devuelve None o el mensaje si hubo un error. Se ejecuta tanto en
+    el proceso principal como en los procesos del modo --workers.
+    """
+    file_path = os.path.join(directory, filename)
+
+    try:
+        img = read_image(file_path, usar_cache, profundidad_nativa)
+        plot_histograms_and_save(
+            compute_histograms(img),
+            ["Original", *nombres_metodos],
+            filename.split(".")[0],  # Usar el nombre base del archivo para la carpeta
+            formato,
+            conteos,
+        )
+    except Exception as e:
+        return str(e)
+
+    return None
+
+
+@instrumentacion.instrumented("main.evaluate_image")
+def evaluate_image(
+    filename, usar_cache=True, profundidad_nativa=False, usar_resultados=True
+):
+    """
+    Evalúa los 4 métodos sobre una imagen del dataset: mide sus tiempos y calcula
+    sus métricas (las de los métodos de LUT, desde el histograma y la LUT).
+
+    Con 'usar_resultados' los métodos cuyas métricas ya están en la cache de
+    resultados (misma imagen, parámetros y código) no se vuelven a calcular. Las
+    entradas guardan también las métricas de la original, así que si todos los
+    métodos están en la cache la imagen no se analiza. La cache no guarda
+    tiempos: el de un método tomado de la cache queda en NaN, para que el
+    resumen solo promedie tiempos medidos en esta ejecución.
+
+    Devuelve un registro compacto (matriz de métodos x métricas, en el orden de
+    nombres_metodos y nombres_metricas), las métricas de la imagen original (en el
+    orden de resultados.nombres_originales) y None, o None, None y el mensaje si
+    hubo un error.
+    Se ejecuta tanto en el proceso principal como en los procesos del modo --workers.
+    """
+    file_path = os.path.join(directory, filename)
+
+    try:
+        img = read_image(file_path, usar_cache, profundidad_nativa)
+
+        registro = np.zeros((len(nombres_metodos), len(nombres_metricas)))
+        pendientes = list(nombres_metodos)
+        claves = {}
+        originales = None
+        if usar_resultados:
+            hash_imagen = cache_resultados.image_hash(img)
+            pendientes = []
+            for i, name in enumerate(nombres_metodos):
+                claves[name] = cache_resultados.result_key(hash_imagen, name)
+                guardado = cache_resultados.read_result(claves[name])
+                if guardado is not None and "metricas" in guardado and "originales" in guardado:
+                    registro[i, :-1] = guardado["metricas"]
+                    registro[i, -1] = np.nan
+                    originales = guardado["originales"]
+                else:
+                    pendientes.append(name)
+
+        if not pendientes and originales is not None:
+            return registro, list(originales), None
+
+        # Análisis compartido: un solo histograma para métodos y métricas
+        start = time.perf_counter()
+        analisis = metodos.analyze_image(img)
+        tiempo_analisis = time.perf_counter() - start
+
+        # Calcular métricas de la imagen original desde su histograma
+        orig_metricas = medidas.calculate_histogram_metrics(analisis)
+        originales = [orig_metricas[nombre] for nombre in resultados.nombres_originales]
+
+        def registrar(name, valores, tiempo, lut=None):
+            i = nombres_metodos.index(name)
+            registro[i, :-1] = [valores[metrica] for metrica in nombres_metricas[:-1]]
+            registro[i, -1] = tiempo
+
+            if usar_resultados:
+                campos = {"metricas": registro[i, :-1], "originales": originales}
+                if lut is not None:
+                    campos["lut"] = lut
+                cache_resultados.write_result(claves[name], **campos)
+
+        # Calcular solo los métodos que no estaban en la cache de resultados,
+        # midiendo el tiempo de procesamiento completo de cada uno. Las LUT se
+        # aplican sobre un mismo buffer: la salida no se usa, pero el tiempo
+        # de un método incluye producirla
+        tablas = {}
+        tiempos = {}
+        salida = np.empty_like(img)
+        for name in pendientes:
+            start = time.perf_counter()
+            if name in metodos.constructores_lut:
+                tablas[name] = metodos.constructores_lut[name](analisis)
+                metodos.apply_lut(img, tablas[name], salida)
+                tiempos[name] = time.perf_counter() - start
+            else:
+                processed = aplicar_metodo[name](img, analisis)
+                tiempo = time.perf_counter() - start
+                registrar(name, medidas.calculate_image_metrics(img, processed, analisis), tiempo)
+
+        # Las métricas de los métodos de LUT salen del histograma de la original
+        # y de las tablas (histogramas de salida y errores cuadráticos), sin
+        # recorrer las salidas. El tiempo de cada método es el del análisis más
+        # la construcción y la aplicación de su LUT.
+        if tablas:
+            apiladas = np.asarray(list(tablas.values()))
+            histogramas = medidas.calculate_lut_histograms(analisis.histograma, apiladas)
+            sse = medidas.calculate_lut_sse(analisis.histograma, apiladas)
+
+            for k, name in enumerate(tablas):
+                valores = medidas.calculate_output_metrics(analisis, histogramas[k], sse[k])
+                registrar(name, valores, tiempo_analisis + tiempos[name], tablas[name])
+
+    except Exception as e:
+        return None, None, str(e)
+
+    return registro, originales, None
+
+
+def evaluate_images(files, evaluar, workers=1, perfil=False, traza=None):
+    """
+    Genera el resultado de 'evaluar' para cada archivo, en orden y a medida que
+    terminan, en este proceso o repartidos en 'workers' procesos.
+    """
+    if workers <= 1:
+        yield from map(evaluar, files)
+        return
+
+    # Cada proceso mide sus propios tiempos y devuelve un registro
+    # compacto por imagen; la agregación se hace en el proceso principal
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=init_worker,
+        initargs=(perfil, traza is not None),
+    ) as pool:
+        if perfil:
+            evaluar = partial(evaluate_image_instrumented, **evaluar.keywords)
+            for resultado, datos in pool.map(evaluar, files, chunksize=8):
+                instrumentacion.merge(datos)
+                yield resultado
+        else:
+            yield from pool.map(evaluar, files, chunksize=8)
+
+
+def add_arguments(parser):
+    """Agrega al parser las opciones comunes a los tres modos de operación."""
+    parser.add_argument(
+        "--todas",
+        action="store_true",
+        help="Con --histogramas o --imagenes, procesar todo el dataset en lugar de 5 imágenes",
+    )
+    parser.add_argument(
+        "--formato-histograma",
+        default="pgf",
+        choices=[*graficos.formatos_histograma, "ninguno"],
+        help="Formato de los gráficos de --histogramas ('ninguno' para no graficar)",
+    )
+    parser.add_argument(
+        "--conteos",
+        choices=graficos.formatos_conteos,
+        help="Guardar también los conteos de los histogramas de cada imagen",
+    )
+    parser.add_argument(
+        "--lectores",
+        type=int,
+        default=2,
+        help="Hilos que leen imágenes por adelantado en el modo --imagenes",
+    )
+    parser.add_argument(
+        "--escritores",
+        type=int,
+        default=2,
+        help="Hilos que codifican y guardan los PNG en el modo --imagenes",
+    )
+    parser.add_argument(
+        "--cola",
+        type=int,
+        default=8,
+        help="Máximo de imágenes leídas por adelantado y de escrituras pendientes",
+    )
+    parser.add_argument(
+        "--color",
+        action="store_true",
+        help="En el modo --imagenes, conservar el color y mejorar solo la luminancia",
+    )
+    parser.add_argument(
+        "--espacio-color",
+        default=color.espacio_color,
+        choices=list(color.espacios_color),
+        help="Espacio de color cuya luminancia se mejora con --color",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Cantidad de procesos para calcular las métricas del dataset",
+    )
+    parser.add_argument(
+        "--sin-cache",
+        action="store_true",
+        help="Decodificar siempre las imágenes sin usar la cache en disco",
+    )
+    parser.add_argument(
+        "--sin-resultados",
+        action="store_true",
+        help="Recalcular todos los métodos sin usar la cache de resultados",
+    )
+    parser.add_argument(
+        "--resultados",
+        default=resultados.ruta_resultados,
+        help="Archivo SQLite donde se guardan las métricas de la ejecución",
+    )
+    parser.add_argument(
+        "--guardar-agregado",
+        help="Guardar el resumen agregado en un JSON (combinable con python -m image_enhancer.agregados)",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Procesar solo las imágenes nuevas o modificadas desde la ejecución anterior",
+    )
+    parser.add_argument(
+        "--exportar-texto",
+        action="store_true",
+        help="Escribir además un archivo de estadísticas de texto por imagen",
+    )
+    parser.add_argument(
+        "--profundidad-nativa",
+        action="store_true",
+        help="Procesar las imágenes de 16 bits en su profundidad original",
+    )
+    parser.add_argument(
+        "--perfil",
+        action="store_true",
+        help="Medir el tiempo de cada etapa y mostrar una tabla al terminar",
+    )
+    parser.add_argument(
+        "--traza",
+        help="Guardar una traza de Chrome (JSON) de las etapas en el archivo indicado",
+    )
+
+
+def execute(args):
+    """Ejecuta el modo elegido, con la medición de etapas si se pidió."""
+    perfil = args.perfil or args.traza is not None
+    if perfil:
+        instrumentacion.enable(traza=args.traza is not None)
+
+    with instrumentacion.span("main"):
+        run(args, perfil)
+
+        # Mantener las caches en disco dentro de su límite de tamaño
+        if not args.sin_cache:
+            cache_imagenes.evict_images()
+        if not args.sin_resultados:
+            cache_resultados.evict_results()
+
+    if perfil:
+        print("\n=== TIEMPO POR ETAPA ===")
+        print(instrumentacion.report())
+        if args.traza:
+            instrumentacion.write_chrome_trace(args.traza)
+            print(f"\nTraza de Chrome guardada en {args.traza}")
+
+
+def main():
+    """
+    Función principal del script. Permite ejecutar tres modos de operación:
+
+    1. Sin flags: Aplica cuatro métodos de mejora de contraste (CLAHE, HE, DQHEPL, BHEPL-D)
+       a todas las imágenes del dataset y calcula métricas de calidad (AMBE, PSNR, entropía, contraste).
+       Luego muestra un resumen con los promedios por método. Con '--workers N'
+       las imágenes se reparten entre N procesos. Las métricas se guardan en un
+       archivo SQLite ('estadisticas/resultados.sqlite' o el indicado con
+       '--resultados') y con '--exportar-texto' también en un archivo de texto por imagen.
+       Con '--incremental' el archivo se conserva y solo se procesan las imágenes nuevas
+       o modificadas (según su mtime, tamaño y hash); las eliminadas se quitan del archivo
+       y una ejecución interrumpida continúa donde quedó.
+
+    En todos los modos las imágenes decodificadas se guardan en '.cache/imagenes/'
+    y las siguientes ejecuciones las abren mapeadas en memoria ('--sin-cache' lo desactiva).
+    Al terminar se borran las menos usadas si la cache supera los 512 MB.
+    Los resultados de cada método (métricas y LUT) se guardan en '.cache/resultados/'
+    (hasta 256 MB) y solo se recalculan los métodos cuyo código o parámetros
+    cambiaron ('--sin-resultados' lo desactiva).
+    Con '--profundidad-nativa' las imágenes de 16 bits no se convierten a 8 bits.
+    Con '--perfil' se muestra el tiempo de cada etapa (lectura, histograma, LUT,
+    métricas, escritura...) y con '--traza archivo.json' se guarda una traza de Chrome.
+
+    2. Con flag '--histogramas': Muestra los histogramas de la imagen original y sus versiones mejoradas
+       usando los cuatro métodos, para las primeras 5 imágenes del dataset. Los gráficos
+       se generan desde los conteos ya calculados ('--formato-histograma' elige pgf, png,
+       svg o pdf) y con '--conteos csv|npz' también se guardan los conteos. Acepta '--workers N'.
+
+    3. Con flag '--imagenes': Guarda las primeras 5 imágenes procesadas por los cuatro métodos
+       en una carpeta 'salida/' con nombres descriptivos. La lectura, el cálculo y la
+       codificación PNG se solapan ('--lectores', '--escritores' y '--cola' los ajustan).
+       Con '--color' las imágenes se leen con todos sus canales y los métodos se aplican
+       solo a la luminancia ('--espacio-color' elige YCrCb o LAB).
+
+    Con '--todas' los modos 2 y 3 procesan todo el dataset.
+
+    Los mismos modos están disponibles con el comando instalado 'image-enhancer'
+    (subcomandos metrics, images y histograms; ver image_enhancer/cli.py).
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--histogramas",
+        action="store_true",
+        help="Mostrar histogramas de las primeras 5 imágenes",
+    )
+    parser.add_argument(
+        "--imagenes",
+        action="store_true",
+        help="Guardar versiones procesadas de las primeras 5 imágenes",
+    )
+    add_arguments(parser)
+    execute(parser.parse_args())
+
+
+def run(args, perfil=False):
+    """Ejecuta el modo de operación elegido con los argumentos de la línea de comandos."""
+    files = [
+        f for f in os.listdir(directory) if os.path.isfile(os.path.join(directory, f))
+    ]
+    files.sort()
+    seleccion = files if args.todas else files[:5]
+
+    # --histogramas
+    if args.histogramas:
+        exportar = partial(
+            export_image_histograms,
+            usar_cache=not args.sin_cache,
+            profundidad_nativa=args.profundidad_nativa,
+            formato=None if args.formato_histograma == "ninguno" else args.formato_histograma,
+            conteos=args.conteos,
+        )
+
+        # Cada proceso reutiliza su propia figura
+        if args.workers > 1:
+            with concurrent.futures.ProcessPoolExecutor(
+                max_workers=args.workers,
+                initializer=init_worker,
+                initargs=(perfil, args.traza is not None),
+            ) as pool:
+                if perfil:
+                    exportar = partial(export_image_histograms_instrumented, **exportar.keywords)
+                    errores = []
+                    for error, datos in pool.map(exportar, seleccion, chunksize=4):
+                        instrumentacion.merge(datos)
+                        errores.append(error)
+                else:
+                    errores = list(pool.map(exportar, seleccion, chunksize=4))
+        else:
+            errores = map(exportar, seleccion)
+
+        for filename, error in zip(seleccion, errores):
+            if error is not None:
+                print(f"Error procesando {filename}: {error}")
+
+    # --imagenes
+    elif args.imagenes:
+
+        def leer(filename):
+            file_path = os.path.join(directory, filename)
+            if args.color:
+                img = medidas.read_image_color(file_path, args.profundidad_nativa)
+            else:
+                img = read_image(file_path, not args.sin_cache, args.profundidad_nativa)
+            if img is None:
+                raise ValueError(f"No se pudo leer la imagen: {file_path}")
+            # Copia en memoria para que la lectura del disco ocurra en este hilo
+            return np.array(img)
+
+        def procesar(filename, img):
+            salidas = apply_all_methods(
+                img, usar_resultados=not args.sin_resultados, espacio=args.espacio_color
+            )
+            return img, salidas
+
+        def escribir(filename, resultado):
+            img, salidas = resultado
+            write_processed_images(filename, img, salidas)
+
+        # Lectura, cálculo y codificación PNG se solapan con colas acotadas
+        errores = pipeline.run_pipeline(
+            seleccion,
+            leer,
+            procesar,
+            escribir,
+            lectores=args.lectores,
+            escritores=args.escritores,
+            capacidad=args.cola,
+        )
+        for filename, error in errores:
+            print(f"Error procesando {filename}: {error}")
+
+        # sin flag
+    else:
+        # Verificar si hay archivos para procesar
+        if not files:
+            print("¡No se encontraron archivos en el directorio!")
+        else:
+            evaluar = partial(
+                evaluate_image,
+                usar_cache=not args.sin_cache,
+                profundidad_nativa=args.profundidad_nativa,
+                usar_resultados=not args.sin_resultados,
+            )
+
+            with resultados.MetricsSink(
+                args.resultados, nombres_metricas, continuar=args.incremental
+            ) as sink:
+                # En modo incremental solo se procesan las imágenes nuevas o
+                # modificadas; el resto conserva sus filas del archivo
+                firmas = {}
+                pendientes = files
+                if args.incremental:
+                    firmas, pendientes, tocados, eliminados = resultados.plan_incremental(
+                        directory, files, sink.manifest()
+                    )
+                    sink.remove(eliminados)
+                    for filename in tocados:
+                        sink.update_signature(filename, firmas[filename])
+                    print(
+                        f"\nModo incremental: {len(files) - len(pendientes)} sin cambios, "
+                        f"{len(pendientes)} nuevas o modificadas, {len(eliminados)} eliminadas"
+                    )
+
+                print(f"\nProcesando {len(pendientes)} imágenes...")
+
+                # Los registros se escriben en el archivo de resultados a medida que llegan
+                registros = evaluate_images(pendientes, evaluar, args.workers, perfil, args.traza)
+                for filename, (registro, originales, error) in zip(pendientes, registros):
+                    if error is not None:
+                        print(f"Error procesando {filename}: {error}")
+                        continue
+
+                    sink.add(
+                        filename, originales, registro, nombres_metodos, firmas.get(filename)
+                    )
+
+            if args.exportar_texto:
+                resultados.export_text(args.resultados, estadisticas)
+
+            # El resumen se acumula recorriendo el archivo de resultados, con
+            # memoria constante (momentos y sketch de cuantiles por método)
+            agregado = resultados.aggregate_metrics(
+                args.resultados, nombres_metodos, nombres_metricas
+            )
+            if args.guardar_agregado:
+                agregado.save(args.guardar_agregado)
+
+            # Mostrar resumen estadístico
+            print("\n" + "=" * 50)
+            print("RESUMEN ESTADÍSTICO DE TODAS LAS IMÁGENES")
+            print("=" * 50 + "\n")
+
+            # RESULTADOS FINALES MEJORADOS
+            print("\n=== RESUMEN ESTADÍSTICO ===")
+            print(agregados.format_summary(agregado))
+
+            # Explicación de métricas
+            print("\nLEYENDA:")
+            print("- AMBE: Absolute Mean Brightness Error (menor es mejor)")
+            print("- PSNR: Peak Signal-to-Noise Ratio en dB (mayor es mejor)")
+            print("- Uniformidad: 1 = máxima uniformidad")
+            print("- Tiempos en milisegundos (menor es mejor)")
+            print(f"- Tiempos medidos en cada proceso; procesos utilizados: {args.workers}")
+            if not args.sin_resultados:
+                print("- Los tiempos promedian solo los métodos calculados en esta ejecución")
@@ -0,0 +1,124 @@
+import os
+import numpy as np
+from .instrumentacion import instrumented
+
+# ```
+# Graficos de histogramas
+#
+# Los histogramas se dibujan a partir de los conteos ya calculados (un bin por
+# nivel, agrupados en 256 barras para graficar), en lugar de volver a agrupar
+# los pixeles con plt.hist. Cada proceso reutiliza una sola figura: las barras
+# se crean una vez y para cada histograma nuevo solo se actualizan sus alturas
+# y el titulo. matplotlib se importa recien al crear la figura, para que
+# importar este modulo (por ejemplo por formatos_histograma) sea barato.
+
+formatos_histograma = ["pgf", "png", "svg", "pdf"]
+formatos_conteos = ["csv", "npz"]
+
+
+def reduce_bins(conteos, barras=256):
+    """Agrupa un histograma de un bin por nivel en 'barras' barras consecutivas."""
+    conteos = np.asarray(conteos, dtype=np.float64)
+    if len(conteos) == barras:
+        return conteos
+    return conteos.reshape(barras, -1).sum(axis=1)
+
+
+class HistogramPlotter:
+    """Figura reutilizable para guardar histogramas de 256 barras."""
+
+    def __init__(self, barras=256):
+        import matplotlib.pyplot as plt
+
+        self.barras = barras
+        self.figura, self.ejes = plt.subplots(figsize=(10, 5))
+        self.rectangulos = None
+        self.bordes = None
+        self.ejes.set_xlabel("Intensidad")
+        self.ejes.set_ylabel("Frecuencia")
+
+    def _dibujar_barras(self, bordes, conteos):
+        """Crea las barras la primera vez o cuando cambia la cantidad de niveles."""
+        if self.rectangulos is not None:
+            self.rectangulos.remove()
+        _, _, self.rectangulos = self.ejes.hist(
+            bordes[:-1], bins=bordes, weights=conteos, color="gray", alpha=0.7
+        )
+        self.bordes = bordes
+
+    @instrumented("graficos.HistogramPlotter.save")
+    def save(self, conteos, titulo, ruta):
+        """
+        Guarda el histograma 'conteos' (un bin por nivel: 256 en 8 bits, 65536
+        en 16 bits) con el título indicado. El formato sale de la extensión de 'ruta'.
+        """
+        niveles = len(conteos)
+        alturas = reduce_bins(conteos, self.barras)
+        bordes = np.linspace(0, niveles, self.barras + 1)
+
+        if self.bordes is None or not np.array_equal(bordes, self.bordes):
+            self._dibujar_barras(bordes, alturas)
+        else:
+            for rectangulo, altura in zip(self.rectangulos, alturas):
+                rectangulo.set_height(altura)
+            self.ejes.relim()
+            self.ejes.autoscale_view()
+
+        self.ejes.set_title(f"Histograma de {titulo}")
+        self.figura.savefig(ruta)
+
+    def close(self):
+        """Libera la figura."""
+        import matplotlib.pyplot as plt
+
+        plt.close(self.figura)
+
+
+# Figura del proceso actual, creada en el primer uso
+_graficador = None
+
+
+def _plotter():
+    """Devuelve la figura reutilizable del proceso actual."""
+    global _graficador
+    if _graficador is None:
+        _graficador = HistogramPlotter()
+    return _graficador
+
+
+@instrumented("graficos.save_counts")
+def save_counts(histogramas, titulos, ruta):
+    """
+    Guarda los conteos de varios histogramas en un solo archivo: CSV con una
+    columna por título (más la columna del nivel) o NPZ con un arreglo por título.
+    """
+    nombres = [titulo.lower().replace(" ", "_") for titulo in titulos]
+    if ruta.endswith(".npz"):
+        np.savez_compressed(
+            ruta, **{nombre: np.asarray(h) for nombre, h in zip(nombres, histogramas)}
+        )
+        return
+
+    niveles = len(histogramas[0])
+    tabla = np.column_stack([np.arange(niveles), *histogramas])
+    np.savetxt(ruta, tabla, fmt="%d", delimiter=",", header=",".join(["nivel", *nombres]), comments="")
+
+
+def export_histograms(histogramas, titulos, carpeta, formato="pgf", conteos=None):
+    """
+    Guarda en 'carpeta' el gráfico de cada histograma con el formato indicado
+    (None para no graficar) y, si se indica 'conteos' ("csv" o "npz"), un
+    archivo con los conteos de todos.
+    """
+    os.makedirs(carpeta, exist_ok=True)
+
+    if formato is not None:
+        graficador = _plotter()
+        for histograma, titulo in zip(histogramas, titulos):
+            ruta = os.path.join(
+                carpeta, f"{titulo.lower().replace(' ', '_')}_histograma.{formato}"
+            )
+            graficador.save(histograma, titulo, ruta)
+
+    if conteos is not None:
+        save_counts(histogramas, titulos, os.path.join(carpeta, f"histogramas.{conteos}"))
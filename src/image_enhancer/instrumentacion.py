@@ -0,0 +1,239 @@
+import os
+import json
+import time
+import functools
+import threading
+
+# ```
+# Instrumentacion por etapas
+#
+# Tramos con nombre (span) y contadores para ver en que etapa se va el tiempo
+# de una ejecucion: decodificacion, histograma, construccion y aplicacion de
+# LUT, metricas, escritura de resultados, etc. Desactivada por defecto; en ese
+# caso cada funcion decorada con @instrumented solo agrega una comprobacion
+# de un booleano antes de llamar a la original.
+#
+# Activada, acumula por nombre de tramo la cantidad de llamadas, el tiempo
+# total y el tiempo propio (sin contar los tramos anidados), y opcionalmente
+# los eventos individuales para escribir una traza de Chrome (chrome://tracing
+# o Perfetto). Los tramos anidados se registran por hilo.
+
+
+class _Estado:
+    """Estado global de la instrumentación del proceso."""
+
+    def __init__(self):
+        self.activo = False
+        self.traza = False
+        self.bloqueo = threading.Lock()
+        self.local = threading.local()
+        self.reset()
+
+    def reset(self):
+        # nombre -> [llamadas, total_s, propio_s, min_s, max_s]
+        self.tramos = {}
+        self.contadores = {}
+        self.eventos = []
+
+
+_estado = _Estado()
+
+
+def enable(traza=False):
+    """Activa la instrumentación; con 'traza' también guarda cada evento para Chrome."""
+    _estado.activo = True
+    _estado.traza = traza
+
+
+def disable():
+    """Desactiva la instrumentación (los datos acumulados se conservan)."""
+    _estado.activo = False
+
+
+def is_enabled():
+    """Indica si la instrumentación está activa."""
+    return _estado.activo
+
+
+def reset():
+    """Descarta los tramos, contadores y eventos acumulados."""
+    with _estado.bloqueo:
+        _estado.reset()
+
+
+def count(nombre, valor=1):
+    """Suma 'valor' al contador indicado (no hace nada si está desactivada)."""
+    if not _estado.activo:
+        return
+    with _estado.bloqueo:
+        _estado.contadores[nombre] = _estado.contadores.get(nombre, 0) + valor
+
+
+class _Tramo:
+    """Context manager de un tramo activo."""
+
+    __slots__ = ("nombre", "inicio", "hijos")
+
+    def __init__(self, nombre):
+        self.nombre = nombre
+
+    def __enter__(self):
+        pila = getattr(_estado.local, "pila", None)
+        if pila is None:
+            pila = _estado.local.pila = []
+        pila.append(self)
+        self.hijos = 0
+        self.inicio = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *excepcion):
+        fin = time.perf_counter_ns()
+        duracion = fin - self.inicio
+        pila = _estado.local.pila
+        pila.pop()
+        if pila:
+            pila[-1].hijos += duracion
+
+        segundos = duracion * 1e-9
+        propio = (duracion - self.hijos) * 1e-9
+        with _estado.bloqueo:
+            datos = _estado.tramos.get(self.nombre)
+            if datos is None:
+                _estado.tramos[self.nombre] = [1, segundos, propio, segundos, segundos]
+            else:
+                datos[0] += 1
+                datos[1] += segundos
+                datos[2] += propio
+                datos[3] = min(datos[3], segundos)
+                datos[4] = max(datos[4], segundos)
+            if _estado.traza:
+                _estado.eventos.append(
+                    {
+                        "name": self.nombre,
+                        "ph": "X",
+                        "ts": self.inicio / 1000,
+                        "dur": duracion / 1000,
+                        "pid": os.getpid(),
+                        "tid": threading.get_ident(),
+                    }
+                )
+        return False
+
+
+class _TramoNulo:
+    """Context manager vacío que se usa cuando la instrumentación está desactivada."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excepcion):
+        return False
+
+
+_tramo_nulo = _TramoNulo()
+
+
+def span(nombre):
+    """Context manager que mide un tramo con el nombre indicado."""
+    if not _estado.activo:
+        return _tramo_nulo
+    return _Tramo(nombre)
+
+
+def instrumented(nombre):
+    """Decorador que mide cada llamada a la función como un tramo 'nombre'."""
+
+    def decorador(funcion):
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            if not _estado.activo:
+                return funcion(*args, **kwargs)
+            with _Tramo(nombre):
+                return funcion(*args, **kwargs)
+
+        return envoltura
+
+    return decorador
+
+
+def collect():
+    """
+    Devuelve los datos acumulados (tramos, contadores y eventos) y los
+    reinicia. Se usa para enviar los datos de un proceso de trabajo al principal.
+    """
+    with _estado.bloqueo:
+        datos = {
+            "tramos": _estado.tramos,
+            "contadores": _estado.contadores,
+            "eventos": _estado.eventos,
+        }
+        _estado.reset()
+    return datos
+
+
+def merge(datos):
+    """Agrega a este proceso los datos devueltos por collect() en otro proceso."""
+    with _estado.bloqueo:
+        for nombre, (llamadas, total, propio, minimo, maximo) in datos["tramos"].items():
+            actual = _estado.tramos.get(nombre)
+            if actual is None:
+                _estado.tramos[nombre] = [llamadas, total, propio, minimo, maximo]
+            else:
+                actual[0] += llamadas
+                actual[1] += total
+                actual[2] += propio
+                actual[3] = min(actual[3], minimo)
+                actual[4] = max(actual[4], maximo)
+        for nombre, valor in datos["contadores"].items():
+            _estado.contadores[nombre] = _estado.contadores.get(nombre, 0) + valor
+        _estado.eventos.extend(datos["eventos"])
+
+
+def report():
+    """Tabla con el tiempo total y propio de cada tramo, y los contadores."""
+    with _estado.bloqueo:
+        tramos = {nombre: list(datos) for nombre, datos in _estado.tramos.items()}
+        contadores = dict(_estado.contadores)
+
+    propio_total = sum(datos[2] for datos in tramos.values()) or 1.0
+    lineas = [
+        f"{'Etapa':<34} {'Llamadas':>9} {'Total (ms)':>11} {'Propio (ms)':>12} "
+        f"{'% propio':>9} {'Media (ms)':>11} {'Máx (ms)':>9}",
+        "-" * 101,
+    ]
+    for nombre, (llamadas, total, propio, _, maximo) in sorted(
+        tramos.items(), key=lambda item: item[1][2], reverse=True
+    ):
+        lineas.append(
+            f"{nombre:<34} {llamadas:>9} {total * 1000:>11.1f} {propio * 1000:>12.1f} "
+            f"{100 * propio / propio_total:>8.1f}% {total / llamadas * 1000:>11.3f} "
+            f"{maximo * 1000:>9.2f}"
+        )
+
+    if contadores:
+        lineas.append("")
+        lineas.append(f"{'Contador':<34} {'Valor':>12}")
+        lineas.append("-" * 47)
+        for nombre, valor in sorted(contadores.items()):
+            lineas.append(f"{nombre:<34} {valor:>12}")
+
+    return "\n".join(lineas)
+
+
+def write_chrome_trace(ruta):
+    """Escribe los eventos guardados en formato de traza de Chrome (JSON)."""
+    with _estado.bloqueo:
+        eventos = list(_estado.eventos)
+        contadores = dict(_estado.contadores)
+
+    with open(ruta, "w") as archivo:
+        json.dump(
+            {
+                "traceEvents": eventos,
+                "displayTimeUnit": "ms",
+                "otherData": {"contadores": contadores},
+            },
+            archivo,
+        )
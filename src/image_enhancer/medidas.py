@@ -0,0 +1,212 @@
+import cv2
+import numpy as np
+from .analisis import as_analysis
+from .instrumentacion import instrumented
+
+
+@instrumented("medidas.read_image_as_grayscale")
+def read_image_as_grayscale(path, profundidad_nativa=False):
+    """
+    Lee una imagen en escala de grises de la ruta especificada. Con
+    profundidad_nativa las imágenes de 16 bits se leen sin convertirlas a 8 bits.
+    """
+    if profundidad_nativa:
+        return cv2.imread(path, cv2.IMREAD_GRAYSCALE | cv2.IMREAD_ANYDEPTH)
+    return cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+
+
+@instrumented("medidas.read_image_color")
+def read_image_color(path, profundidad_nativa=False):
+    """
+    Lee una imagen con todos sus canales (BGR y, si los tiene, alfa o IR). Sin
+    profundidad_nativa las imágenes de 16 bits se convierten a 8 bits.
+    """
+    imagen = cv2.imread(path, cv2.IMREAD_UNCHANGED)
+    if imagen is not None and imagen.dtype == np.uint16 and not profundidad_nativa:
+        imagen = cv2.convertScaleAbs(imagen, alpha=1 / 256)
+    return imagen
+
+
+@instrumented("medidas.calculate_ambe")
+def calculate_ambe(original, processed, analisis=None):
+    """
+    Calcula el error de brillo medio absoluto (AMBE). Si se pasa el análisis de
+    la original, su media se toma del histograma.
+    """
+    media_original = np.mean(original) if analisis is None else analisis.media
+    return abs(media_original - np.mean(processed))
+
+
+@instrumented("medidas.calculate_psnr")
+def calculate_psnr(original, processed, pico=None):
+    """
+    Calcula la relación señal-ruido máxima (PSNR). El valor pico por defecto es
+    el máximo del tipo de la imagen (255 en 8 bits, 65535 en 16 bits).
+    """
+    if pico is None:
+        pico = np.iinfo(original.dtype).max
+    return cv2.PSNR(original, processed, float(pico))
+
+
+@instrumented("medidas.psnr_from_mse")
+def psnr_from_mse(mse, pico):
+    """
+    PSNR a partir del error cuadrático medio, con la misma fórmula que cv2.PSNR
+    (incluido el epsilon que da un valor finito para imágenes idénticas).
+    """
+    return 20 * np.log10(pico / (np.sqrt(mse) + np.finfo(np.float64).eps))
+
+
+@instrumented("medidas.calculate_entropy")
+def calculate_entropy(image, analisis=None):
+    """Calcula la entropía de Shannon en bits, desde el histograma si hay análisis."""
+    if analisis is not None:
+        return calculate_histogram_metrics(analisis)["entropy"]
+    # skimage (y con él scipy) solo se carga si hace falta recorrer los píxeles
+    from skimage.measure import shannon_entropy
+
+    return shannon_entropy(image)
+
+
+@instrumented("medidas.calculate_uniformity")
+def calculate_uniformity(image, analisis=None):
+    """
+    Calcula la uniformidad usando el Coeficiente de Variación (CV).
+    Devuelve un valor entre 0 (máxima no uniformidad) y 1 (máxima uniformidad).
+    """
+    if analisis is not None:
+        return calculate_histogram_metrics(analisis)["uniformity"]
+
+    mean, std = cv2.meanStdDev(image)
+    mean = mean[0][0] if mean[0][0] != 0 else 1e-10  # Evitar división por cero
+    cv = std[0][0] / mean
+    return 1 / (1 + cv)  # Normalizado a [0, 1]
+
+@instrumented("medidas.calculate_contrast")
+def calculate_contrast(image, analisis=None):
+    """Calcula el contraste como la desviación estándar de las intensidades de los píxeles."""
+    if analisis is not None:
+        return calculate_histogram_metrics(analisis)["contrast"]
+    return np.std(image)
+
+
+@instrumented("medidas.calculate_image_metrics")
+def calculate_image_metrics(original, processed, analisis=None):
+    """
+    Calcula todas las métricas recorriendo los píxeles de la procesada. Se usa
+    para métodos que no son una LUT global (por ejemplo CLAHE).
+    """
+    # Con análisis, el pico de PSNR sale de su cantidad de niveles
+    pico = None if analisis is None else analisis.histograma.shape[-1] - 1
+
+    return {
+        "ambe": calculate_ambe(original, processed, analisis),
+        "psnr": calculate_psnr(original, processed, pico),
+        "entropy": calculate_entropy(processed),
+        "contrast": calculate_contrast(processed),
+        "uniformity": calculate_uniformity(processed),
+    }
+
+
+# ```
+# Metricas en el dominio del histograma
+#
+# HE, DQHEPL y BHEPL-D son mapeos globales por LUT, por lo que todas las
+# metricas se pueden obtener del histograma original (un bin por nivel: 256
+# en 8 bits, hasta 65536 en 16 bits) y la LUT sin volver a recorrer los pixeles.
+
+
+@instrumented("medidas.calculate_lut_histogram")
+def calculate_lut_histogram(histograma, lut):
+    """Calcula el histograma de la imagen resultante de aplicar la LUT."""
+    return np.bincount(np.asarray(lut), weights=histograma, minlength=len(histograma))
+
+
+@instrumented("medidas.calculate_lut_histograms")
+def calculate_lut_histograms(histograma, tablas):
+    """
+    Calcula los histogramas (K, niveles) de las salidas de K tablas LUT (K, niveles)
+    con un solo bincount: la tabla k cuenta en los bins [k*niveles, (k+1)*niveles).
+    """
+    tablas = np.asarray(tablas)
+    cantidad, niveles = tablas.shape
+    indices = tablas + np.arange(cantidad)[:, None] * niveles
+    pesos = np.broadcast_to(histograma, tablas.shape)
+    conteos = np.bincount(indices.ravel(), weights=pesos.ravel(), minlength=cantidad * niveles)
+    return conteos.reshape(cantidad, niveles)
+
+
+@instrumented("medidas.calculate_lut_sse")
+def calculate_lut_sse(histograma, tablas):
+    """
+    Calcula la suma de errores cuadráticos de cada una de K tablas LUT (arreglo
+    (K, niveles)) respecto de la original (cada nivel i se mapea a tabla[i]),
+    para MSE y PSNR.
+    """
+    niveles = np.arange(len(histograma))
+    tablas = np.asarray(tablas, dtype=np.float64)
+    return ((niveles - tablas) ** 2) @ histograma
+
+
+@instrumented("medidas.calculate_histogram_metrics")
+def calculate_histogram_metrics(datos):
+    """
+    Calcula media, contraste (desviación estándar), entropía y uniformidad
+    a partir de un análisis de imagen o de un histograma con un bin por nivel.
+    """
+    histograma = as_analysis(datos).histograma
+    niveles = np.arange(len(histograma))
+    total_pixeles = histograma.sum()
+
+    media = np.dot(histograma, niveles) / total_pixeles
+    varianza = np.dot(histograma, (niveles - media) ** 2) / total_pixeles
+    contraste = np.sqrt(varianza)
+
+    # Entropía de Shannon en bits sobre los niveles presentes
+    probabilidades = histograma[histograma > 0] / total_pixeles
+    entropia = -np.sum(probabilidades * np.log2(probabilidades))
+
+    # Uniformidad con el mismo criterio que calculate_uniformity
+    media_cv = media if media != 0 else 1e-10
+    uniformidad = 1 / (1 + contraste / media_cv)
+
+    return {
+        "mean": media,
+        "entropy": entropia,
+        "contrast": contraste,
+        "uniformity": uniformidad,
+    }
+
+
+@instrumented("medidas.calculate_lut_metrics")
+def calculate_lut_metrics(datos, lut):
+    """
+    Calcula las métricas de una imagen procesada por una LUT global usando solo
+    el histograma de la original (o su análisis). Devuelve AMBE, MSE, PSNR,
+    entropía, contraste, uniformidad y media de la imagen procesada.
+    """
+    histograma = as_analysis(datos).histograma
+    lut = np.asarray(lut)
+    sse = calculate_lut_sse(histograma, [lut])[0]
+    return calculate_output_metrics(histograma, calculate_lut_histogram(histograma, lut), sse)
+
+
+@instrumented("medidas.calculate_output_metrics")
+def calculate_output_metrics(datos, histograma_salida, sse):
+    """
+    Calcula las métricas de una salida a partir del histograma de la original (o
+    su análisis), el histograma de la salida y su suma de errores cuadráticos,
+    sin recorrer los píxeles (ver calculate_lut_histograms y calculate_lut_sse).
+    """
+    histograma = as_analysis(datos).histograma
+    total_pixeles = histograma.sum()
+
+    original = calculate_histogram_metrics(histograma)
+    procesada = calculate_histogram_metrics(histograma_salida)
+    mse = sse / total_pixeles
+
+    procesada["ambe"] = abs(original["mean"] - procesada["mean"])
+    procesada["mse"] = mse
+    procesada["psnr"] = psnr_from_mse(mse, len(histograma) - 1)
+
+    return procesada
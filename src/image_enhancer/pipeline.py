@@ -0,0 +1,92 @@
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from . import instrumentacion
+
+# ```
+# Pipeline de lectura / calculo / escritura
+#
+# Las tres etapas se solapan: un grupo de hilos lee (decodifica) por adelantado
+# las siguientes imagenes, el hilo que llama procesa una por una en orden y
+# otro grupo de hilos escribe los resultados (por ejemplo la codificacion PNG
+# de cv2.imwrite). OpenCV libera el GIL al decodificar, codificar y procesar,
+# asi que los hilos trabajan en paralelo de verdad.
+#
+# Ambas colas estan acotadas por 'capacidad': como maximo hay esa cantidad de
+# lecturas adelantadas y de escrituras pendientes, de modo que la memoria no
+# crece con el tamaño del dataset.
+
+
+def run_pipeline(elementos, leer, procesar, escribir, lectores=2, escritores=2, capacidad=8):
+    """
+    Ejecuta escribir(elemento, procesar(elemento, leer(elemento))) para cada
+    elemento, con las lecturas y escrituras en grupos de hilos concurrentes.
+    'procesar' corre en el hilo que llama, en el orden de 'elementos'.
+
+    Devuelve una lista de (elemento, mensaje) con los elementos que fallaron
+    en cualquiera de las etapas. Lanza ValueError si 'lectores', 'escritores' o
+    'capacidad' son menores que 1 (con cero cupos el pipeline no avanzaría).
+    """
+    limites = {"lectores": lectores, "escritores": escritores, "capacidad": capacidad}
+    for nombre, valor in limites.items():
+        if valor < 1:
+            raise ValueError(f"'{nombre}' debe ser al menos 1, se recibió {valor}")
+
+    elementos = list(elementos)
+    errores = []
+    bloqueo_errores = threading.Lock()
+    cupos_escritura = threading.BoundedSemaphore(capacidad)
+
+    def registrar_error(elemento, error):
+        with bloqueo_errores:
+            errores.append((elemento, str(error)))
+
+    def escribir_y_liberar(elemento, resultado):
+        try:
+            with instrumentacion.span("pipeline.escribir"):
+                escribir(elemento, resultado)
+        except Exception as e:
+            registrar_error(elemento, e)
+        finally:
+            cupos_escritura.release()
+
+    def leer_medido(elemento):
+        with instrumentacion.span("pipeline.leer"):
+            return leer(elemento)
+
+    with ThreadPoolExecutor(lectores, thread_name_prefix="lector") as grupo_lectura, \
+            ThreadPoolExecutor(escritores, thread_name_prefix="escritor") as grupo_escritura:
+        # Ventana deslizante de lecturas adelantadas, consumidas en orden
+        pendientes = deque()
+        siguientes = iter(elementos)
+        for elemento in siguientes:
+            pendientes.append((elemento, grupo_lectura.submit(leer_medido, elemento)))
+            if len(pendientes) >= capacidad:
+                break
+
+        while pendientes:
+            elemento, lectura = pendientes.popleft()
+            siguiente = next(siguientes, None)
+            if siguiente is not None:
+                pendientes.append(
+                    (siguiente, grupo_lectura.submit(leer_medido, siguiente))
+                )
+
+            try:
+                with instrumentacion.span("pipeline.espera_lectura"):
+                    dato = lectura.result()
+                with instrumentacion.span("pipeline.procesar"):
+                    resultado = procesar(elemento, dato)
+            except Exception as e:
+                registrar_error(elemento, e)
+                continue
+
+            # Si los escritores van atrasados, el cálculo espera un cupo
+            with instrumentacion.span("pipeline.espera_escritura"):
+                cupos_escritura.acquire()
+            grupo_escritura.submit(escribir_y_liberar, elemento, resultado)
+
+    # El orden de los errores sigue el de los elementos
+    posiciones = {elemento: i for i, elemento in enumerate(elementos)}
+    errores.sort(key=lambda error: posiciones.get(error[0], 0))
+    return errores
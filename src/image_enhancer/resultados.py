@@ -0,0 +1,287 @@
+import os
+import hashlib
+import sqlite3
+import numpy as np
+from .agregados import MetricsAggregator
+from . import instrumentacion
+from .instrumentacion import instrumented
+
+# ```
+# Resultados de una ejecucion en formato columnar
+#
+# Cada ejecucion del modo de metricas se guarda en un solo archivo SQLite con
+# una fila por (imagen, metodo) y columnas REAL para cada metrica, mas una
+# fila por imagen con las metricas de la original. Las filas se insertan a
+# medida que llegan los registros, y el resumen y la exportacion opcional a
+# archivos de texto se leen de ese archivo.
+#
+# El archivo tambien guarda un manifiesto con la firma (mtime, tamaño y hash)
+# de cada imagen procesada. En una ejecucion incremental el archivo no se
+# recrea: solo se procesan las imagenes nuevas o modificadas y se borran las
+# filas de las eliminadas. Los registros y su fila del manifiesto se confirman
+# en la misma transaccion, asi que una ejecucion interrumpida continua desde
+# la ultima confirmacion.
+
+ruta_resultados = "estadisticas/resultados.sqlite"
+
+nombres_originales = ["entropy", "contrast", "uniformity"]
+
+
+class MetricsSink:
+    """
+    Escribe los registros de una ejecución en un archivo SQLite. Por defecto el
+    archivo se crea de nuevo; con 'continuar' se conservan sus filas y su
+    manifiesto (modo incremental). Se usa como context manager; las filas se
+    confirman cada 'lote' imágenes.
+    """
+
+    def __init__(self, ruta, nombres_metricas, lote=64, continuar=False):
+        self.ruta = ruta
+        self.nombres_metricas = list(nombres_metricas)
+        self.lote = lote
+        self.pendientes = 0
+
+        directorio = os.path.dirname(ruta)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        if os.path.exists(ruta) and not continuar:
+            os.remove(ruta)
+
+        self.conexion = sqlite3.connect(ruta)
+        columnas = ", ".join(f"{nombre} REAL" for nombre in self.nombres_metricas)
+        self.conexion.execute(
+            f"CREATE TABLE IF NOT EXISTS metricas (imagen TEXT, metodo TEXT, {columnas})"
+        )
+        self.conexion.execute(
+            "CREATE INDEX IF NOT EXISTS metricas_imagen ON metricas (imagen)"
+        )
+        columnas = ", ".join(f"{nombre} REAL" for nombre in nombres_originales)
+        self.conexion.execute(
+            f"CREATE TABLE IF NOT EXISTS originales (imagen TEXT PRIMARY KEY, {columnas})"
+        )
+        self.conexion.execute(
+            "CREATE TABLE IF NOT EXISTS manifiesto "
+            "(imagen TEXT PRIMARY KEY, mtime_ns INTEGER, tamaño INTEGER, hash TEXT)"
+        )
+        self.conexion.commit()
+
+    def manifest(self):
+        """Devuelve el manifiesto como diccionario {imagen: (mtime_ns, tamaño, hash)}."""
+        filas = self.conexion.execute("SELECT * FROM manifiesto").fetchall()
+        return {fila[0]: tuple(fila[1:]) for fila in filas}
+
+    def remove(self, imagenes):
+        """Borra las filas y la entrada del manifiesto de las imágenes indicadas."""
+        for tabla in ("metricas", "originales", "manifiesto"):
+            self.conexion.executemany(
+                f"DELETE FROM {tabla} WHERE imagen = ?", [[imagen] for imagen in imagenes]
+            )
+        self.conexion.commit()
+
+    def update_signature(self, imagen, firma):
+        """Registra en el manifiesto la firma (mtime_ns, tamaño, hash) de una imagen."""
+        self.conexion.execute(
+            "INSERT OR REPLACE INTO manifiesto VALUES (?, ?, ?, ?)", [imagen, *firma]
+        )
+
+    @instrumented("resultados.MetricsSink.add")
+    def add(self, imagen, originales, registro, nombres_metodos, firma=None):
+        """
+        Agrega las métricas de una imagen: 'originales' en el orden de
+        nombres_originales y 'registro' como matriz métodos x métricas. Si la
+        imagen ya tenía filas se reemplazan; con 'firma' (mtime_ns, tamaño, hash)
+        se registra en el manifiesto.
+        """
+        self.conexion.execute("DELETE FROM metricas WHERE imagen = ?", [imagen])
+        marcadores = ", ".join("?" * (len(nombres_originales) + 1))
+        self.conexion.execute(
+            f"INSERT OR REPLACE INTO originales VALUES ({marcadores})",
+            [imagen, *map(float, originales)],
+        )
+        marcadores = ", ".join("?" * (len(self.nombres_metricas) + 2))
+        self.conexion.executemany(
+            f"INSERT INTO metricas VALUES ({marcadores})",
+            [
+                [imagen, metodo, *map(float, fila)]
+                for metodo, fila in zip(nombres_metodos, registro)
+            ],
+        )
+
+        if firma is not None:
+            self.update_signature(imagen, firma)
+
+        self.pendientes += 1
+        if self.pendientes >= self.lote:
+            with instrumentacion.span("resultados.commit"):
+                self.conexion.commit()
+            self.pendientes = 0
+
+    def close(self):
+        """Confirma las filas pendientes y cierra el archivo."""
+        self.conexion.commit()
+        self.conexion.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excepcion):
+        self.close()
+
+
+def file_hash(path):
+    """Hash SHA-1 del contenido de un archivo."""
+    resumen = hashlib.sha1()
+    with open(path, "rb") as archivo:
+        for bloque in iter(lambda: archivo.read(1 << 20), b""):
+            resumen.update(bloque)
+    return resumen.hexdigest()
+
+
+def file_signature(path, anterior=None):
+    """
+    Firma (mtime_ns, tamaño, hash) de un archivo. Si mtime y tamaño coinciden
+    con la firma 'anterior' se reutiliza su hash sin volver a leer el archivo.
+    """
+    info = os.stat(path)
+    if anterior is not None and tuple(anterior[:2]) == (info.st_mtime_ns, info.st_size):
+        return tuple(anterior)
+    return (info.st_mtime_ns, info.st_size, file_hash(path))
+
+
+@instrumented("resultados.plan_incremental")
+def plan_incremental(directorio, archivos, manifiesto):
+    """
+    Compara los archivos actuales con el manifiesto. Devuelve las firmas de los
+    archivos actuales, los archivos a procesar (nuevos o con contenido distinto),
+    los que solo cambiaron de mtime o tamaño registrado (mismo hash) y los eliminados.
+    """
+    firmas = {}
+    pendientes = []
+    tocados = []
+    for filename in archivos:
+        anterior = manifiesto.get(filename)
+        firma = file_signature(os.path.join(directorio, filename), anterior)
+        firmas[filename] = firma
+        if anterior is None or anterior[2] != firma[2]:
+            pendientes.append(filename)
+        elif tuple(anterior) != firma:
+            tocados.append(filename)
+
+    actuales = set(archivos)
+    eliminados = [filename for filename in manifiesto if filename not in actuales]
+    return firmas, pendientes, tocados, eliminados
+
+
+@instrumented("resultados.load_metrics")
+def load_metrics(ruta=ruta_resultados, nombres_metodos=None):
+    """
+    Lee las métricas de una ejecución como diccionario
+    {método: {métrica: arreglo float64}}, con las imágenes en el orden insertado.
+    Si se indican 'nombres_metodos', el diccionario sigue ese orden e incluye
+    arreglos vacíos para los métodos sin filas.
+    """
+    with sqlite3.connect(ruta) as conexion:
+        cursor = conexion.execute("SELECT * FROM metricas ORDER BY rowid")
+        nombres = [columna[0] for columna in cursor.description]
+        filas = cursor.fetchall()
+
+    if nombres_metodos is None:
+        nombres_metodos = list(dict.fromkeys(fila[1] for fila in filas))
+
+    metricas = {}
+    for metodo in nombres_metodos:
+        valores = np.array(
+            [fila[2:] for fila in filas if fila[1] == metodo], dtype=np.float64
+        ).reshape(-1, len(nombres) - 2)
+        metricas[metodo] = {
+            nombre: valores[:, j] for j, nombre in enumerate(nombres[2:])
+        }
+    return metricas
+
+
+@instrumented("resultados.aggregate_metrics")
+def aggregate_metrics(ruta, nombres_metodos, nombres_metricas):
+    """
+    Recorre las filas del archivo de resultados y devuelve un
+    agregados.MetricsAggregator con el resumen, sin cargar todas las filas en memoria.
+    """
+    agregado = MetricsAggregator(nombres_metodos, nombres_metricas)
+    columnas = ", ".join(nombres_metricas)
+
+    def agregar(filas):
+        if len(filas) == len(nombres_metodos) and all(
+            metodo == nombre for (metodo, _), nombre in zip(filas, nombres_metodos)
+        ):
+            agregado.update([valores for _, valores in filas])
+            return
+        # Imagen con un subconjunto de los métodos: valor por valor
+        for metodo, valores in filas:
+            if metodo in nombres_metodos:
+                for metrica, valor in zip(nombres_metricas, valores):
+                    agregado.update_value(metodo, metrica, valor)
+
+    with sqlite3.connect(ruta) as conexion:
+        cursor = conexion.execute(
+            f"SELECT imagen, metodo, {columnas} FROM metricas ORDER BY imagen, rowid"
+        )
+        actual = None
+        filas = []
+        for imagen, metodo, *valores in cursor:
+            if imagen != actual and filas:
+                agregar(filas)
+                filas = []
+            actual = imagen
+            filas.append((metodo, valores))
+        if filas:
+            agregar(filas)
+
+    return agregado
+
+
+@instrumented("resultados.export_text")
+def export_text(ruta=ruta_resultados, directorio="estadisticas"):
+    """Escribe el archivo '*_stats.txt' de cada imagen a partir de los resultados."""
+    with sqlite3.connect(ruta) as conexion:
+        originales = conexion.execute(
+            "SELECT * FROM originales ORDER BY rowid"
+        ).fetchall()
+        filas = conexion.execute(
+            "SELECT imagen, metodo, ambe, psnr, entropy, contrast, uniformity, time"
+            " FROM metricas ORDER BY rowid"
+        ).fetchall()
+
+    por_imagen = {}
+    for fila in filas:
+        por_imagen.setdefault(fila[0], []).append(fila[1:])
+
+    os.makedirs(directorio, exist_ok=True)
+    for filename, orig_entropy, orig_contrast, orig_uniformity in originales:
+        stats_filename = os.path.splitext(filename)[0] + "_stats.txt"
+        stats_path = os.path.join(directorio, stats_filename)
+
+        with open(stats_path, "w") as stats_file:
+            stats_file.write(f"Estadísticas para: {filename}\n")
+            stats_file.write("=" * 50 + "\n\n")
+
+            # Escribir métricas de la imagen original
+            stats_file.write("Imagen Original:\n")
+            stats_file.write(f"Entropía: {orig_entropy:.4f}\n")
+            stats_file.write(f"Contraste: {orig_contrast:.4f}\n")
+            stats_file.write(f"Uniformidad: {orig_uniformity:.4f}\n")
+            stats_file.write("-" * 40 + "\n\n")
+
+            for name, ambe, psnr, entropy, contrast, uniformity, tiempo in por_imagen.get(
+                filename, []
+            ):
+                stats_file.write(f"Método: {name}\n")
+                stats_file.write(f"AMBE: {ambe:.4f}\n")
+                stats_file.write(f"PSNR: {psnr:.4f} dB\n")
+                stats_file.write(f"Entropía: {entropy:.4f}\n")
+                stats_file.write(f"Contraste: {contrast:.4f}\n")
+                stats_file.write(f"Uniformidad: {uniformity:.4f}\n")
+                # SQLite guarda como NULL el tiempo (NaN) de un resultado de la cache
+                if tiempo is None:
+                    stats_file.write("Tiempo: - (resultado en cache)\n")
+                else:
+                    stats_file.write(f"Tiempo: {tiempo*1000:.2f} ms\n")
+                stats_file.write("-" * 40 + "\n\n")
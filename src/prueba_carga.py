@@ -0,0 +1,201 @@
+import io
+import os
+import time
+import socket
+import argparse
+import threading
+import http.client
+import numpy as np
+import cv2
+
+# ```
+# Prueba de carga del servicio de mejora
+#
+# Varios clientes concurrentes, cada uno con una conexion persistente, envian
+# peticiones a servicio.py durante una cantidad fija de peticiones y se mide
+# el rendimiento (peticiones y cuadros por segundo) y la latencia de cada
+# peticion (percentiles). Los cuadros son imagenes del dataset, enviadas
+# codificadas tal como estan en disco o decodificadas como .npy crudo.
+#
+# Ejemplos:
+#   python prueba_carga.py --concurrencia 4 --peticiones 400
+#   python prueba_carga.py --socket /tmp/mejora.sock --lote 8 --crudo --metricas
+
+directorio_dataset = "dataset/"
+tipos_imagen = {".png": "image/png", ".jpg": "image/jpeg", ".jpeg": "image/jpeg"}
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """Conexión HTTP sobre un socket Unix."""
+
+    def __init__(self, ruta, timeout=60):
+        super().__init__("localhost", timeout=timeout)
+        self.ruta = ruta
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.ruta)
+
+
+def load_frames(directorio, cantidad, crudo):
+    """
+    Lee 'cantidad' imágenes del directorio: (Content-Type, bytes) tal como
+    están en disco, o los cuadros decodificados en escala de grises si 'crudo'.
+    """
+    archivos = sorted(
+        f for f in os.listdir(directorio) if os.path.splitext(f)[1].lower() in tipos_imagen
+    )[:cantidad]
+    cuadros = []
+    for nombre in archivos:
+        ruta = os.path.join(directorio, nombre)
+        if crudo:
+            cuadros.append(cv2.imread(ruta, cv2.IMREAD_GRAYSCALE))
+        else:
+            with open(ruta, "rb") as archivo:
+                cuadros.append(np.frombuffer(archivo.read(), dtype=np.uint8))
+    return archivos, cuadros
+
+
+def build_body(archivos, cuadros, indices, crudo):
+    """Cuerpo y Content-Type de una petición con los cuadros indicados."""
+    if len(indices) == 1 and not crudo:
+        i = indices[0]
+        tipo = tipos_imagen[os.path.splitext(archivos[i])[1].lower()]
+        return cuadros[i].tobytes(), tipo
+
+    datos = io.BytesIO()
+    if crudo and len({cuadros[i].shape for i in indices}) == 1:
+        np.save(datos, np.stack([cuadros[i] for i in indices]))
+        return datos.getvalue(), "application/x-npy"
+    np.savez(datos, **{str(k): cuadros[i] for k, i in enumerate(indices)})
+    return datos.getvalue(), "application/x-npz"
+
+
+def run_load(conectar, ruta, cuerpos, concurrencia, peticiones, calentamiento=0):
+    """
+    Envía 'peticiones' peticiones POST a 'ruta' desde 'concurrencia' clientes,
+    rotando entre los cuerpos dados. Devuelve las latencias en segundos de las
+    respuestas correctas, la cantidad de errores, el tiempo total y los bytes recibidos.
+    """
+    siguiente = iter(range(calentamiento + peticiones))
+    bloqueo = threading.Lock()
+    latencias = []
+    errores = [0]
+    recibidos = [0]
+    marcas = {}
+
+    def cliente():
+        conexion = conectar()
+        while True:
+            with bloqueo:
+                numero = next(siguiente, None)
+                if numero == calentamiento:
+                    marcas["inicio"] = time.perf_counter()
+            if numero is None:
+                break
+            cuerpo, tipo = cuerpos[numero % len(cuerpos)]
+            inicio = time.perf_counter()
+            try:
+                conexion.request("POST", ruta, body=cuerpo, headers={"Content-Type": tipo})
+                respuesta = conexion.getresponse()
+                datos = respuesta.read()
+                correcta = respuesta.status == 200
+            except (OSError, http.client.HTTPException):
+                conexion.close()
+                conexion = conectar()
+                correcta = False
+                datos = b""
+            latencia = time.perf_counter() - inicio
+
+            if numero < calentamiento:
+                continue
+            with bloqueo:
+                recibidos[0] += len(datos)
+                if correcta:
+                    latencias.append(latencia)
+                else:
+                    errores[0] += 1
+        conexion.close()
+
+    hilos = [threading.Thread(target=cliente) for _ in range(concurrencia)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    total = time.perf_counter() - marcas.get("inicio", time.perf_counter())
+    return np.array(latencias), errores[0], total, recibidos[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga del servicio de mejora")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8000)
+    parser.add_argument("--socket", help="Conectarse a este socket Unix")
+    parser.add_argument("--concurrencia", type=int, default=4, help="Clientes simultáneos")
+    parser.add_argument("--peticiones", type=int, default=200, help="Peticiones medidas")
+    parser.add_argument(
+        "--calentamiento", type=int, default=10, help="Peticiones previas que no se miden"
+    )
+    parser.add_argument("--lote", type=int, default=1, help="Cuadros por petición")
+    parser.add_argument("--metodos", default="CLAHE,HE,DQHEPL,BHEPL-D")
+    parser.add_argument("--metricas", action="store_true", help="Pedir también las métricas")
+    parser.add_argument("--formato", default="crudo", choices=["crudo", "png"])
+    parser.add_argument(
+        "--crudo", action="store_true", help="Enviar los cuadros decodificados (.npy)"
+    )
+    parser.add_argument("--directorio", default=directorio_dataset)
+    parser.add_argument(
+        "--imagenes", type=int, default=32, help="Imágenes distintas que se rotan"
+    )
+    args = parser.parse_args()
+
+    archivos, cuadros = load_frames(args.directorio, args.imagenes, args.crudo)
+    if not cuadros:
+        raise SystemExit(f"No hay imágenes en {args.directorio}")
+    cuerpos = [
+        build_body(
+            archivos,
+            cuadros,
+            [(inicio + k) % len(cuadros) for k in range(args.lote)],
+            args.crudo,
+        )
+        for inicio in range(0, len(cuadros), args.lote)
+    ]
+
+    if args.socket:
+        def conectar():
+            return UnixHTTPConnection(args.socket)
+    else:
+        def conectar():
+            return http.client.HTTPConnection(args.host, args.puerto, timeout=60)
+
+    ruta = f"/mejorar?metodos={args.metodos}&formato={args.formato}"
+    if args.metricas:
+        ruta += "&metricas=1"
+
+    latencias, errores, total, recibidos = run_load(
+        conectar, ruta, cuerpos, args.concurrencia, args.peticiones, args.calentamiento
+    )
+
+    enviados = sum(len(cuerpo) for cuerpo, _ in cuerpos) / len(cuerpos) * args.peticiones
+    correctas = len(latencias)
+    print(
+        f"Peticiones: {correctas} correctas, {errores} con error | "
+        f"concurrencia {args.concurrencia}, lote {args.lote}"
+    )
+    print(
+        f"Rendimiento: {correctas / total:.1f} peticiones/s, "
+        f"{correctas * args.lote / total:.1f} cuadros/s "
+        f"({enviados / total / 2**20:.1f} MB/s enviados, {recibidos / total / 2**20:.1f} MB/s recibidos)"
+    )
+    if correctas:
+        p50, p90, p99 = np.percentile(latencias * 1000, [50, 90, 99])
+        print(
+            f"Latencia (ms): media {latencias.mean() * 1000:.2f} | p50 {p50:.2f} | "
+            f"p90 {p90:.2f} | p99 {p99:.2f} | máx {latencias.max() * 1000:.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,423 @@
+import io
+import os
+import json
+import time
+import zlib
+import zipfile
+import argparse
+import threading
+import socketserver
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import cv2
+import numpy as np
+from image_enhancer import metodos
+from image_enhancer import medidas
+from image_enhancer import color
+from image_enhancer.analisis import analyze_image
+
+# ```
+# Servicio local de mejora de imagenes
+#
+# Un proceso de larga duracion que expone los metodos de metodos.py y las
+# metricas de medidas.py por HTTP (en un puerto TCP o en un socket Unix), con
+# un grupo de workers ya inicializados: modulos importados, CLAHE creado y
+# OpenCV con un hilo por worker. Asi cada peticion solo paga la decodificacion,
+# el metodo y la codificacion de la respuesta.
+#
+# Los workers son hilos por defecto (OpenCV libera el GIL y cada hilo tiene
+# sus propios objetos CLAHE) o procesos con --procesos.
+#
+# Peticiones:
+#   POST /mejorar?metodos=CLAHE,HE&metricas=1&formato=png
+#       Cuerpo, segun Content-Type:
+#       - image/*: un cuadro codificado (PNG, JPEG, TIFF, ...).
+#       - application/x-npy: un .npy con un cuadro crudo (alto, ancho) o un
+#         lote (N, alto, ancho).
+#       - application/x-npz: un .npz con un cuadro por arreglo, crudo (2D) o
+#         codificado (bytes como arreglo uint8 de 1D).
+#       Otros parametros: profundidad_nativa=1 para leer cuadros de 16 bits
+#       sin convertirlos, y parametros={"CLAHE": {"clip_limit": 3}} (JSON).
+#       Con color=1 los cuadros conservan sus canales (BGR, y alfa o IR
+#       despues) y los metodos se aplican a la luminancia (color.py) en el
+#       espacio indicado con espacio=YCrCb (por defecto) o espacio=LAB. En
+#       este modo un .npy 3D es un cuadro (alto, ancho, canales) y un 4D un lote.
+#       Respuesta: un .npz con el arreglo "<cuadro>/<metodo>" de cada salida
+#       (crudo, o PNG como bytes con formato=png), y los arreglos "metricas"
+#       y "errores" con un JSON por cuadro.
+#   GET /metodos  -> métodos y parámetros por defecto (JSON)
+#   GET /estado   -> workers y contadores del servicio (JSON)
+#
+# Ejemplo:
+#   python servicio.py --puerto 8000 --workers 4
+#   curl --data-binary @foto.png -H "Content-Type: image/png" \
+#       "http://127.0.0.1:8000/mejorar?metodos=CLAHE&metricas=1" -o salida.npz
+
+nombres_metricas = ["ambe", "psnr", "entropy", "contrast", "uniformity"]
+formatos_salida = ["crudo", "png"]
+tamaño_maximo_peticion = 512 * 1024 * 1024
+
+
+# ```
+# Trabajo de los workers
+
+
+def warm_up(proceso=False):
+    """
+    Inicializa un worker: un hilo de OpenCV (con procesos) y una pasada de
+    cada método y métrica sobre una imagen chica para crear los objetos CLAHE
+    del worker y cargar el código antes de la primera petición.
+    """
+    if proceso:
+        cv2.setNumThreads(1)
+    imagen = np.tile(np.arange(64, dtype=np.uint8) * 4, (64, 1))
+    process_frame(imagen, list(metodos.parametros_metodos), "crudo", True)
+    process_frame(
+        np.dstack([imagen] * 3), list(metodos.parametros_metodos), "crudo", True,
+        espacio=color.espacio_color,
+    )
+
+
+def _listo():
+    """Tarea vacía para forzar la creación de los workers."""
+    return os.getpid()
+
+
+def decode_frame(dato, profundidad_nativa=False, en_color=False):
+    """
+    Devuelve el cuadro en escala de grises (o con todos sus canales si
+    'en_color'): un arreglo crudo (2D, o BGR de 3 canales) o los bytes de una
+    imagen codificada (bytes o arreglo uint8 de 1D).
+    """
+    if isinstance(dato, np.ndarray) and dato.ndim >= 2:
+        imagen = dato
+    elif en_color:
+        imagen = cv2.imdecode(np.frombuffer(dato, dtype=np.uint8), cv2.IMREAD_UNCHANGED)
+        if imagen is not None and imagen.dtype == np.uint16 and not profundidad_nativa:
+            imagen = cv2.convertScaleAbs(imagen, alpha=1 / 256)
+    else:
+        modo = cv2.IMREAD_GRAYSCALE
+        if profundidad_nativa:
+            modo |= cv2.IMREAD_ANYDEPTH
+        imagen = cv2.imdecode(np.frombuffer(dato, dtype=np.uint8), modo)
+    if imagen is None:
+        raise ValueError("No se pudo decodificar el cuadro")
+
+    if imagen.ndim == 3 and not en_color:
+        imagen = cv2.cvtColor(imagen, cv2.COLOR_BGR2GRAY)
+    if imagen.dtype not in (np.uint8, np.uint16):
+        raise ValueError(f"Tipo de cuadro no soportado: {imagen.dtype}")
+    return np.ascontiguousarray(imagen)
+
+
+def encode_frame(imagen, formato):
+    """Salida de un método en el formato pedido ("crudo" o "png")."""
+    if formato == "crudo":
+        return imagen
+    codificado, datos = cv2.imencode(".png", imagen)
+    if not codificado:
+        raise ValueError("No se pudo codificar la salida")
+    return datos.ravel()
+
+
+def process_frame(dato, nombres_metodos, formato="crudo", con_metricas=False, parametros=None,
+                  profundidad_nativa=False, espacio=None):
+    """
+    Decodifica un cuadro, le aplica los métodos indicados y devuelve
+    ({método: salida}, {método: métricas} o None). Las métricas incluyen el
+    tiempo del método en segundos ("time"). Con un espacio de color ("YCrCb" o
+    "LAB") el cuadro conserva sus canales y se mejora su luminancia.
+    """
+    parametros = parametros or {}
+    if espacio is not None:
+        imagen = decode_frame(dato, profundidad_nativa, en_color=True)
+        salidas, metricas = color.enhance_color(
+            imagen, nombres_metodos, espacio, con_metricas, parametros
+        )
+        if con_metricas:
+            metricas = {
+                metodo: {nombre: float(valores[nombre]) for nombre in nombres_metricas + ["time"]}
+                for metodo, valores in metricas.items()
+            }
+        return {m: encode_frame(salida, formato) for m, salida in salidas.items()}, metricas
+
+    imagen = decode_frame(dato, profundidad_nativa)
+    analisis = analyze_image(imagen)
+
+    salidas = {}
+    metricas = {} if con_metricas else None
+    for metodo in nombres_metodos:
+        inicio = time.perf_counter()
+        if metodo in metodos.constructores_lut:
+            tabla = metodos.constructores_lut[metodo](analisis, **parametros.get(metodo, {}))
+            salida = metodos.apply_lut(imagen, tabla)
+        else:
+            salida = metodos.apply_clahe(imagen, **parametros.get(metodo, {}))
+        tiempo = time.perf_counter() - inicio
+        salidas[metodo] = encode_frame(salida, formato)
+
+        if con_metricas:
+            # Los métodos de LUT global se evalúan en el dominio del histograma
+            if metodo in metodos.constructores_lut:
+                valores = medidas.calculate_lut_metrics(analisis, tabla)
+            else:
+                valores = medidas.calculate_image_metrics(imagen, salida, analisis)
+            metricas[metodo] = {nombre: float(valores[nombre]) for nombre in nombres_metricas}
+            metricas[metodo]["time"] = tiempo
+
+    return salidas, metricas
+
+
+# ```
+# Servidor HTTP
+
+
+# Errores de np.load con un cuerpo vacío, truncado o corrupto (el .npz es un zip)
+errores_lectura = (ValueError, EOFError, OSError, zipfile.BadZipFile, zlib.error)
+
+
+def read_frames(cuerpo, tipo, en_color=False):
+    """
+    Cuadros de una petición según su Content-Type, como {nombre: dato}. En
+    color un .npy de 4 dimensiones es un lote; en gris, uno de 3. Lanza
+    ValueError si el tipo no está soportado o el cuerpo no se puede leer.
+    """
+    if tipo.startswith("image/"):
+        return {"0": cuerpo}
+    try:
+        if tipo == "application/x-npy":
+            arreglo = np.load(io.BytesIO(cuerpo), allow_pickle=False)
+            if arreglo.ndim == (4 if en_color else 3):
+                return {str(i): cuadro for i, cuadro in enumerate(arreglo)}
+            return {"0": arreglo}
+        if tipo == "application/x-npz":
+            with np.load(io.BytesIO(cuerpo), allow_pickle=False) as archivo:
+                return {nombre: archivo[nombre] for nombre in archivo.files}
+    except errores_lectura as e:
+        raise ValueError(f"Cuerpo {tipo} inválido: {e}") from e
+    raise ValueError(f"Content-Type no soportado: {tipo}")
+
+
+class EnhancementService:
+    """Grupo de workers inicializados y contadores del servicio."""
+
+    def __init__(self, workers=None, procesos=False):
+        self.workers = workers or os.cpu_count() or 1
+        self.procesos = procesos
+        if procesos:
+            self.grupo = ProcessPoolExecutor(self.workers, initializer=warm_up, initargs=(True,))
+        else:
+            # Los hilos comparten OpenCV: un hilo interno cada uno para no sobresuscribir
+            if self.workers > 1:
+                cv2.setNumThreads(1)
+            self.grupo = ThreadPoolExecutor(
+                self.workers, thread_name_prefix="worker", initializer=warm_up
+            )
+
+        # Crear e inicializar todos los workers antes de aceptar peticiones
+        for tarea in [self.grupo.submit(_listo) for _ in range(self.workers)]:
+            tarea.result()
+
+        self.bloqueo = threading.Lock()
+        self.contadores = {"peticiones": 0, "cuadros": 0, "errores": 0}
+        self.inicio = time.time()
+
+    def count(self, **valores):
+        with self.bloqueo:
+            for nombre, valor in valores.items():
+                self.contadores[nombre] += valor
+
+    def status(self):
+        with self.bloqueo:
+            contadores = dict(self.contadores)
+        return {
+            "workers": self.workers,
+            "procesos": self.procesos,
+            "segundos_activo": time.time() - self.inicio,
+            **contadores,
+        }
+
+    def enhance(self, cuadros, nombres_metodos, formato, con_metricas, parametros, profundidad_nativa,
+                espacio=None):
+        """
+        Procesa los cuadros en paralelo en los workers. Devuelve (salidas, métricas,
+        errores), cada uno como diccionario por nombre de cuadro.
+        """
+        tareas = {
+            nombre: self.grupo.submit(
+                process_frame, dato, nombres_metodos, formato, con_metricas, parametros,
+                profundidad_nativa, espacio,
+            )
+            for nombre, dato in cuadros.items()
+        }
+        salidas, metricas, errores = {}, {}, {}
+        for nombre, tarea in tareas.items():
+            try:
+                salidas[nombre], metricas[nombre] = tarea.result()
+            except Exception as e:
+                errores[nombre] = str(e)
+        self.count(peticiones=1, cuadros=len(salidas), errores=len(errores))
+        return salidas, metricas, errores
+
+    def close(self):
+        self.grupo.shutdown()
+
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    """Atiende las peticiones HTTP del servicio (conexiones persistentes)."""
+
+    protocol_version = "HTTP/1.1"
+    servicio = None
+
+    def address_string(self):
+        # En un socket Unix no hay dirección de cliente
+        return self.client_address[0] if self.client_address else "unix"
+
+    def log_message(self, formato, *args):
+        if self.server.registrar:
+            super().log_message(formato, *args)
+
+    def _responder(self, estado, cuerpo, tipo):
+        self.send_response(estado)
+        self.send_header("Content-Type", tipo)
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def _responder_json(self, estado, datos):
+        self._responder(estado, json.dumps(datos).encode("utf-8"), "application/json")
+
+    def do_GET(self):
+        ruta = urlparse(self.path).path
+        if ruta == "/metodos":
+            self._responder_json(200, {
+                metodo: {**parametros, "lut_global": metodo in metodos.constructores_lut}
+                for metodo, parametros in metodos.parametros_metodos.items()
+            })
+        elif ruta == "/estado":
+            self._responder_json(200, self.servicio.status())
+        else:
+            self._responder_json(404, {"error": f"Ruta desconocida: {ruta}"})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        try:
+            longitud = int(self.headers.get("Content-Length") or 0)
+            if longitud < 0:
+                raise ValueError
+        except ValueError:
+            # Sin una longitud válida no se sabe dónde termina el cuerpo
+            self.close_connection = True
+            self._responder_json(400, {"error": "Content-Length inválido"})
+            return
+        if longitud > tamaño_maximo_peticion:
+            self.close_connection = True
+            self._responder_json(413, {"error": "Petición demasiado grande"})
+            return
+        cuerpo = self.rfile.read(longitud)
+
+        if url.path != "/mejorar":
+            self._responder_json(404, {"error": f"Ruta desconocida: {url.path}"})
+            return
+
+        try:
+            consulta = {nombre: valores[-1] for nombre, valores in parse_qs(url.query).items()}
+            nombres_metodos = consulta.get("metodos", ",".join(metodos.parametros_metodos)).split(",")
+            for metodo in nombres_metodos:
+                if metodo not in metodos.parametros_metodos:
+                    raise ValueError(f"Método desconocido: {metodo}")
+            formato = consulta.get("formato", "crudo")
+            if formato not in formatos_salida:
+                raise ValueError(f"Formato de salida no soportado: {formato}")
+            parametros = json.loads(consulta.get("parametros", "{}"))
+            espacio = None
+            if consulta.get("color") == "1":
+                espacio = consulta.get("espacio", color.espacio_color)
+                if espacio not in color.espacios_color:
+                    raise ValueError(f"Espacio de color no soportado: {espacio}")
+            tipo = self.headers.get("Content-Type", "").split(";")[0].strip()
+            cuadros = read_frames(cuerpo, tipo, espacio is not None)
+        except ValueError as e:
+            self._responder_json(400, {"error": str(e)})
+            return
+
+        salidas, metricas, errores = self.servicio.enhance(
+            cuadros,
+            nombres_metodos,
+            formato,
+            consulta.get("metricas") == "1",
+            parametros,
+            consulta.get("profundidad_nativa") == "1",
+            espacio,
+        )
+
+        arreglos = {
+            f"{nombre}/{metodo}": salida
+            for nombre, por_metodo in salidas.items()
+            for metodo, salida in por_metodo.items()
+        }
+        if consulta.get("metricas") == "1":
+            arreglos["metricas"] = np.array(json.dumps(metricas))
+        arreglos["errores"] = np.array(json.dumps(errores))
+
+        respuesta = io.BytesIO()
+        np.savez(respuesta, **arreglos)
+        estado = 200 if salidas or not errores else 422
+        self._responder(estado, respuesta.getvalue(), "application/x-npz")
+
+
+class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Servidor HTTP sobre un socket Unix, con un hilo por conexión."""
+
+    daemon_threads = True
+
+
+def create_server(servicio, puerto=8000, host="127.0.0.1", socket_unix=None, registrar=False):
+    """Crea el servidor HTTP del servicio en un puerto TCP o en un socket Unix."""
+    manejador = type("Manejador", (ServiceHandler,), {"servicio": servicio})
+    if socket_unix is not None:
+        if os.path.exists(socket_unix):
+            os.remove(socket_unix)
+        servidor = ThreadingUnixHTTPServer(socket_unix, manejador)
+    else:
+        servidor = ThreadingHTTPServer((host, puerto), manejador)
+        servidor.daemon_threads = True
+    servidor.registrar = registrar
+    return servidor
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servicio local de mejora de imágenes")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8000)
+    parser.add_argument("--socket", help="Escuchar en este socket Unix en lugar de un puerto TCP")
+    parser.add_argument(
+        "--workers", type=int, default=None, help="Cantidad de workers (por defecto, uno por núcleo)"
+    )
+    parser.add_argument(
+        "--procesos", action="store_true", help="Usar procesos en lugar de hilos como workers"
+    )
+    parser.add_argument(
+        "--registrar", action="store_true", help="Mostrar una línea por petición"
+    )
+    args = parser.parse_args()
+
+    servicio = EnhancementService(args.workers, args.procesos)
+    servidor = create_server(servicio, args.puerto, args.host, args.socket, args.registrar)
+    direccion = args.socket or f"http://{args.host}:{args.puerto}"
+    tipo_worker = "procesos" if args.procesos else "hilos"
+    print(f"Servicio escuchando en {direccion} con {servicio.workers} workers ({tipo_worker})")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+        servicio.close()
+        if args.socket and os.path.exists(args.socket):
+            os.remove(args.socket)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+from image_enhancer import medidas, metodos
+from image_enhancer.analisis import analyze_image, analyze_images
+
+# ```
+# Imagenes de 16 bits
+#
+# Los metodos de LUT y las metricas trabajan en la profundidad nativa: el
+# histograma tiene 65536 bins (o 2**bits si se indica otra cantidad de niveles)
+# y la LUT y la imagen resultante son uint16.
+
+aplicar = {
+    "HE": metodos.apply_histogram_equalization,
+    "DQHEPL": metodos.apply_dqhepl,
+    "BHEPL-D": metodos.apply_bhepl_d,
+}
+
+
+def _cuadros_termicos(cantidad=6, forma=(48, 64), semilla=7):
+    """Cuadros con la forma típica de un sensor térmico: rango angosto y ruido."""
+    generador = np.random.default_rng(semilla)
+    for k in range(cantidad):
+        centro = generador.integers(2000, 60000)
+        dispersion = generador.choice([5, 200, 3000])
+        cuadro = generador.normal(centro, dispersion, forma)
+        if k % 2:
+            # Zona caliente, para que el histograma sea bimodal
+            cuadro[: forma[0] // 3, : forma[1] // 3] += 4 * dispersion
+        yield cuadro.clip(0, 65535).astype(np.uint16)
+
+
+@pytest.mark.parametrize("metodo", list(metodos.constructores_lut))
+def test_lut_de_16_bits(metodo):
+    for cuadro in _cuadros_termicos():
+        analisis = analyze_image(cuadro)
+        assert analisis.histograma.shape == (65536,)
+
+        lut = metodos.constructores_lut[metodo](analisis)
+        assert lut.dtype == np.uint16 and lut.shape == (65536,)
+        # Los tres métodos conservan el orden de los niveles presentes
+        presentes = np.flatnonzero(analisis.histograma)
+        assert np.all(np.diff(lut[presentes].astype(np.int64)) >= 0)
+
+        procesada = aplicar[metodo](cuadro)
+        assert procesada.dtype == np.uint16
+        np.testing.assert_array_equal(procesada, metodos.apply_lut(cuadro, lut))
+
+
+@pytest.mark.parametrize("metodo", list(metodos.constructores_lut))
+def test_lote_de_16_bits_igual_a_cuadros_sueltos(metodo):
+    cuadros = np.stack(list(_cuadros_termicos()))
+    tablas = metodos.constructores_lut[metodo](analyze_images(cuadros))
+    for cuadro, tabla in zip(cuadros, tablas):
+        np.testing.assert_array_equal(tabla, metodos.constructores_lut[metodo](analyze_image(cuadro)))
+
+    np.testing.assert_array_equal(
+        metodos.apply_batch(cuadros, metodo), np.stack([aplicar[metodo](c) for c in cuadros])
+    )
+
+
+@pytest.mark.parametrize("metodo", list(metodos.constructores_lut))
+def test_metricas_de_16_bits_igual_a_pixeles(metodo):
+    for cuadro in _cuadros_termicos():
+        analisis = analyze_image(cuadro)
+        lut = metodos.constructores_lut[metodo](analisis)
+        procesada = metodos.apply_lut(cuadro, lut)
+
+        desde_histograma = medidas.calculate_lut_metrics(analisis, lut)
+        # El pico de PSNR es 65535 en los dos caminos
+        desde_pixeles = medidas.calculate_image_metrics(cuadro, procesada)
+        for nombre, valor in desde_pixeles.items():
+            assert desde_histograma[nombre] == pytest.approx(valor, rel=1e-9, abs=1e-9), nombre
+
+
+def test_niveles_de_14_bits():
+    cuadro = np.random.default_rng(1).integers(0, 2**14, (40, 40)).astype(np.uint16)
+    analisis = analyze_image(cuadro, niveles=2**14)
+    assert analisis.histograma.shape == (2**14,)
+    lut = metodos.build_he_lut(analisis)
+    assert len(lut) == 2**14
+    assert metodos.apply_lut(cuadro, lut).max() < 2**14
@@ -0,0 +1,177 @@
+import sys
+
+import numpy as np
+import pytest
+
+from image_enhancer import agregados
+from image_enhancer.agregados import MetricsAggregator, QuantileSketch, format_summary
+
+# ```
+# Estadisticas agregadas con memoria acotada
+
+nombres_metodos = ["CLAHE", "HE"]
+nombres_metricas = ["ambe", "psnr", "entropy", "contrast", "uniformity", "time"]
+
+
+def test_tiempos_faltantes_no_cuentan():
+    # Los resultados tomados de la cache tienen el tiempo en NaN
+    registros = np.random.default_rng(0).random((10, 2, 6))
+    registros[::2, :, -1] = np.nan
+
+    agregado = MetricsAggregator(nombres_metodos, nombres_metricas)
+    for registro in registros:
+        agregado.update(registro)
+
+    tiempos = registros[1::2, 0, -1]
+    assert agregado.count("CLAHE", "ambe") == 10
+    assert agregado.count("CLAHE", "time") == 5
+    assert np.isclose(agregado.mean("CLAHE", "time"), tiempos.mean())
+    assert np.isclose(agregado.std("CLAHE", "time"), tiempos.std())
+    assert agregado.min("CLAHE", "time") == tiempos.min()
+    assert agregado.median("CLAHE", "time") == np.median(tiempos)
+
+    por_valor = MetricsAggregator(nombres_metodos, nombres_metricas)
+    for registro in registros:
+        for metodo, fila in zip(nombres_metodos, registro):
+            for metrica, valor in zip(nombres_metricas, fila):
+                por_valor.update_value(metodo, metrica, valor)
+    np.testing.assert_allclose(por_valor.media, agregado.media)
+    np.testing.assert_array_equal(por_valor.cantidad, agregado.cantidad)
+
+
+def test_resumen_sin_tiempos():
+    agregado = MetricsAggregator(nombres_metodos, nombres_metricas)
+    agregado.update(np.r_[np.ones(5), np.nan] * np.ones((2, 1)))
+    fila = format_summary(agregado).splitlines()[3]
+    assert fila.startswith("CLAHE") and fila.endswith("-")
+    assert "nan" not in fila
+
+
+def test_sketch_exacto_igual_a_numpy():
+    valores = np.random.default_rng(1).normal(10, 3, 1000)
+    sketch = QuantileSketch()
+    for valor in valores:
+        sketch.add(valor)
+    assert sketch.es_exacto
+    for q in (0, 0.1, 0.5, 0.9, 1):
+        assert sketch.quantile(q) == np.quantile(valores, q)
+
+
+@pytest.mark.parametrize("distribucion", ["lognormal", "normal", "con_ceros"])
+def test_sketch_con_error_relativo_acotado(distribucion):
+    generador = np.random.default_rng(2)
+    if distribucion == "lognormal":
+        valores = generador.lognormal(0, 2, 20000)
+    elif distribucion == "normal":
+        valores = generador.normal(0, 5, 20000)
+    else:
+        valores = np.where(generador.random(20000) < 0.3, 0, generador.random(20000))
+
+    sketch = QuantileSketch(precision=0.01, capacidad_exacta=100)
+    for valor in valores:
+        sketch.add(valor)
+    assert not sketch.es_exacto
+
+    ordenados = np.sort(valores)
+    for q in (0.01, 0.25, 0.5, 0.75, 0.99):
+        # Rango entero: el cuantil no interpola entre dos buckets
+        rango = round(q * (len(valores) - 1))
+        estimado = sketch.quantile(rango / (len(valores) - 1))
+        assert abs(estimado - ordenados[rango]) <= 0.01 * abs(ordenados[rango]) + 1e-12
+
+
+def test_sketch_merge_igual_a_uno_solo():
+    valores = np.random.default_rng(3).lognormal(0, 1, 9000)
+    completo = QuantileSketch(capacidad_exacta=1000)
+    partes = [QuantileSketch(capacidad_exacta=1000) for _ in range(3)]
+    for k, valor in enumerate(valores):
+        completo.add(valor)
+        partes[k % 3].add(valor)
+
+    combinado = partes[0]
+    combinado.merge(partes[1])
+    combinado.merge(partes[2])
+    assert combinado.cantidad == completo.cantidad
+    for q in (0.05, 0.5, 0.95):
+        assert combinado.quantile(q) == pytest.approx(completo.quantile(q))
+
+    # Dos sketches chicos siguen siendo exactos al combinarse
+    a, b = QuantileSketch(), QuantileSketch()
+    for valor in valores[:10]:
+        a.add(valor)
+    for valor in valores[10:20]:
+        b.add(valor)
+    a.merge(b)
+    assert a.es_exacto
+    assert a.quantile(0.5) == np.median(valores[:20])
+
+
+def test_sketch_limita_los_buckets():
+    sketch = QuantileSketch(precision=0.001, capacidad_exacta=10, max_buckets=50)
+    for valor in np.geomspace(1e-6, 1e6, 5000):
+        sketch.add(valor)
+    sketch.quantile(0.5)
+    assert len(sketch.positivos) <= 50
+    # Se unen los buckets de menor magnitud: los cuantiles altos siguen precisos
+    assert sketch.quantile(1) == pytest.approx(1e6, rel=0.001)
+
+
+def _agregado(registros):
+    agregado = MetricsAggregator(nombres_metodos, nombres_metricas, capacidad_exacta=50)
+    for registro in registros:
+        agregado.update(registro)
+    return agregado
+
+
+def test_agregado_igual_a_numpy():
+    registros = np.random.default_rng(4).lognormal(0, 1, (40, 2, 6))
+    agregado = _agregado(registros)
+    for i, metodo in enumerate(nombres_metodos):
+        for j, metrica in enumerate(nombres_metricas):
+            valores = registros[:, i, j]
+            assert agregado.mean(metodo, metrica) == pytest.approx(valores.mean())
+            assert agregado.std(metodo, metrica) == pytest.approx(valores.std())
+            assert agregado.min(metodo, metrica) == valores.min()
+            assert agregado.max(metodo, metrica) == valores.max()
+            assert agregado.median(metodo, metrica) == np.median(valores)
+
+
+def test_agregado_merge_y_guardado(tmp_path):
+    registros = np.random.default_rng(5).lognormal(0, 1, (300, 2, 6))
+    completo = _agregado(registros)
+
+    combinado = _agregado(registros[:120])
+    ruta = str(tmp_path / "agregado.json")
+    _agregado(registros[120:]).save(ruta)
+    combinado.merge(MetricsAggregator.load(ruta))
+
+    np.testing.assert_array_equal(combinado.cantidad, completo.cantidad)
+    np.testing.assert_allclose(combinado.media, completo.media)
+    np.testing.assert_allclose(combinado.m2, completo.m2)
+    np.testing.assert_array_equal(combinado.minimo, completo.minimo)
+    for metodo in nombres_metodos:
+        for metrica in nombres_metricas:
+            assert combinado.median(metodo, metrica) == pytest.approx(
+                completo.median(metodo, metrica), rel=0.004
+            )
+
+
+def test_agregados_incompatibles():
+    with pytest.raises(ValueError):
+        MetricsAggregator(["HE"], nombres_metricas).merge(MetricsAggregator(["CLAHE"], nombres_metricas))
+
+
+def test_main_combina_archivos(tmp_path, monkeypatch, capsys):
+    registros = np.random.default_rng(6).random((10, 2, 6))
+    rutas = []
+    for k, parte in enumerate((registros[:4], registros[4:])):
+        rutas.append(str(tmp_path / f"{k}.json"))
+        _agregado(parte).save(rutas[-1])
+
+    monkeypatch.setattr(sys, "argv", ["agregados", *rutas])
+    agregados.main()
+    assert capsys.readouterr().out.strip() == format_summary(_agregado(registros))
+
+    monkeypatch.setattr(sys, "argv", ["agregados"])
+    with pytest.raises(SystemExit, match="python -m image_enhancer.agregados"):
+        agregados.main()
@@ -0,0 +1,126 @@
+import glob
+import os
+
+import numpy as np
+import pytest
+
+import aproximacion
+from image_enhancer import analisis, medidas, metodos
+
+# ```
+# Modo aproximado
+#
+# LUT construidas con el histograma de una muestra de pixeles, y el reporte
+# de su error frente al modo exacto.
+
+directorio_dataset = os.path.join(os.path.dirname(__file__), "..", "dataset")
+rutas_dataset = sorted(glob.glob(os.path.join(directorio_dataset, "*")))[:3]
+
+
+def _imagen(semilla=0, forma=(96, 128)):
+    generador = np.random.default_rng(semilla)
+    y, x = np.mgrid[: forma[0], : forma[1]]
+    return np.clip(x + y / 2 + generador.normal(0, 12, forma), 0, 255).astype(np.uint8)
+
+
+@pytest.mark.parametrize("muestreo", analisis.modos_muestreo)
+def test_muestra_completa_es_exacta(muestreo):
+    imagen = _imagen()
+    exacto = analisis.analyze_image(imagen)
+    assert analisis.sample_pixels(imagen, 1, muestreo) is imagen
+
+    np.testing.assert_array_equal(
+        metodos.apply_approximate(imagen, "HE", 1, muestreo),
+        metodos.apply_histogram_equalization(imagen),
+    )
+    np.testing.assert_array_equal(
+        metodos.apply_approximate(imagen, "DQHEPL", 1, muestreo), metodos.apply_dqhepl(imagen)
+    )
+    # BHEPL-D usa una meseta mínima de una cuenta con histogramas muestreados
+    np.testing.assert_array_equal(
+        metodos.apply_approximate(imagen, "BHEPL-D", 1, muestreo),
+        metodos.apply_lut(imagen, metodos.build_bhepl_d_lut(exacto, meseta_minima=1)),
+    )
+
+
+@pytest.mark.parametrize("muestreo", analisis.modos_muestreo)
+def test_tamaño_de_la_muestra(muestreo):
+    imagen = _imagen(forma=(256, 256))
+    for fraccion in (1 / 4, 1 / 16, 1 / 64):
+        muestra = analisis.sample_pixels(imagen, fraccion, muestreo)
+        assert muestra.size == pytest.approx(imagen.size * fraccion, rel=0.1)
+        assert analisis.calculate_sampled_histogram(imagen, fraccion, muestreo).sum() == muestra.size
+
+
+def test_muestreo_desconocido():
+    with pytest.raises(ValueError, match="muestreo"):
+        analisis.sample_pixels(_imagen(), 0.5, "espiral")
+
+
+def test_metodo_sin_modo_aproximado():
+    with pytest.raises(ValueError, match="CLAHE"):
+        metodos.apply_approximate(_imagen(), "CLAHE")
+
+
+def test_niveles_fuera_de_la_muestra():
+    # La muestra solo tiene niveles en [100, 150]: el resto toma el valor del extremo
+    muestra = np.random.default_rng(1).integers(100, 151, (20, 20)).astype(np.uint8)
+    datos = analisis.analyze_image(muestra)
+    for metodo in metodos.constructores_lut:
+        exacta = metodos.constructores_lut[metodo](datos, **metodos.ajustes_muestreo.get(metodo, {}))
+        aproximada = metodos.build_approximate_lut(datos, metodo)
+        np.testing.assert_array_equal(aproximada[100:151], exacta[100:151])
+        assert (aproximada[:100] == exacta[100]).all()
+        assert (aproximada[151:] == exacta[150]).all()
+
+
+def test_lote_igual_a_imagenes_sueltas():
+    imagenes = np.stack([_imagen(semilla) for semilla in range(4)])
+    datos = analisis.analyze_histogram(
+        np.stack([analisis.calculate_sampled_histogram(imagen, 1 / 8) for imagen in imagenes])
+    )
+    for metodo in metodos.constructores_lut:
+        tablas = metodos.build_approximate_lut(datos, metodo)
+        for imagen, tabla in zip(imagenes, tablas):
+            np.testing.assert_array_equal(
+                metodos.apply_lut(imagen, tabla), metodos.apply_approximate(imagen, metodo, 1 / 8)
+            )
+
+
+def test_desvios_de_la_lut():
+    imagen = _imagen(2)
+    datos = analisis.analyze_image(imagen)
+    exacta = metodos.build_he_lut(datos)
+
+    iguales = aproximacion.compare_lut(datos, exacta, exacta)
+    assert iguales["desvio_lut"] == 0 and iguales["desvio_medio"] == 0
+    assert iguales["dif_ambe"] == 0 and iguales["dif_psnr"] == 0
+
+    # Desplazar la LUT un nivel cambia cada píxel en exactamente 1
+    corrida = np.clip(exacta.astype(np.int64) + 1, 0, 255).astype(np.uint8)
+    desvios = aproximacion.compare_lut(datos, exacta, corrida)
+    salida_exacta = metodos.apply_lut(imagen, exacta)
+    salida_corrida = metodos.apply_lut(imagen, corrida)
+    diferencia = np.abs(salida_corrida.astype(np.int64) - salida_exacta)
+    assert desvios["desvio_lut"] == diferencia.max()
+    assert desvios["desvio_medio"] == pytest.approx(diferencia.mean())
+    assert desvios["psnr_exacto"] == pytest.approx(medidas.calculate_psnr(salida_exacta, salida_corrida))
+    assert desvios["dif_ambe"] == pytest.approx(
+        abs(
+            medidas.calculate_ambe(imagen, salida_corrida)
+            - medidas.calculate_ambe(imagen, salida_exacta)
+        )
+    )
+
+
+@pytest.mark.skipif(not rutas_dataset, reason="dataset/ no está disponible")
+def test_reporte_del_dataset():
+    agregado = aproximacion.compare_approximation(
+        rutas_dataset, [1, 1 / 16], ["filas", "rejilla"], ["HE", "DQHEPL"], repeticiones=1
+    )
+    assert agregado.count("HE 1 filas", "desvio_lut") == len(rutas_dataset)
+    assert agregado.max("HE 1 filas", "desvio_lut") == 0
+    assert agregado.max("DQHEPL 1 rejilla", "desvio_medio") == 0
+    assert agregado.mean("HE 0.0625 filas", "desvio_medio") < 2
+    reporte = aproximacion.format_report(agregado)
+    assert len(reporte.splitlines()) == 3 + 8
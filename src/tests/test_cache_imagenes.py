@@ -0,0 +1,100 @@
+import os
+
+import cv2
+import numpy as np
+
+from image_enhancer import cache_imagenes
+
+# ```
+# Cache en disco de imagenes decodificadas
+#
+# Aciertos mapeados en memoria, invalidación cuando cambia el archivo de
+# origen y desalojo de las entradas usadas menos recientemente.
+
+
+def _escribir_png(ruta, semilla):
+    imagen = np.random.default_rng(semilla).integers(0, 256, (24, 32), dtype=np.uint8)
+    cv2.imwrite(str(ruta), imagen)
+    return imagen
+
+
+def _entradas(directorio):
+    return sorted(
+        os.path.join(raiz, nombre)
+        for raiz, _, nombres in os.walk(directorio)
+        for nombre in nombres
+        if nombre.endswith(".npy")
+    )
+
+
+def test_acierto_devuelve_memmap(tmp_path):
+    ruta = tmp_path / "a.png"
+    original = _escribir_png(ruta, 1)
+    cache = str(tmp_path / "cache")
+
+    fallo = cache_imagenes.read_image_cached(str(ruta), cache)
+    acierto = cache_imagenes.read_image_cached(str(ruta), cache)
+
+    assert not isinstance(fallo, np.memmap)
+    assert isinstance(acierto, np.memmap)
+    np.testing.assert_array_equal(fallo, original)
+    np.testing.assert_array_equal(acierto, original)
+    assert len(_entradas(cache)) == 1
+
+
+def test_archivo_modificado_reemplaza_la_entrada(tmp_path):
+    ruta = tmp_path / "a.png"
+    _escribir_png(ruta, 1)
+    cache = str(tmp_path / "cache")
+    cache_imagenes.read_image_cached(str(ruta), cache)
+    vieja = _entradas(cache)
+
+    # Mismo archivo con otro contenido y otro mtime
+    nueva_imagen = _escribir_png(ruta, 2)
+    info = os.stat(ruta)
+    os.utime(ruta, ns=(info.st_atime_ns, info.st_mtime_ns + 10**9))
+
+    leida = cache_imagenes.read_image_cached(str(ruta), cache)
+    np.testing.assert_array_equal(leida, nueva_imagen)
+    entradas = _entradas(cache)
+    assert len(entradas) == 1
+    assert entradas != vieja
+    assert entradas[0] == cache_imagenes.cache_entry_path(str(ruta), cache)
+
+
+def test_profundidad_nativa_tiene_su_propia_entrada(tmp_path):
+    ruta = tmp_path / "a.png"
+    _escribir_png(ruta, 1)
+    cache = str(tmp_path / "cache")
+    cache_imagenes.read_image_cached(str(ruta), cache)
+    cache_imagenes.read_image_cached(str(ruta), cache, profundidad_nativa=True)
+    assert len(_entradas(cache)) == 2
+
+
+def test_desalojo_conserva_las_mas_recientes(tmp_path):
+    cache = str(tmp_path / "cache")
+    rutas = []
+    for k in range(4):
+        ruta = tmp_path / f"{k}.png"
+        _escribir_png(ruta, k)
+        cache_imagenes.read_image_cached(str(ruta), cache)
+        rutas.append(str(ruta))
+
+    # Uso reciente: 0 es la más nueva, 3 la más vieja
+    for k, ruta in enumerate(rutas):
+        entrada = cache_imagenes.cache_entry_path(ruta, cache)
+        os.utime(entrada, ns=(0, (10 - k) * 10**9))
+
+    tamaño = os.path.getsize(_entradas(cache)[0])
+    borradas = cache_imagenes.evict_images(cache, limite_bytes=2 * tamaño)
+
+    assert borradas == 2
+    for k, ruta in enumerate(rutas):
+        existe = os.path.exists(cache_imagenes.cache_entry_path(ruta, cache))
+        assert existe == (k < 2)
+    # Las carpetas de las entradas borradas no quedan vacías en la cache
+    assert len(os.listdir(cache)) == 2
+
+
+def test_desalojo_sin_cache(tmp_path):
+    assert cache_imagenes.evict_images(str(tmp_path / "no_existe"), 0) == 0
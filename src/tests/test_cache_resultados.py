@@ -0,0 +1,115 @@
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+from image_enhancer import cache_resultados, dataset, metodos
+
+# ```
+# Cache persistente de resultados por metodo
+#
+# Claves que cambian con la imagen, los parametros y el codigo; reemplazo y
+# desalojo de entradas; y evaluate_image, que toma de la cache las metricas
+# pero nunca los tiempos.
+
+
+@pytest.fixture
+def imagen():
+    return np.random.default_rng(3).integers(0, 256, (40, 50), dtype=np.uint8)
+
+
+def test_clave_depende_de_imagen_y_metodo(imagen):
+    hash_imagen = cache_resultados.image_hash(imagen)
+    otra = imagen.copy()
+    otra[0, 0] ^= 1
+
+    assert cache_resultados.image_hash(imagen.copy()) == hash_imagen
+    assert cache_resultados.image_hash(otra) != hash_imagen
+    # Mismos bytes con otra forma
+    assert cache_resultados.image_hash(imagen.reshape(50, 40)) != hash_imagen
+    assert cache_resultados.result_key(hash_imagen, "HE") != cache_resultados.result_key(
+        hash_imagen, "DQHEPL"
+    )
+
+
+def test_clave_cambia_con_los_parametros(imagen, monkeypatch):
+    hash_imagen = cache_resultados.image_hash(imagen)
+    antes = {metodo: cache_resultados.result_key(hash_imagen, metodo) for metodo in dataset.nombres_metodos}
+
+    parametros = dict(metodos.parametros_metodos)
+    parametros["BHEPL-D"] = {**parametros["BHEPL-D"], "factor_meseta": 0.5}
+    monkeypatch.setattr(metodos, "parametros_metodos", parametros)
+
+    despues = {metodo: cache_resultados.result_key(hash_imagen, metodo) for metodo in dataset.nombres_metodos}
+    assert [m for m in antes if antes[m] != despues[m]] == ["BHEPL-D"]
+
+
+def test_clave_cambia_con_el_codigo(imagen, monkeypatch):
+    hash_imagen = cache_resultados.image_hash(imagen)
+    antes = cache_resultados.result_key(hash_imagen, "HE")
+
+    def build_he_lut(datos):
+        return metodos.build_he_lut(datos)
+
+    funciones = dict(metodos.funciones_metodos)
+    funciones["HE"] = [build_he_lut]
+    monkeypatch.setattr(metodos, "funciones_metodos", funciones)
+    cache_resultados.method_version.cache_clear()
+    try:
+        assert cache_resultados.result_key(hash_imagen, "HE") != antes
+    finally:
+        monkeypatch.undo()
+        cache_resultados.method_version.cache_clear()
+    assert cache_resultados.result_key(hash_imagen, "HE") == antes
+
+
+def test_escritura_reemplaza_la_entrada(tmp_path):
+    directorio = str(tmp_path)
+    cache_resultados.write_result("k", directorio, metricas=np.ones(5), lut=np.arange(256))
+    cache_resultados.write_result("k", directorio, lut=np.zeros(256))
+
+    campos = cache_resultados.read_result("k", directorio)
+    assert set(campos) == {"lut"}
+    np.testing.assert_array_equal(campos["lut"], np.zeros(256))
+
+
+def test_entrada_inexistente_o_corrupta(tmp_path):
+    directorio = str(tmp_path)
+    assert cache_resultados.read_result("no_existe", directorio) is None
+    (tmp_path / "rota.npz").write_bytes(b"PK no es un npz")
+    assert cache_resultados.read_result("rota", directorio) is None
+
+
+def test_desalojo_conserva_las_mas_recientes(tmp_path):
+    directorio = str(tmp_path)
+    for k in range(4):
+        cache_resultados.write_result(str(k), directorio, lut=np.arange(256) + k)
+        os.utime(tmp_path / f"{k}.npz", ns=(0, (10 - k) * 10**9))
+
+    tamaño = os.path.getsize(tmp_path / "0.npz")
+    assert cache_resultados.evict_results(directorio, limite_bytes=2 * tamaño) == 2
+    assert sorted(os.listdir(directorio)) == ["0.npz", "1.npz"]
+    assert cache_resultados.evict_results(str(tmp_path / "no_existe"), 0) == 0
+
+
+def test_evaluate_image_no_reutiliza_tiempos(imagen, tmp_path, monkeypatch):
+    # La cache de resultados usa una ruta relativa al directorio de trabajo
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("dataset")
+    cv2.imwrite("dataset/a.png", imagen)
+    monkeypatch.setattr(dataset, "directory", "dataset/")
+
+    calculado, originales, error = dataset.evaluate_image("a.png", usar_cache=False)
+    assert error is None
+    assert not np.isnan(calculado).any()
+
+    de_cache, originales_cache, error = dataset.evaluate_image("a.png", usar_cache=False)
+    assert error is None
+    np.testing.assert_array_equal(de_cache[:, :-1], calculado[:, :-1])
+    np.testing.assert_array_equal(originales_cache, originales)
+    assert np.isnan(de_cache[:, -1]).all()
+
+    sin_cache, _, _ = dataset.evaluate_image("a.png", usar_cache=False, usar_resultados=False)
+    np.testing.assert_array_equal(sin_cache[:, :-1], calculado[:, :-1])
+    assert not np.isnan(sin_cache[:, -1]).any()
@@ -0,0 +1,113 @@
+import cv2
+import numpy as np
+import pytest
+
+from image_enhancer import color, dataset, metodos
+
+# ```
+# Mejora de imagenes en color
+#
+# Los metodos se aplican solo a la luminancia, con una sola ida y vuelta de
+# color por imagen (o por lote).
+
+aplicar = {
+    "CLAHE": metodos.apply_clahe,
+    "HE": metodos.apply_histogram_equalization,
+    "DQHEPL": metodos.apply_dqhepl,
+    "BHEPL-D": metodos.apply_bhepl_d,
+}
+
+
+def _imagen(canales=3, semilla=0, forma=(40, 56), tipo=np.uint8):
+    generador = np.random.default_rng(semilla)
+    return generador.integers(0, np.iinfo(tipo).max + 1, (*forma, canales)).astype(tipo)
+
+
+@pytest.mark.parametrize("espacio", list(color.espacios_color))
+@pytest.mark.parametrize("metodo", list(aplicar))
+def test_solo_cambia_la_luminancia(metodo, espacio):
+    imagen = _imagen()
+    ida, vuelta = color.espacios_color[espacio]
+    convertida = cv2.cvtColor(imagen, ida)
+    convertida[..., 0] = aplicar[metodo](np.ascontiguousarray(convertida[..., 0]))
+    esperada = cv2.cvtColor(convertida, vuelta)
+
+    salidas, _ = color.enhance_color(imagen, [metodo], espacio)
+    np.testing.assert_array_equal(salidas[metodo], esperada)
+    if espacio == color.espacio_color:
+        np.testing.assert_array_equal(aplicar[metodo](imagen), esperada)
+
+
+def test_identidad_conserva_la_crominancia():
+    imagen = _imagen()
+    ida, vuelta = color.espacios_color[color.espacio_color]
+    salida = color.enhance_luminance(imagen, lambda y: y)
+    # Solo el redondeo de la ida y vuelta, sin tocar la luminancia
+    np.testing.assert_array_equal(salida, cv2.cvtColor(cv2.cvtColor(imagen, ida), vuelta))
+
+
+@pytest.mark.parametrize("metodo", list(aplicar))
+def test_un_canal_igual_a_gris(metodo):
+    imagen = _imagen(canales=1)
+    gris = np.ascontiguousarray(imagen[..., 0])
+    salida = aplicar[metodo](imagen)
+    assert salida.shape == imagen.shape
+    np.testing.assert_array_equal(salida[..., 0], aplicar[metodo](gris))
+
+    salidas, _ = color.enhance_color(gris, [metodo])
+    np.testing.assert_array_equal(salidas[metodo], aplicar[metodo](gris))
+
+
+@pytest.mark.parametrize("metodo", list(aplicar))
+def test_canales_extra_se_copian(metodo):
+    imagen = _imagen(canales=4)
+    salida = aplicar[metodo](imagen)
+    np.testing.assert_array_equal(salida[..., 3], imagen[..., 3])
+    np.testing.assert_array_equal(salida[..., :3], aplicar[metodo](np.ascontiguousarray(imagen[..., :3])))
+
+
+def test_lote_igual_a_imagenes_sueltas():
+    lote = np.stack([_imagen(semilla=semilla) for semilla in range(4)])
+    salidas, metricas = color.enhance_color(lote, list(aplicar), con_metricas=True)
+    assert len(metricas) == len(lote)
+    for i, imagen in enumerate(lote):
+        sueltas, metricas_sueltas = color.enhance_color(imagen, list(aplicar), con_metricas=True)
+        for metodo in aplicar:
+            np.testing.assert_array_equal(salidas[metodo][i], sueltas[metodo])
+            for nombre, valor in metricas_sueltas[metodo].items():
+                if nombre != "time":
+                    assert metricas[i][metodo][nombre] == pytest.approx(valor)
+
+    lista = [_imagen(semilla=1), _imagen(semilla=2, forma=(30, 20))]
+    salidas, _ = color.enhance_color(lista, ["HE"])
+    for imagen, salida in zip(lista, salidas["HE"]):
+        np.testing.assert_array_equal(salida, metodos.apply_histogram_equalization(imagen))
+
+
+def test_una_conversion_por_imagen(monkeypatch):
+    imagen = _imagen()
+    conversiones = []
+    original = color.to_luminance
+
+    def contar(*args, **kwargs):
+        conversiones.append(1)
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(color, "to_luminance", contar)
+    salidas = dataset.apply_all_methods(imagen, usar_resultados=False)
+    assert len(conversiones) == 1
+    for name, salida in zip(dataset.nombres_metodos, salidas):
+        np.testing.assert_array_equal(salida, aplicar[name](imagen))
+
+
+def test_16_bits_en_color():
+    imagen = _imagen(tipo=np.uint16)
+    salida = metodos.apply_histogram_equalization(imagen)
+    assert salida.dtype == np.uint16 and salida.shape == imagen.shape
+    with pytest.raises(ValueError, match="LAB"):
+        color.enhance_color(imagen, ["HE"], "LAB")
+
+
+def test_espacio_desconocido():
+    with pytest.raises(ValueError, match="HSV"):
+        color.enhance_color(_imagen(), ["HE"], "HSV")
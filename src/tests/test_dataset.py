@@ -0,0 +1,39 @@
+import os
+
+import cv2
+import numpy as np
+
+from image_enhancer import dataset, metodos
+
+# ```
+# Evaluacion y procesamiento del dataset
+
+
+def test_tiempo_incluye_aplicar_la_lut(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("dataset")
+    cv2.imwrite("dataset/a.png", np.random.default_rng(0).integers(0, 256, (30, 40), dtype=np.uint8))
+    monkeypatch.setattr(dataset, "directory", "dataset/")
+
+    aplicadas = []
+    apply_lut = metodos.apply_lut
+
+    def contar(imagen, tabla, salida=None):
+        aplicadas.append(salida)
+        return apply_lut(imagen, tabla, salida)
+
+    monkeypatch.setattr(metodos, "apply_lut", contar)
+    registro, _, error = dataset.evaluate_image("a.png", usar_cache=False, usar_resultados=False)
+    assert error is None
+    # Una aplicación por método de LUT, todas sobre el mismo buffer
+    assert len(aplicadas) == len(metodos.constructores_lut)
+    assert all(salida is aplicadas[0] for salida in aplicadas)
+    assert (registro[:, -1] > 0).all()
+
+
+def test_apply_all_methods_igual_a_cada_metodo():
+    for tipo in (np.uint8, np.uint16):
+        imagen = np.random.default_rng(1).integers(0, np.iinfo(tipo).max + 1, (30, 40)).astype(tipo)
+        salidas = dataset.apply_all_methods(imagen, usar_resultados=False)
+        for name, salida in zip(dataset.nombres_metodos, salidas):
+            np.testing.assert_array_equal(salida, dataset.aplicar_metodo[name](imagen, None))
@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+import franjas
+from image_enhancer import medidas, metodos
+
+# ```
+# Procesamiento por franjas
+#
+# Cada salida escrita franja por franja debe ser igual a la del metodo sobre
+# la imagen entera, sin importar el alto de franja ni si el tamaño es multiplo
+# de la cuadricula de CLAHE.
+
+aplicar = {
+    "CLAHE": metodos.apply_clahe,
+    "HE": metodos.apply_histogram_equalization,
+    "DQHEPL": metodos.apply_dqhepl,
+    "BHEPL-D": metodos.apply_bhepl_d,
+}
+
+
+def _imagen(alto, ancho, tipo=np.uint8, semilla=0):
+    generador = np.random.default_rng(semilla)
+    maximo = np.iinfo(tipo).max
+    # Gradiente con ruido: los mosaicos de CLAHE tienen histogramas distintos
+    y, x = np.mgrid[:alto, :ancho]
+    base = (x / ancho + y / alto) * maximo / 3
+    ruido = generador.normal(0, maximo / 10, (alto, ancho))
+    return np.clip(base + ruido + maximo / 4, 0, maximo).astype(tipo)
+
+
+def _procesar(imagen, tmp_path, alto_franja, parametros=None):
+    salidas = {metodo: str(tmp_path / f"{metodo}.npy") for metodo in aplicar}
+    metricas = franjas.process_large_image(imagen, salidas, alto_franja, parametros)
+    return {metodo: np.load(ruta) for metodo, ruta in salidas.items()}, metricas
+
+
+@pytest.mark.parametrize("forma", [(128, 160), (131, 157), (40, 300)])
+@pytest.mark.parametrize("alto_franja", [1, 17, 64, 1000])
+def test_franjas_igual_a_imagen_entera(forma, alto_franja, tmp_path):
+    imagen = _imagen(*forma)
+    resultados, metricas = _procesar(imagen, tmp_path, alto_franja)
+
+    for metodo, funcion in aplicar.items():
+        esperada = funcion(imagen)
+        np.testing.assert_array_equal(resultados[metodo], esperada, err_msg=metodo)
+
+        desde_pixeles = medidas.calculate_image_metrics(imagen, esperada)
+        for nombre, valor in desde_pixeles.items():
+            assert metricas[metodo][nombre] == pytest.approx(valor, rel=1e-9, abs=1e-9), (metodo, nombre)
+
+
+def test_parametros_de_clahe(tmp_path):
+    imagen = _imagen(96, 120, semilla=1)
+    parametros = {"CLAHE": {"clip_limit": 4.0, "tile_grid_size": (3, 5)}}
+    resultados, _ = _procesar(imagen, tmp_path, 10, parametros)
+    np.testing.assert_array_equal(
+        resultados["CLAHE"], metodos.apply_clahe(imagen, 4.0, (3, 5))
+    )
+
+
+def test_franjas_de_16_bits(tmp_path):
+    imagen = _imagen(70, 90, np.uint16, semilla=2)
+    resultados, _ = _procesar(imagen, tmp_path, 16)
+    for metodo, funcion in aplicar.items():
+        assert resultados[metodo].dtype == np.uint16
+        np.testing.assert_array_equal(resultados[metodo], funcion(imagen), err_msg=metodo)
+
+
+def test_imagen_npy_mapeada(tmp_path):
+    ruta = str(tmp_path / "imagen.npy")
+    np.save(ruta, _imagen(50, 60))
+    imagen = franjas.open_image(ruta)
+    assert isinstance(imagen, np.memmap)
+
+    salidas = {"HE": str(tmp_path / "he.npy")}
+    franjas.process_large_image(imagen, salidas, alto_franja=8)
+    np.testing.assert_array_equal(
+        np.load(salidas["HE"]), metodos.apply_histogram_equalization(np.load(ruta))
+    )
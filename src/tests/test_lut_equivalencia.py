@@ -1,37 +1,31 @@
+import glob
+import os
+
 import cv2
 import numpy as np
+import pytest
 
-# ```
-# Tecnicas de mejora de imagen
-
-
-def apply_histogram_equalization(image):
-    """Aplica ecualización de histograma para mejorar el contraste de la imagen."""
-    return cv2.equalizeHist(image)
-
+from image_enhancer import metodos
+from image_enhancer.analisis import analyze_image, analyze_images
 
-def apply_clahe(image):
-    """Aplica CLAHE con el límite de clip y tamaño de la cuadrícula de mosaicos indicados."""
-    clip_limit = 2.0
-    tile_grid_size = (8, 8)
-    clahe = cv2.createCLAHE(clipLimit=clip_limit, tileGridSize=tile_grid_size)
-
-    return clahe.apply(image)
+# ```
+# Equivalencia de los constructores de LUT vectorizados
+#
+# build_he_lut, build_dqhepl_lut y build_bhepl_d_lut deben dar exactamente las
+# mismas tablas que las implementaciones originales con ciclos de Python (que
+# se copian abajo tal como estaban, devolviendo la tabla en vez de aplicarla).
+# Se comparan sobre las imagenes de dataset/ y sobre cuadros sinteticos con
+# pocos niveles, rangos estrechos y tamaños chicos, que es donde aparecen los
+# casos borde de los cuartiles y las mesetas.
 
+directorio_dataset = os.path.join(os.path.dirname(__file__), "..", "dataset")
+rutas_dataset = sorted(glob.glob(os.path.join(directorio_dataset, "*")))
 
-def apply_dqhepl(imagen):
-    """
-    El método busca mejorar el contraste de imágenes preservando el brillo medio y evitando sobre-ecualización. Combina ideas de:
-        1. División en cuadrantes dinámicos: Divide el histograma en 4 subhistogramas usando cuartiles estadísticos.
-        2. Límites de meseta: Controla la amplificación del contraste recortando píxeles extremos.
-        3. Preservación del brillo: Mantiene el punto medio del histograma original.
-    """
-    if len(imagen.shape) == 3:
-        imagen = cv2.cvtColor(imagen, cv2.COLOR_BGR2GRAY)
 
+def _dqhepl_original(imagen):
+    """Tabla LUT de apply_dqhepl tal como estaba implementado con ciclos."""
     niveles = 256
 
-    # Calcular el histograma y CDF de la imagen
     histograma = cv2.calcHist([imagen], [0], None, [niveles], [0, niveles])
     histograma = histograma.flatten()
     histograma = histograma.astype(np.float64)
@@ -39,11 +33,9 @@ def apply_dqhepl(imagen):
     total_pixeles = imagen.shape[0] * imagen.shape[1]
     cdf = histograma.cumsum()
 
-    # Calcular los valores de intensidad minimos y maximos
     intensidad_min = np.min(imagen)
     intensidad_max = np.max(imagen)
 
-    # Calcular los cuartiles para division del histograma
     objetivo_25 = 0.25 * total_pixeles
     objetivo_50 = 0.5 * total_pixeles
     objetivo_75 = 0.75 * total_pixeles
@@ -52,7 +44,6 @@ def apply_dqhepl(imagen):
     q2 = np.argmax(cdf >= objetivo_50)
     q3 = np.argmax(cdf >= objetivo_75)
 
-    # Calcular los rangos de los subhistogramas
     rangos_subhist = []
     inicios = [intensidad_min, q1 + 1, q2 + 1, q3 + 1]
     finales = [q1, q2, q3, intensidad_max]
@@ -67,7 +58,6 @@ def apply_dqhepl(imagen):
     subhists_recortados = []
     masas_recortadas = []
 
-    # Recorte del histograma por meseta
     for inicio, fin in rangos_subhist:
         inicio = max(0, int(inicio))
         fin = min(niveles - 1, int(fin))
@@ -81,7 +71,6 @@ def apply_dqhepl(imagen):
         subhists_recortados.append(subhist_recortado)
         masas_recortadas.append(subhist_recortado.sum())
 
-    # Calcular los nuevos limites de intensidad
     n0 = 0
     n4 = niveles - 1
 
@@ -102,7 +91,6 @@ def apply_dqhepl(imagen):
 
     nuevos_rangos = [(n0, n1), (n1, n2), (n2, n3), (n3, n4)]
 
-    # Construir la tabla LUT
     tabla_lut = np.zeros(niveles, dtype=np.uint8)
 
     for i in range(4):
@@ -124,31 +112,20 @@ def apply_dqhepl(imagen):
             y = n_inicio + (n_fin - n_inicio) * (acumulado[pos] / max(masa, 1e-10))
             tabla_lut[idx] = int(np.round(np.clip(y, 0, 255)))
 
-    # Aplicar mapeo
-    imagen_mejorada = cv2.LUT(imagen, tabla_lut)
+    return tabla_lut
 
-    return imagen_mejorada
 
-
-def apply_bhepl_d(imagen):
-    """
-    Método de ecualización bi-histograma con límite de meseta basado en la mediana. Diseñado para:
-        1. Mejorar contraste preservando brillo medio
-        2. Evitar sobre-realce y saturación
-        3. Mantener información de la imagen original
-    """
-    # Calcular el histograma
+def _bhepl_d_original(imagen):
+    """Tabla LUT de apply_bhepl_d tal como estaba implementado originalmente."""
     histograma = cv2.calcHist([imagen], [0], None, [256], [0, 256])
     histograma = histograma.ravel()
     histograma = histograma.astype(np.float64)
 
     total_pixeles = imagen.size
 
-    # Calcular el punto medio del histograma (el valor de brillo medio)
     brillo_medio = np.sum(np.arange(256) * (histograma / total_pixeles))
     brillo_medio = int(round(np.clip(brillo_medio, 0, 255)))
 
-    # Dividir el histograma en superior e inferior
     if brillo_medio >= 0:
         hist_inf = histograma[: brillo_medio + 1]
     else:
@@ -159,7 +136,6 @@ def apply_bhepl_d(imagen):
     else:
         hist_sup = np.array([])
 
-    # Calcular los limites de meseta utilizando la media
     if len(hist_inf) > 0:
         meseta_inf = np.median(hist_inf)
     else:
@@ -170,7 +146,6 @@ def apply_bhepl_d(imagen):
     else:
         meseta_sup = 0
 
-    # Recortar los subhistogramas
     if len(hist_inf) > 0:
         hist_inf_rec = np.minimum(hist_inf, meseta_inf)
     else:
@@ -191,13 +166,11 @@ def apply_bhepl_d(imagen):
     else:
         masa_sup = 0
 
-    # Aplicar CDF y mapeo inferior
     mapeo_inf = np.zeros_like(hist_inf, dtype=np.float64)
     if masa_inf > 1e-10:
         cdf_inf = np.cumsum(hist_inf_rec)
         mapeo_inf = (brillo_medio * (cdf_inf / masa_inf)).astype(np.float64)
 
-    # Aplicar CDF y mapeo superior
     if brillo_medio < 255:
         mapeo_sup = np.zeros_like(hist_sup, dtype=np.float64)
     else:
@@ -209,7 +182,6 @@ def apply_bhepl_d(imagen):
             (brillo_medio + 1) + (254 - brillo_medio) * (cdf_sup / masa_sup)
         ).astype(np.float64)
 
-    # Unificar los mapeos
     tabla_mapeo = np.zeros(256, dtype=np.uint8)
 
     if len(mapeo_inf) > 0:
@@ -220,7 +192,80 @@ def apply_bhepl_d(imagen):
         valores = np.round(np.clip(mapeo_sup, 0, 255)).astype(np.uint8)
         tabla_mapeo[brillo_medio + 1 : brillo_medio + 1 + len(mapeo_sup)] = valores
 
-    # Aplicar mapeo
-    imagen_mejorada = cv2.LUT(imagen, tabla_mapeo)
-
-    return imagen_mejorada
+    return tabla_mapeo
+
+
+def _cuadros_sinteticos(cantidad=1500, semilla=5):
+    """Cuadros chicos con rangos estrechos o pocos niveles distintos."""
+    generador = np.random.default_rng(semilla)
+    for k in range(cantidad):
+        alto, ancho = generador.integers(1, 60, 2)
+        minimo, maximo = sorted(generador.integers(0, 256, 2))
+        imagen = generador.integers(minimo, maximo + 1, (alto, ancho)).astype(np.uint8)
+        if k % 3 == 0:
+            valores = generador.integers(0, 256, generador.integers(1, 5))
+            imagen = generador.choice(valores, (alto, ancho)).astype(np.uint8)
+        yield imagen
+
+
+def _comparar(imagen):
+    """Compara las tres tablas vectorizadas con las originales para una imagen."""
+    analisis = analyze_image(imagen)
+
+    # La ecualización original era cv2.equalizeHist: se compara la imagen
+    he = cv2.LUT(imagen, metodos.build_he_lut(analisis))
+    np.testing.assert_array_equal(he, cv2.equalizeHist(imagen))
+
+    np.testing.assert_array_equal(metodos.build_bhepl_d_lut(analisis), _bhepl_d_original(imagen))
+    np.testing.assert_array_equal(metodos.build_dqhepl_lut(analisis), _dqhepl_original(imagen))
+
+
+@pytest.mark.skipif(not rutas_dataset, reason="dataset/ no está disponible")
+@pytest.mark.parametrize("ruta", rutas_dataset, ids=os.path.basename)
+def test_dataset(ruta):
+    imagen = cv2.imread(ruta, cv2.IMREAD_GRAYSCALE)
+    _comparar(imagen)
+
+
+def test_cuadros_sinteticos():
+    for imagen in _cuadros_sinteticos():
+        _comparar(imagen)
+
+
+def test_lote_igual_a_imagenes_sueltas():
+    generador = np.random.default_rng(11)
+    imagenes = np.stack(
+        [generador.integers(k * 8, 256 - k * 4, (32, 48)).astype(np.uint8) for k in range(16)]
+    )
+    analisis = analyze_images(imagenes)
+    for constructor in metodos.constructores_lut.values():
+        tablas = constructor(analisis)
+        for imagen, tabla in zip(imagenes, tablas):
+            np.testing.assert_array_equal(tabla, constructor(analyze_image(imagen)))
+
+
+def test_suma_por_tramo_igual_a_np_sum():
+    # Las masas de DQHEPL dependen del orden de suma en punto flotante
+    generador = np.random.default_rng(3)
+    valores = generador.random((64, 700)) * generador.choice([1, 1e3, 1e6], (64, 1))
+    inicios = generador.integers(0, 700, 64)
+    largos = generador.integers(1, 701 - inicios)
+    sumas = metodos._suma_por_tramo(valores, inicios, largos)
+    esperadas = [fila[i : i + n].sum() for fila, i, n in zip(valores, inicios, largos)]
+    np.testing.assert_array_equal(sumas, esperadas)
+
+
+@pytest.mark.parametrize("tipo", [np.uint8, np.uint16])
+@pytest.mark.parametrize("cantidad", [1, 3, 4, 6])
+def test_pila_de_luts_igual_a_luts_sueltas(tipo, cantidad):
+    # En 16 bits las tablas se buscan de a cuatro en una sola pasada
+    generador = np.random.default_rng(cantidad)
+    niveles = np.iinfo(tipo).max + 1
+    imagen = generador.integers(0, niveles, (37, 53)).astype(tipo)
+    tablas = np.stack([generador.permutation(niveles).astype(tipo) for _ in range(cantidad)])
+
+    salida = np.empty((cantidad, *imagen.shape), dtype=tipo)
+    assert metodos.apply_lut_stack(imagen, tablas, salida) is salida
+    for tabla, resultado in zip(tablas, salida):
+        np.testing.assert_array_equal(resultado, metodos.apply_lut(imagen, tabla))
+    np.testing.assert_array_equal(metodos.apply_lut_stack(imagen, list(tablas)), salida)
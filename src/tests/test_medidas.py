@@ -0,0 +1,68 @@
+import glob
+import os
+
+import numpy as np
+import pytest
+
+from image_enhancer import medidas, metodos
+from image_enhancer.analisis import analyze_image
+
+# ```
+# Metricas en el dominio del histograma
+#
+# Para los metodos de LUT global, las metricas calculadas desde el histograma
+# de la original y la LUT deben coincidir con las que se obtienen recorriendo
+# los pixeles de la imagen procesada.
+
+directorio_dataset = os.path.join(os.path.dirname(__file__), "..", "dataset")
+rutas_dataset = sorted(glob.glob(os.path.join(directorio_dataset, "*")))[:5]
+
+
+def _imagenes():
+    generador = np.random.default_rng(2)
+    yield generador.integers(0, 256, (120, 160), dtype=np.uint8)
+    yield generador.integers(90, 110, (64, 64), dtype=np.uint8)
+    yield np.full((10, 10), 7, dtype=np.uint8)
+    for ruta in rutas_dataset:
+        yield medidas.read_image_as_grayscale(ruta)
+
+
+@pytest.mark.parametrize("metodo", list(metodos.constructores_lut))
+def test_metricas_de_lut_igual_a_pixeles(metodo):
+    for imagen in _imagenes():
+        analisis = analyze_image(imagen)
+        lut = metodos.constructores_lut[metodo](analisis)
+        procesada = metodos.apply_lut(imagen, lut)
+
+        desde_histograma = medidas.calculate_lut_metrics(analisis, lut)
+        desde_pixeles = medidas.calculate_image_metrics(imagen, procesada)
+        for nombre, valor in desde_pixeles.items():
+            assert desde_histograma[nombre] == pytest.approx(valor, rel=1e-9, abs=1e-9), nombre
+
+
+def test_sse_de_varias_tablas():
+    imagen = np.random.default_rng(4).integers(0, 256, (50, 70), dtype=np.uint8)
+    analisis = analyze_image(imagen)
+    tablas = np.stack([constructor(analisis) for constructor in metodos.constructores_lut.values()])
+
+    sse = medidas.calculate_lut_sse(analisis.histograma, tablas)
+    for tabla, valor in zip(tablas, sse):
+        diferencia = metodos.apply_lut(imagen, tabla).astype(np.int64) - imagen
+        assert valor == np.sum(diferencia**2)
+
+
+def test_histogramas_de_varias_tablas():
+    imagen = np.random.default_rng(5).integers(0, 256, (50, 70), dtype=np.uint8)
+    analisis = analyze_image(imagen)
+    tablas = np.stack([constructor(analisis) for constructor in metodos.constructores_lut.values()])
+
+    histogramas = medidas.calculate_lut_histograms(analisis.histograma, tablas)
+    for tabla, histograma in zip(tablas, histogramas):
+        procesada = metodos.apply_lut(imagen, tabla)
+        np.testing.assert_array_equal(histograma, np.bincount(procesada.ravel(), minlength=256))
+
+
+def test_psnr_de_imagenes_identicas_es_finito():
+    # Mismo epsilon que cv2.PSNR
+    imagen = np.arange(256, dtype=np.uint8).reshape(16, 16)
+    assert medidas.psnr_from_mse(0.0, 255) == pytest.approx(medidas.calculate_psnr(imagen, imagen))
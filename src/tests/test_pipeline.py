@@ -0,0 +1,114 @@
+import threading
+import time
+
+import pytest
+
+from image_enhancer.pipeline import run_pipeline
+
+# ```
+# Pipeline de lectura / calculo / escritura
+
+
+def test_procesa_en_orden_y_escribe_todo():
+    procesados = []
+    escritos = {}
+    bloqueo = threading.Lock()
+
+    def leer(k):
+        # Lecturas que terminan desordenadas
+        time.sleep(0.002 * (k % 3))
+        return k * 10
+
+    def procesar(k, dato):
+        procesados.append(k)
+        return dato + 1
+
+    def escribir(k, resultado):
+        with bloqueo:
+            escritos[k] = resultado
+
+    errores = run_pipeline(range(20), leer, procesar, escribir, lectores=3, escritores=2, capacidad=4)
+
+    assert errores == []
+    assert procesados == list(range(20))
+    assert escritos == {k: k * 10 + 1 for k in range(20)}
+
+
+def test_errores_de_cada_etapa():
+    def leer(k):
+        if k == 1:
+            raise OSError("no se pudo leer")
+        return k
+
+    def procesar(k, dato):
+        if k == 3:
+            raise ValueError("no se pudo procesar")
+        return dato
+
+    def escribir(k, resultado):
+        if k == 5:
+            raise RuntimeError("no se pudo escribir")
+
+    errores = run_pipeline(range(7), leer, procesar, escribir)
+    assert errores == [
+        (1, "no se pudo leer"),
+        (3, "no se pudo procesar"),
+        (5, "no se pudo escribir"),
+    ]
+
+
+def test_lecturas_adelantadas_acotadas():
+    capacidad = 3
+    leidos = []
+    maximo_adelanto = 0
+
+    def leer(k):
+        leidos.append(k)
+        return k
+
+    def procesar(k, dato):
+        nonlocal maximo_adelanto
+        # Lecturas iniciadas que todavía no se procesaron, incluida la actual
+        maximo_adelanto = max(maximo_adelanto, len(leidos) - k)
+        time.sleep(0.001)
+        return dato
+
+    run_pipeline(range(30), leer, procesar, lambda k, r: None, lectores=4, capacidad=capacidad)
+    assert maximo_adelanto <= capacidad + 1
+
+
+def test_escrituras_pendientes_acotadas():
+    capacidad = 2
+    liberar = threading.Event()
+    pendientes = 0
+    maximo = 0
+    bloqueo = threading.Lock()
+
+    def escribir(k, resultado):
+        nonlocal pendientes
+        liberar.wait()
+        with bloqueo:
+            pendientes -= 1
+
+    def procesar(k, dato):
+        nonlocal pendientes, maximo
+        with bloqueo:
+            pendientes += 1
+            maximo = max(maximo, pendientes)
+        return dato
+
+    # Con los escritores bloqueados un rato, el cálculo no puede adelantarse más
+    # de 'capacidad' escrituras (más el resultado que espera su cupo)
+    hilo = threading.Timer(0.2, liberar.set)
+    hilo.start()
+    errores = run_pipeline(range(20), lambda k: k, procesar, escribir, escritores=4, capacidad=capacidad)
+    hilo.cancel()
+
+    assert errores == []
+    assert maximo <= capacidad + 1
+
+
+@pytest.mark.parametrize("opcion", ["lectores", "escritores", "capacidad"])
+def test_limites_menores_que_uno(opcion):
+    with pytest.raises(ValueError, match=opcion):
+        run_pipeline([1], lambda k: k, lambda k, d: d, lambda k, r: None, **{opcion: 0})
@@ -0,0 +1,196 @@
+import os
+import sqlite3
+
+import numpy as np
+import pytest
+
+from image_enhancer import resultados
+
+# ```
+# Resultados de una ejecucion en formato columnar
+#
+# Filas por (imagen, metodo), manifiesto, resumen y exportacion a texto, y
+# el modo incremental que continua una ejecucion interrumpida.
+
+nombres_metodos = ["CLAHE", "HE", "DQHEPL", "BHEPL-D"]
+nombres_metricas = ["ambe", "psnr", "entropy", "contrast", "uniformity", "time"]
+
+
+def _registros(cantidad, semilla=0):
+    generador = np.random.default_rng(semilla)
+    for k in range(cantidad):
+        yield f"{k:03d}.png", generador.random(3), generador.random((4, 6))
+
+
+def _escribir(ruta, registros, **opciones):
+    with resultados.MetricsSink(ruta, nombres_metricas, **opciones) as sink:
+        for imagen, originales, registro in registros:
+            sink.add(imagen, originales, registro, nombres_metodos, (1, 2, imagen))
+
+
+def test_filas_por_imagen_y_metodo(tmp_path):
+    ruta = str(tmp_path / "r.sqlite")
+    registros = list(_registros(5))
+    _escribir(ruta, registros, lote=2)
+
+    metricas = resultados.load_metrics(ruta, nombres_metodos)
+    for i, metodo in enumerate(nombres_metodos):
+        for j, metrica in enumerate(nombres_metricas):
+            esperados = [registro[i, j] for _, _, registro in registros]
+            np.testing.assert_array_equal(metricas[metodo][metrica], esperados)
+
+    with sqlite3.connect(ruta) as conexion:
+        assert conexion.execute("SELECT COUNT(*) FROM metricas").fetchone() == (20,)
+        assert conexion.execute("SELECT COUNT(*) FROM originales").fetchone() == (5,)
+
+
+def test_reemplazo_de_una_imagen(tmp_path):
+    ruta = str(tmp_path / "r.sqlite")
+    _escribir(ruta, _registros(2))
+    nuevo = np.full((4, 6), 7.0)
+    _escribir(ruta, [("000.png", np.zeros(3), nuevo)], continuar=True)
+
+    metricas = resultados.load_metrics(ruta, nombres_metodos)
+    assert len(metricas["HE"]["ambe"]) == 2
+    assert 7.0 in metricas["HE"]["ambe"]
+
+
+def test_ejecucion_nueva_descarta_la_anterior(tmp_path):
+    ruta = str(tmp_path / "r.sqlite")
+    _escribir(ruta, _registros(3))
+    _escribir(ruta, _registros(1))
+    assert len(resultados.load_metrics(ruta, nombres_metodos)["HE"]["ambe"]) == 1
+
+
+def test_resumen_igual_a_numpy(tmp_path):
+    ruta = str(tmp_path / "r.sqlite")
+    registros = list(_registros(50))
+    _escribir(ruta, registros)
+
+    agregado = resultados.aggregate_metrics(ruta, nombres_metodos, nombres_metricas)
+    valores = np.stack([registro for _, _, registro in registros])
+    for i, metodo in enumerate(nombres_metodos):
+        for j, metrica in enumerate(nombres_metricas):
+            assert agregado.mean(metodo, metrica) == pytest.approx(valores[:, i, j].mean())
+            assert agregado.median(metodo, metrica) == pytest.approx(np.median(valores[:, i, j]))
+
+
+def test_resumen_con_subconjunto_de_metodos(tmp_path):
+    ruta = str(tmp_path / "r.sqlite")
+    with resultados.MetricsSink(ruta, nombres_metricas) as sink:
+        sink.add("a.png", np.zeros(3), np.ones((2, 6)), ["HE", "DQHEPL"])
+    agregado = resultados.aggregate_metrics(ruta, nombres_metodos, nombres_metricas)
+    assert agregado.count("CLAHE") == 0
+    assert agregado.count("HE") == 1
+
+
+def test_tiempo_faltante(tmp_path):
+    # Un tiempo NaN (resultado de la cache) se guarda como NULL y no se promedia
+    ruta = str(tmp_path / "r.sqlite")
+    registro = np.ones((4, 6))
+    registro[:, -1] = np.nan
+    _escribir(ruta, [("a.png", np.zeros(3), registro), ("b.png", np.zeros(3), np.ones((4, 6)))])
+
+    agregado = resultados.aggregate_metrics(ruta, nombres_metodos, nombres_metricas)
+    assert agregado.count("HE", "time") == 1
+    assert agregado.count("HE", "ambe") == 2
+
+    resultados.export_text(ruta, str(tmp_path / "texto"))
+    texto = (tmp_path / "texto" / "a_stats.txt").read_text()
+    assert "Tiempo: - (resultado en cache)" in texto
+
+
+def test_exportar_texto(tmp_path):
+    ruta = str(tmp_path / "r.sqlite")
+    registros = list(_registros(3))
+    _escribir(ruta, registros)
+
+    directorio = tmp_path / "texto"
+    resultados.export_text(ruta, str(directorio))
+    assert sorted(os.listdir(directorio)) == ["000_stats.txt", "001_stats.txt", "002_stats.txt"]
+
+    imagen, originales, registro = registros[1]
+    texto = (directorio / "001_stats.txt").read_text()
+    assert texto.startswith(f"Estadísticas para: {imagen}\n")
+    assert f"Entropía: {originales[0]:.4f}\n" in texto
+    for metodo, fila in zip(nombres_metodos, registro):
+        assert f"Método: {metodo}\nAMBE: {fila[0]:.4f}\n" in texto
+        assert f"Tiempo: {fila[5] * 1000:.2f} ms\n" in texto
+
+
+def test_manifiesto(tmp_path):
+    ruta = str(tmp_path / "r.sqlite")
+    _escribir(ruta, _registros(3))
+
+    with resultados.MetricsSink(ruta, nombres_metricas, continuar=True) as sink:
+        assert sink.manifest() == {f"{k:03d}.png": (1, 2, f"{k:03d}.png") for k in range(3)}
+        sink.remove(["001.png"])
+        assert sorted(sink.manifest()) == ["000.png", "002.png"]
+
+    metricas = resultados.load_metrics(ruta, nombres_metodos)
+    assert len(metricas["HE"]["ambe"]) == 2
+
+
+def _archivos(directorio, cantidad):
+    directorio.mkdir(exist_ok=True)
+    for k in range(cantidad):
+        (directorio / f"{k}.png").write_bytes(bytes([k]) * (k + 1))
+    return sorted(os.listdir(directorio))
+
+
+def test_plan_incremental(tmp_path):
+    directorio = tmp_path / "dataset"
+    archivos = _archivos(directorio, 4)
+    firmas, pendientes, tocados, eliminados = resultados.plan_incremental(
+        str(directorio), archivos, {}
+    )
+    assert pendientes == archivos and tocados == [] and eliminados == []
+    manifiesto = dict(firmas)
+
+    # 0: sin cambios; 1: contenido nuevo; 2: solo cambia el mtime; 3: se borra; 4: nuevo
+    (directorio / "1.png").write_bytes(b"otro contenido")
+    info = os.stat(directorio / "2.png")
+    os.utime(directorio / "2.png", ns=(info.st_atime_ns, info.st_mtime_ns + 10**9))
+    os.remove(directorio / "3.png")
+    (directorio / "4.png").write_bytes(b"nuevo")
+
+    archivos = sorted(os.listdir(directorio))
+    firmas, pendientes, tocados, eliminados = resultados.plan_incremental(
+        str(directorio), archivos, manifiesto
+    )
+    assert pendientes == ["1.png", "4.png"]
+    assert tocados == ["2.png"]
+    assert eliminados == ["3.png"]
+    assert firmas["0.png"] == manifiesto["0.png"]
+    assert firmas["2.png"][2] == manifiesto["2.png"][2]
+
+
+def test_firma_reutiliza_el_hash():
+    # Con mtime y tamaño iguales el archivo no se vuelve a leer
+    firma = resultados.file_signature(__file__)
+    anterior = (*firma[:2], "hash guardado")
+    assert resultados.file_signature(__file__, anterior) == anterior
+
+
+def test_continua_una_ejecucion_interrumpida(tmp_path):
+    directorio = tmp_path / "dataset"
+    archivos = _archivos(directorio, 5)
+    ruta = str(tmp_path / "r.sqlite")
+    firmas, pendientes, _, _ = resultados.plan_incremental(str(directorio), archivos, {})
+
+    # Se confirman las filas de a dos imágenes y la ejecución se corta en la quinta
+    sink = resultados.MetricsSink(ruta, nombres_metricas, lote=2, continuar=True)
+    for filename in pendientes:
+        sink.add(filename, np.zeros(3), np.ones((4, 6)), nombres_metodos, firmas[filename])
+    sink.conexion.close()
+
+    with resultados.MetricsSink(ruta, nombres_metricas, continuar=True) as sink:
+        manifiesto = sink.manifest()
+        _, pendientes, _, _ = resultados.plan_incremental(str(directorio), archivos, manifiesto)
+        assert sorted(manifiesto) == archivos[:4]
+        assert pendientes == archivos[4:]
+        for filename in pendientes:
+            sink.add(filename, np.zeros(3), np.ones((4, 6)), nombres_metodos, firmas[filename])
+
+    metricas = resultados.load_metrics(ruta, nombres_metodos)
+    assert len(metricas["HE"]["ambe"]) == 5
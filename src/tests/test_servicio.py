@@ -0,0 +1,133 @@
+import http.client
+import io
+import json
+import threading
+
+import cv2
+import numpy as np
+import pytest
+
+import servicio
+from image_enhancer import metodos
+
+# ```
+# Servicio local de mejora de imagenes
+#
+# Se levanta el servidor en un puerto libre, con un worker, y se le hacen
+# peticiones reales por HTTP.
+
+
+@pytest.fixture(scope="module")
+def direccion():
+    servicio_mejora = servicio.EnhancementService(workers=1)
+    servidor = servicio.create_server(servicio_mejora, puerto=0)
+    hilo = threading.Thread(target=servidor.serve_forever, daemon=True)
+    hilo.start()
+    yield servidor.server_address
+    servidor.shutdown()
+    servidor.server_close()
+    servicio_mejora.close()
+
+
+def _pedir(direccion, metodo, ruta, cuerpo=None, encabezados=None):
+    conexion = http.client.HTTPConnection(*direccion, timeout=10)
+    try:
+        conexion.putrequest(metodo, ruta)
+        for nombre, valor in (encabezados or {}).items():
+            conexion.putheader(nombre, valor)
+        if cuerpo is not None and "Content-Length" not in (encabezados or {}):
+            conexion.putheader("Content-Length", str(len(cuerpo)))
+        conexion.endheaders(cuerpo)
+        respuesta = conexion.getresponse()
+        return respuesta.status, respuesta.read()
+    finally:
+        conexion.close()
+
+
+def _imagen(semilla=0):
+    return np.random.default_rng(semilla).integers(0, 256, (48, 64), dtype=np.uint8)
+
+
+def _npz(cuerpo):
+    with np.load(io.BytesIO(cuerpo)) as archivo:
+        return {nombre: archivo[nombre] for nombre in archivo.files}
+
+
+def test_metodos(direccion):
+    estado, cuerpo = _pedir(direccion, "GET", "/metodos")
+    assert estado == 200
+    assert set(json.loads(cuerpo)) == set(metodos.parametros_metodos)
+
+
+def test_mejorar_png(direccion):
+    imagen = _imagen()
+    _, png = cv2.imencode(".png", imagen)
+    estado, cuerpo = _pedir(
+        direccion, "POST", "/mejorar?metodos=CLAHE,HE&metricas=1", png.tobytes(),
+        {"Content-Type": "image/png"},
+    )
+    assert estado == 200
+    arreglos = _npz(cuerpo)
+    np.testing.assert_array_equal(arreglos["0/CLAHE"], metodos.apply_clahe(imagen))
+    np.testing.assert_array_equal(arreglos["0/HE"], metodos.apply_histogram_equalization(imagen))
+    assert set(json.loads(str(arreglos["metricas"]))["0"]) == {"CLAHE", "HE"}
+    assert json.loads(str(arreglos["errores"])) == {}
+
+
+def test_mejorar_lote_npy(direccion):
+    lote = np.stack([_imagen(semilla) for semilla in range(3)])
+    archivo = io.BytesIO()
+    np.save(archivo, lote)
+    estado, cuerpo = _pedir(
+        direccion, "POST", "/mejorar?metodos=DQHEPL", archivo.getvalue(),
+        {"Content-Type": "application/x-npy"},
+    )
+    assert estado == 200
+    arreglos = _npz(cuerpo)
+    for i, imagen in enumerate(lote):
+        np.testing.assert_array_equal(arreglos[f"{i}/DQHEPL"], metodos.apply_dqhepl(imagen))
+
+
+def test_cuadro_que_no_se_decodifica(direccion):
+    estado, cuerpo = _pedir(
+        direccion, "POST", "/mejorar", b"no es una imagen", {"Content-Type": "image/png"}
+    )
+    assert estado == 422
+    assert "0" in json.loads(str(_npz(cuerpo)["errores"]))
+
+
+@pytest.mark.parametrize(
+    "cuerpo, tipo",
+    [
+        (b"PK\x03\x04no es un zip", "application/x-npz"),
+        (b"", "application/x-npz"),
+        (b"\x93NUMPY\x01\x00zz", "application/x-npy"),
+        (b"{}", "application/json"),
+    ],
+)
+def test_cuerpo_invalido(direccion, cuerpo, tipo):
+    estado, respuesta = _pedir(direccion, "POST", "/mejorar", cuerpo, {"Content-Type": tipo})
+    assert estado == 400
+    assert "error" in json.loads(respuesta)
+
+
+@pytest.mark.parametrize("ruta", ["/mejorar?metodos=XYZ", "/mejorar?formato=gif", "/mejorar?parametros={"])
+def test_consulta_invalida(direccion, ruta):
+    _, png = cv2.imencode(".png", _imagen())
+    estado, _ = _pedir(direccion, "POST", ruta, png.tobytes(), {"Content-Type": "image/png"})
+    assert estado == 400
+
+
+@pytest.mark.parametrize("longitud", ["abc", "-5"])
+def test_content_length_invalido(direccion, longitud):
+    estado, respuesta = _pedir(
+        direccion, "POST", "/mejorar", b"", {"Content-Type": "image/png", "Content-Length": longitud}
+    )
+    assert estado == 400
+    assert json.loads(respuesta) == {"error": "Content-Length inválido"}
+
+
+def test_estado_sigue_respondiendo(direccion):
+    estado, cuerpo = _pedir(direccion, "GET", "/estado")
+    assert estado == 200
+    assert json.loads(cuerpo)["workers"] == 1
@@ -0,0 +1,174 @@
+import cv2
+import numpy as np
+import argparse
+from image_enhancer import metodos
+from image_enhancer.analisis import (
+    analyze_histogram,
+    calculate_histogram,
+    calculate_sampled_histogram,
+    modos_muestreo,
+)
+
+# ```
+# Mejora de video por streaming
+#
+# En lugar de recalcular la LUT en cada cuadro, se mantiene un histograma
+# con promedio movil exponencial y la LUT solo se reconstruye cuando ese
+# histograma se aleja lo suficiente del usado para construirla. Esto reduce
+# la latencia por cuadro y evita el parpadeo de brillo entre cuadros.
+
+
+class StreamingEnhancer:
+    """
+    Aplica un método de LUT global ("HE", "DQHEPL" o "BHEPL-D") a una secuencia
+    de cuadros reutilizando la LUT mientras el histograma no cambie.
+
+    - alfa: peso del cuadro nuevo en el histograma con promedio exponencial.
+    - umbral: distancia de variación total (entre 0 y 1) entre el histograma
+      actual y el de la última LUT a partir de la cual se reconstruye la LUT.
+    - fraccion: si se indica, el histograma de cada cuadro se calcula sobre esa
+      fracción de los píxeles, elegidos según 'muestreo' (modo aproximado).
+    """
+
+    def __init__(self, metodo="BHEPL-D", alfa=0.1, umbral=0.02, fraccion=None, muestreo="filas"):
+        if metodo not in metodos.constructores_lut:
+            raise ValueError(f"Método no soportado en streaming: {metodo}")
+
+        self.metodo = metodo
+        self.alfa = alfa
+        self.umbral = umbral
+        self.fraccion = fraccion
+        self.muestreo = muestreo
+        self.reset()
+
+    def reset(self):
+        """Descarta el histograma acumulado, la LUT y los contadores."""
+        self.histograma = None
+        self.histograma_lut = None
+        self.tabla_lut = None
+        self.cuadros = 0
+        self.reconstrucciones = 0
+        self.reutilizaciones = 0
+
+    def _reconstruir_lut(self, total_pixeles):
+        """Construye la LUT a partir del histograma acumulado escalado al cuadro."""
+        conteos = np.rint(self.histograma * total_pixeles)
+        if self.fraccion is None:
+            self.tabla_lut = metodos.constructores_lut[self.metodo](analyze_histogram(conteos))
+        else:
+            self.tabla_lut = metodos.build_approximate_lut(analyze_histogram(conteos), self.metodo)
+        self.histograma_lut = self.histograma.copy()
+        self.reconstrucciones += 1
+
+    def process(self, cuadro):
+        """Mejora un cuadro (gris o BGR) y devuelve el resultado en escala de grises."""
+        if cuadro.ndim == 3:
+            cuadro = cv2.cvtColor(cuadro, cv2.COLOR_BGR2GRAY)
+
+        if self.fraccion is None:
+            histograma = calculate_histogram(cuadro)
+        else:
+            histograma = calculate_sampled_histogram(cuadro, self.fraccion, self.muestreo)
+        total_pixeles = histograma.sum()
+        histograma /= total_pixeles
+
+        # Promedio movil exponencial del histograma normalizado
+        if self.histograma is None:
+            self.histograma = histograma
+        else:
+            self.histograma = (1 - self.alfa) * self.histograma + self.alfa * histograma
+
+        if self.tabla_lut is None:
+            self._reconstruir_lut(total_pixeles)
+        else:
+            deriva = 0.5 * np.abs(self.histograma - self.histograma_lut).sum()
+            if deriva > self.umbral:
+                self._reconstruir_lut(total_pixeles)
+            else:
+                self.reutilizaciones += 1
+
+        self.cuadros += 1
+        return cv2.LUT(cuadro, self.tabla_lut)
+
+    def stream(self, fuente):
+        """
+        Procesa cuadros de un iterable (por ejemplo un generador) o de un
+        cv2.VideoCapture y los devuelve mejorados uno por uno.
+        """
+        if isinstance(fuente, cv2.VideoCapture):
+            fuente = _cuadros_de_captura(fuente)
+
+        for cuadro in fuente:
+            yield self.process(cuadro)
+
+    def statistics(self):
+        """Devuelve cuántos cuadros se procesaron y cuántas veces se reutilizó o reconstruyó la LUT."""
+        return {
+            "cuadros": self.cuadros,
+            "reconstrucciones": self.reconstrucciones,
+            "reutilizaciones": self.reutilizaciones,
+            "tasa_reutilizacion": self.reutilizaciones / max(self.cuadros, 1),
+        }
+
+
+def _cuadros_de_captura(captura):
+    """Generador de cuadros de un cv2.VideoCapture hasta que se agote."""
+    while True:
+        leido, cuadro = captura.read()
+        if not leido:
+            break
+        yield cuadro
+
+
+def main():
+    """Mejora un video cuadro a cuadro y guarda el resultado en escala de grises."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("entrada", help="Video de entrada (archivo o índice de cámara)")
+    parser.add_argument("salida", help="Video de salida")
+    parser.add_argument(
+        "--metodo", default="BHEPL-D", choices=list(metodos.constructores_lut)
+    )
+    parser.add_argument("--alfa", type=float, default=0.1)
+    parser.add_argument("--umbral", type=float, default=0.02)
+    parser.add_argument(
+        "--fraccion",
+        type=float,
+        default=None,
+        help="Calcular el histograma sobre esta fracción de los píxeles (modo aproximado)",
+    )
+    parser.add_argument("--muestreo", default="filas", choices=modos_muestreo)
+    args = parser.parse_args()
+
+    entrada = int(args.entrada) if args.entrada.isdigit() else args.entrada
+    captura = cv2.VideoCapture(entrada)
+    if not captura.isOpened():
+        raise SystemExit(f"No se pudo abrir el video: {args.entrada}")
+
+    fps = captura.get(cv2.CAP_PROP_FPS) or 30
+    ancho = int(captura.get(cv2.CAP_PROP_FRAME_WIDTH))
+    alto = int(captura.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    escritor = cv2.VideoWriter(
+        args.salida, cv2.VideoWriter_fourcc(*"mp4v"), fps, (ancho, alto), isColor=False
+    )
+
+    realzador = StreamingEnhancer(
+        args.metodo, args.alfa, args.umbral, args.fraccion, args.muestreo
+    )
+    try:
+        for cuadro in realzador.stream(captura):
+            escritor.write(cuadro)
+    finally:
+        captura.release()
+        escritor.release()
+
+    estadisticas = realzador.statistics()
+    print(
+        f"Cuadros: {estadisticas['cuadros']} | "
+        f"LUT reconstruida: {estadisticas['reconstrucciones']} | "
+        f"LUT reutilizada: {estadisticas['reutilizaciones']} "
+        f"({estadisticas['tasa_reutilizacion']:.1%})"
+    )
+
+
+if __name__ == "__main__":
+    main()